@@ -0,0 +1,5 @@
+"""Offline benchmarks for Discord Fate Bot's hot paths.
+
+Run with ``python -m benchmarks``. See ``python -m benchmarks --help`` for
+options, including writing results as JSON and comparing against a baseline.
+"""
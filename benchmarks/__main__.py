@@ -0,0 +1,78 @@
+import argparse
+import fnmatch
+import json
+import sys
+
+from . import bench_dice, bench_outbound, bench_scene_management, bench_scenes, bench_storage
+from .harness import BENCHMARKS, compare, run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Run the Discord Fate Bot benchmarks.',
+    )
+    parser.add_argument(
+        'patterns', nargs='*', metavar='PATTERN',
+        help='Only run benchmarks whose names match these glob patterns',
+    )
+    parser.add_argument(
+        '-o', '--output', metavar='FILE',
+        help='Write the results to FILE as JSON',
+    )
+    parser.add_argument(
+        '-b', '--baseline', metavar='FILE',
+        help='Compare the results against a previous JSON results file',
+    )
+    parser.add_argument(
+        '-t', '--threshold', type=float, default=0.1,
+        help='Slowdown vs the baseline that counts as a regression (default: 0.1)',
+    )
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=5,
+        help='Number of timing runs per benchmark (default: 5)',
+    )
+    parser.add_argument(
+        '-l', '--list', action='store_true',
+        help='List the benchmarks and exit',
+    )
+    args = parser.parse_args(argv)
+
+    names = sorted(
+        name for name in BENCHMARKS
+        if not args.patterns or any(fnmatch.fnmatch(name, pattern) for pattern in args.patterns)
+    )
+
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    results = run(names, repeat=args.repeat)
+
+    for name, result in results['benchmarks'].items():
+        size = f'{result["bytes"]:10d} bytes' if 'bytes' in result else ''
+        print(f'{name:<40} {result["min"] * 1e6:12.2f} us{size}')
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        comparisons = compare(results, baseline, threshold=args.threshold)
+
+        print()
+        for comparison in comparisons:
+            marker = '  REGRESSED' if comparison['regressed'] else ''
+            print(f'{comparison["name"]:<40} {comparison["ratio"]:8.2f}x{marker}')
+
+        if any(comparison['regressed'] for comparison in comparisons):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
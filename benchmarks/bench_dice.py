@@ -0,0 +1,48 @@
+from discord_fate_bot.dice import FateDiePool, RollContext, Value
+from discord_fate_bot.rng import DiceRng
+from discord_fate_bot.util import join_as_columns
+
+from .harness import benchmark
+
+# Seeded, so every run times the same rolls.
+POOL = FateDiePool(rng=DiceRng.seeded(0))
+CONTEXT = RollContext(modifiers=(Value(2), Value(-1)), opposition=Value(3))
+
+
+@benchmark('dice.roll')
+def roll():
+    return lambda: POOL.roll(CONTEXT)
+
+@benchmark('dice.roll.secure')
+def roll_secure():
+    rng = DiceRng.secure()
+    return lambda: POOL.roll(CONTEXT, rng=rng)
+
+@benchmark('dice.roll_and_render')
+def roll_and_render():
+    def _operation():
+        roll = POOL.roll(CONTEXT)
+        roll.description()
+        roll.dice_display()
+        roll.explanation()
+    return _operation
+
+@benchmark('dice.description')
+def description():
+    roll = POOL.roll(CONTEXT)
+    return roll.description
+
+@benchmark('dice.dice_display')
+def dice_display():
+    roll = POOL.roll(CONTEXT)
+    return roll.dice_display
+
+@benchmark('dice.explanation')
+def explanation():
+    roll = POOL.roll(CONTEXT)
+    return roll.explanation
+
+@benchmark('util.join_as_columns')
+def join_columns():
+    faces = POOL.roll(CONTEXT).faces
+    return lambda: join_as_columns(faces)
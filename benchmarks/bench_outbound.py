@@ -0,0 +1,68 @@
+"""How long a reply waits behind a busy scene's edits in the same channel, with
+and without the outbound queue.
+"""
+
+import asyncio
+
+from discord_fate_bot.outbound import OutboundQueue, Priority
+
+from .harness import benchmark
+
+CHANNEL_ID = 1
+
+# How long each simulated request holds the channel's rate limit bucket.
+REQUEST_SECONDS = 0.001
+
+# How many scene edits are waiting to be sent when the reply comes in.
+SCENE_EDIT_BACKLOG = 8
+
+
+class _RateLimitedChannel:
+    """A channel at its rate limit, where discord.py makes each request wait
+    its turn, in the order the requests arrived.
+    """
+
+    def __init__(self):
+        self.bucket = asyncio.Lock()
+
+    async def request(self):
+        async with self.bucket:
+            await asyncio.sleep(REQUEST_SECONDS)
+
+
+def _top_up(backlog, send_scene_edit):
+    loop = asyncio.get_event_loop()
+    while len(backlog) < SCENE_EDIT_BACKLOG:
+        task = loop.create_task(send_scene_edit())
+        backlog.add(task)
+        task.add_done_callback(backlog.discard)
+
+
+@benchmark('outbound.response_behind_scene_edits')
+async def response_behind_scene_edits():
+    """A reply sent through the outbound queue, which lets it skip ahead of the
+    queued scene edits.
+    """
+    channel = _RateLimitedChannel()
+    queue = OutboundQueue()
+    backlog = set()
+
+    async def _operation():
+        _top_up(backlog, lambda: queue.submit(CHANNEL_ID, Priority.SCENE, channel.request))
+        await queue.submit(CHANNEL_ID, Priority.RESPONSE, channel.request)
+
+    return _operation
+
+@benchmark('outbound.response_behind_scene_edits.fifo')
+async def response_behind_scene_edits_fifo():
+    """A reply sent straight to the channel, behind every scene edit that got
+    there first.
+    """
+    channel = _RateLimitedChannel()
+    backlog = set()
+
+    async def _operation():
+        _top_up(backlog, channel.request)
+        await channel.request()
+
+    return _operation
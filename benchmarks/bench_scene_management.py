@@ -0,0 +1,65 @@
+from discord_fate_bot.config import Config
+from discord_fate_bot.extensions.scene_management import SceneManagementCog
+from discord_fate_bot.storage.mongo import MongoSceneStore
+
+from .fakes import FakeBot, FakeChannel, FakeCollection, FakeContext, invoke
+from .harness import benchmark
+
+ENVIRON = {
+    'DFB_BOT_TOKEN': 'benchmark',
+    'DFB_MONGO_CONNECTION_URL': 'mongodb://benchmark',
+    'DFB_OUTBOUND_BATCH_DELAY': '0',
+    'DFB_SCENE_MESSAGE_EDIT_INTERVAL': '0',
+}
+
+
+def make_cog() -> SceneManagementCog:
+    config = Config.from_environ(ENVIRON)
+    return SceneManagementCog(FakeBot(config, MongoSceneStore(FakeCollection())))
+
+
+@benchmark('scene_management.command_flow')
+def command_flow():
+    """A whole scene: start it, add aspects and boosts, invoke them, and end
+    it.
+    """
+    cog = make_cog()
+
+    async def _operation():
+        channel = FakeChannel()
+
+        await invoke(cog, cog.scene, FakeContext(channel), description='Warehouse Five')
+
+        for i in range(5):
+            await invoke(cog, cog.aspect, FakeContext(channel), name=f'Aspect {i}')
+            await invoke(cog, cog.boost, FakeContext(channel), name=f'Boost {i}')
+
+        for aspect_id in range(1, 11):
+            await invoke(cog, cog.invoke_add, FakeContext(channel), 2, aspect_id)
+            await invoke(cog, cog.invoke, FakeContext(channel), aspect_id)
+
+        await invoke(cog, cog.aspect_rename, FakeContext(channel), 1, name='Renamed')
+        await invoke(cog, cog.scene_end, FakeContext(channel))
+
+    return _operation
+
+@benchmark('scene_management.invoke')
+def invoke_command():
+    """A single !invoke against an existing scene."""
+    cog = make_cog()
+    channel = FakeChannel()
+    started = False
+
+    async def _operation():
+        nonlocal started
+
+        # The scene has to be created on the event loop the harness runs us on,
+        # so do it on the first run.
+        if not started:
+            await invoke(cog, cog.scene, FakeContext(channel), description='Warehouse Five')
+            await invoke(cog, cog.aspect, FakeContext(channel), name='Darkness')
+            started = True
+
+        await invoke(cog, cog.invoke_add, FakeContext(channel), 1, 1)
+
+    return _operation
@@ -0,0 +1,124 @@
+"""Scene store benchmarks, run against every storage backend.
+
+The stores here are shared with the conformance tests, so every backend that's
+benchmarked is also checked to behave the same.
+"""
+
+import itertools
+import os
+import tempfile
+
+from typing import Awaitable, Callable, Dict
+
+from discord_fate_bot.history import RollRecord
+from discord_fate_bot.storage import SceneStore
+from discord_fate_bot.storage.memory import MemorySceneStore
+from discord_fate_bot.storage.mongo import MongoSceneStore
+from discord_fate_bot.storage.sqlite import SqliteSceneStore
+
+from .bench_dice import CONTEXT, POOL
+from .bench_scenes import make_scene
+from .fakes import FakeCollection
+from .harness import benchmark
+
+# Set this to a MongoDB connection URL to benchmark a real MongoDB server too.
+# The benchmarks use (and clobber) the discord_fate_bot_benchmark database.
+MONGO_URL_VARIABLE = 'DFB_BENCHMARK_MONGO_URL'
+
+# SQLite stores each get their own file in here, which is removed on exit.
+_sqlite_directory = tempfile.TemporaryDirectory()
+_sqlite_file_numbers = itertools.count()
+
+async def _memory_store() -> SceneStore:
+    return MemorySceneStore()
+
+async def _sqlite_store() -> SceneStore:
+    store = SqliteSceneStore(os.path.join(
+        _sqlite_directory.name,
+        f'scenes-{next(_sqlite_file_numbers)}.sqlite3'
+    ))
+    await store.open()
+    return store
+
+async def _fake_mongo_store() -> SceneStore:
+    return MongoSceneStore(FakeCollection())
+
+async def _mongo_store() -> SceneStore:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ[MONGO_URL_VARIABLE])
+    database = client.discord_fate_bot_benchmark
+    await database.scenes.drop()
+    store = MongoSceneStore(database.scenes)
+    await store.open()
+    return store
+
+# Factories for a new, empty store of each kind, by name.
+STORES: Dict[str, Callable[[], Awaitable[SceneStore]]] = {
+    'memory': _memory_store,
+    'sqlite': _sqlite_store,
+    'mongo-fake': _fake_mongo_store,
+}
+
+if MONGO_URL_VARIABLE in os.environ:
+    STORES['mongo'] = _mongo_store
+
+
+def _register(store_name, make_store):
+    @benchmark(f'storage.{store_name}.find')
+    async def find():
+        store = await make_store()
+        await store.save(make_scene(10).to_dict())
+
+        async def _operation():
+            await store.find(1)
+
+        return _operation
+
+    @benchmark(f'storage.{store_name}.save')
+    async def save():
+        store = await make_store()
+        document = make_scene(10).to_dict()
+
+        async def _operation():
+            await store.save(document)
+
+        return _operation
+
+    @benchmark(f'storage.{store_name}.update')
+    async def update():
+        store = await make_store()
+        scene = make_scene(10)
+        await store.save(scene.to_dict())
+        scene.mark_saved()
+
+        async def _operation():
+            scene.get_aspect(1).invokes += 1
+            await store.update(scene, scene.changes())
+            scene.mark_saved()
+
+        return _operation
+
+    for batch_size in (1, 100):
+        _register_insert_rolls(store_name, make_store, batch_size)
+
+def _register_insert_rolls(store_name, make_store, batch_size):
+    @benchmark(f'storage.{store_name}.insert_rolls[{batch_size}]')
+    async def insert_rolls():
+        """Write a batch of rolls to the history. Compare the batch sizes to
+        see what batching saves per roll.
+        """
+        roll_store = (await make_store()).roll_store()
+        document = RollRecord.for_roll(
+            POOL.roll(CONTEXT), channel_id=1, guild_id=2, player_id=3, rolled_at=0.0
+        ).to_dict()
+
+        async def _operation():
+            # Mongo adds an _id to each document it inserts, so they can't be
+            # reused.
+            await roll_store.insert_rolls([dict(document) for _ in range(batch_size)])
+
+        return _operation
+
+for _store_name, _make_store in STORES.items():
+    _register(_store_name, _make_store)
@@ -0,0 +1,325 @@
+"""Stand-ins for Discord and MongoDB, just capable enough to drive the cogs."""
+
+import copy
+import itertools
+
+from bson.objectid import ObjectId
+from discord import NotFound
+from discord_fate_bot.outbound import OutboundQueue
+from types import SimpleNamespace
+
+_snowflakes = itertools.count(1_000_000)
+
+
+class _NotFoundResponse:
+    status = 404
+    reason = 'Not Found'
+
+
+class FakeCollection:
+    """An in-memory collection keyed by channel_id, supporting the subset of
+    the Motor API the DAOs use.
+    """
+
+    def __init__(self):
+        self.documents = {}
+        self.operations = []
+        self.database = FakeDatabase()
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+    async def find_one(self, query):
+        self.operations.append('find_one')
+        return copy.deepcopy(self.documents.get(query['channel_id']))
+
+    async def find(self, query, batch_size=None):
+        self.operations.append('find')
+        for document in list(self.documents.values()):
+            if self._matches(document, query):
+                yield copy.deepcopy(document)
+
+    async def replace_one(self, query, document, upsert=False):
+        self.operations.append('replace_one')
+        stored = self._find(query)
+        if stored is not None:
+            self.documents[stored['channel_id']] = {'_id': stored['_id'], **copy.deepcopy(document)}
+        elif upsert:
+            self.documents[document['channel_id']] = {'_id': ObjectId(), **copy.deepcopy(document)}
+        return SimpleNamespace(matched_count=int(stored is not None))
+
+    async def bulk_write(self, requests, ordered=True):
+        modified_count = 0
+        for request in requests:
+            # Only ReplaceOne is used.
+            result = await self.replace_one(request._filter, request._doc)
+            modified_count += result.matched_count
+        return SimpleNamespace(modified_count=modified_count)
+
+    async def update_one(self, query, update, upsert=False, array_filters=None):
+        self.operations.append('update_one')
+        document = self._find(query)
+        if document is None:
+            return SimpleNamespace(matched_count=0)
+
+        # Array filters here are always of the form {'<name>.<field>': value}.
+        filters = {}
+        for array_filter in array_filters or []:
+            (filter_path, filter_value), = array_filter.items()
+            name, field = filter_path.split('.')
+            filters[name] = (field, filter_value)
+
+        for operator, fields in update.items():
+            for path, value in fields.items():
+                *parents, last = path.split('.')
+                target = document
+                for parent in parents:
+                    if parent.startswith('$['):
+                        field, filter_value = filters[parent[2:-1]]
+                        target = next(
+                            element for element in target
+                            if element.get(field) == filter_value
+                        )
+                    else:
+                        target = target[parent]
+
+                if operator == '$set':
+                    target[last] = copy.deepcopy(value)
+                elif operator == '$inc':
+                    target[last] = target.get(last, 0) + value
+                elif operator == '$unset':
+                    target.pop(last, None)
+                elif operator == '$push':
+                    target.setdefault(last, []).extend(copy.deepcopy(value['$each']))
+                elif operator == '$pull':
+                    (field, condition), = value.items()
+                    target[last] = [
+                        element for element in target.get(last, [])
+                        if element.get(field) not in condition['$in']
+                    ]
+                else:
+                    raise ValueError(f'Unsupported update operator {operator}')
+
+        return SimpleNamespace(matched_count=1)
+
+    async def delete_one(self, query):
+        self.operations.append('delete_one')
+        self.documents.pop(query['channel_id'], None)
+
+    def _find(self, query):
+        if 'channel_id' in query:
+            candidates = [self.documents.get(query['channel_id'])]
+        else:
+            candidates = self.documents.values()
+
+        return next(
+            (document for document in candidates if document is not None and self._matches(document, query)),
+            None
+        )
+
+    @staticmethod
+    def _matches(document, query):
+        for field, value in query.items():
+            if isinstance(value, dict) and '$ne' in value:
+                if document.get(field) == value['$ne']:
+                    return False
+            elif document.get(field) != value:
+                return False
+        return True
+
+
+class FakeRollCollection:
+    """An in-memory, append-only collection of rolls."""
+
+    def __init__(self):
+        self.documents = []
+        self.operations = []
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+    async def insert_many(self, documents, ordered=True):
+        self.operations.append('insert_many')
+        for document in documents:
+            document.setdefault('_id', ObjectId())
+            self.documents.append(copy.deepcopy(document))
+
+    async def find(self, query, projection=None, sort=None):
+        # Documents are kept in insertion order, which is the only sort used.
+        self.operations.append('find')
+        for document in self.documents:
+            if FakeCollection._matches(document, query):
+                document = copy.deepcopy(document)
+                if projection is not None and projection.get('_id') is False:
+                    del document['_id']
+                yield document
+
+    async def aggregate(self, pipeline, allowDiskUse=False):
+        # Only a $match followed by a $group is used, with the group's _id made
+        # of field paths and $size or $sum of an array field.
+        self.operations.append('aggregate')
+        match, group = pipeline
+        groups = {}
+
+        for document in self.documents:
+            if not FakeCollection._matches(document, match['$match']):
+                continue
+
+            group_id = {
+                name: self._evaluate(document, expression)
+                for name, expression in group['$group']['_id'].items()
+            }
+            group_key = tuple(sorted(group_id.items()))
+            if group_key not in groups:
+                groups[group_key] = {'_id': group_id, 'count': 0}
+            groups[group_key]['count'] += 1
+
+        for result in groups.values():
+            yield result
+
+    @staticmethod
+    def _evaluate(document, expression):
+        if isinstance(expression, str):
+            return document.get(expression[1:])
+        (operator, path), = expression.items()
+        values = document.get(path[1:])
+        return len(values) if operator == '$size' else sum(values)
+
+
+class FakeStatsCollection:
+    """An in-memory collection of stats documents keyed by scope and key."""
+
+    def __init__(self):
+        self.documents = {}
+        self.operations = []
+
+    async def create_index(self, *args, **kwargs):
+        pass
+
+    async def bulk_write(self, requests, ordered=True):
+        # Only UpdateOne upserts with $inc are used.
+        self.operations.append('bulk_write')
+        for request in requests:
+            query = request._filter
+            document = self.documents.setdefault(
+                (query['scope'], query['key']),
+                {'_id': ObjectId(), **query},
+            )
+            for path, amount in request._doc['$inc'].items():
+                *parents, last = path.split('.')
+                target = document
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[last] = target.get(last, 0) + amount
+
+    async def find_one(self, query, projection=None):
+        self.operations.append('find_one')
+        document = copy.deepcopy(self.documents.get((query['scope'], query['key'])))
+        if document is not None and projection is not None and projection.get('_id') is False:
+            del document['_id']
+        return document
+
+    async def delete_many(self, query):
+        self.operations.append('delete_many')
+        for scope_key in [scope_key for scope_key in self.documents if scope_key[0] == query['scope']]:
+            del self.documents[scope_key]
+
+    async def insert_many(self, documents, ordered=True):
+        self.operations.append('insert_many')
+        for document in documents:
+            self.documents[document['scope'], document['key']] = {
+                '_id': ObjectId(), **copy.deepcopy(document)
+            }
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.client = SimpleNamespace(close=lambda: None)
+        self.rolls = FakeRollCollection()
+        self.roll_stats = FakeStatsCollection()
+
+
+class FakeMessage:
+    def __init__(self, channel, content=None):
+        self.id = next(_snowflakes)
+        self.channel = channel
+        self.content = content
+
+    async def edit(self, *, content=None):
+        self._request('edit')
+        self.content = str(content)
+
+    async def delete(self):
+        self._request('delete')
+        del self.channel.messages[self.id]
+
+    async def pin(self):
+        self._request('pin')
+
+    async def unpin(self):
+        self._request('unpin')
+
+    async def add_reaction(self, emoji):
+        self.channel.requests.append('add_reaction')
+
+    def _request(self, name):
+        self.channel.requests.append(name)
+        if self.id not in self.channel.messages:
+            raise NotFound(_NotFoundResponse(), 'Unknown Message')
+
+
+class FakeChannel:
+    def __init__(self):
+        self.id = next(_snowflakes)
+        self.messages = {}
+        self.requests = []
+
+    async def fetch_message(self, message_id):
+        self.requests.append('fetch_message')
+        try:
+            return self.messages[message_id]
+        except KeyError:
+            raise NotFound(_NotFoundResponse(), 'Unknown Message')
+
+    async def send(self, content=None):
+        self.requests.append('send')
+        message = FakeMessage(self, str(content))
+        self.messages[message.id] = message
+        return message
+
+
+class FakeContext:
+    """Enough of a commands.Context to invoke a cog command by hand."""
+
+    def __init__(self, channel, content=''):
+        self.channel = channel
+        self.message = FakeMessage(channel, content)
+        self.author = SimpleNamespace(mention='<@0>')
+
+    async def fetch_message(self, message_id):
+        return await self.channel.fetch_message(message_id)
+
+    async def send(self, content=None):
+        return await self.channel.send(content)
+
+
+class FakeBot:
+    def __init__(self, config, scene_store):
+        self.config = config
+        self.scene_store = scene_store
+        self.outbound = OutboundQueue(
+            channel_concurrency=config.outbound.channel_concurrency,
+            batch_delay=config.outbound.batch_delay,
+        )
+        self.shutdown_hooks = []
+
+
+async def invoke(cog, command, ctx, *args, **kwargs):
+    """Invoke a cog command the way discord.py would, including the cog's
+    before and after hooks.
+    """
+    await cog.cog_before_invoke(ctx)
+    try:
+        await command.callback(cog, ctx, *args, **kwargs)
+    finally:
+        await cog.cog_after_invoke(ctx)
@@ -0,0 +1,139 @@
+"""A small timing harness, in the spirit of timeit, with JSON output."""
+
+import asyncio
+import inspect
+import platform
+import statistics
+import time
+
+from typing import Callable, Dict, List, Optional
+
+# Benchmarks by name. Each is a setup function which returns the operation to
+# time, so that setup isn't counted.
+BENCHMARKS: Dict[str, Callable[[], Callable]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark setup function under the given name.
+
+    The setup function returns the operation to time. The operation may be a
+    plain function or a coroutine function; coroutines are run to completion on
+    a private event loop. If the operation has an info attribute (a dict of
+    extra measurements, e.g., sizes), it is included in the results.
+
+    The setup function may itself be a coroutine function, e.g., to open a
+    connection, in which case it's run on the same event loop as the operation.
+    """
+    def _decorator(setup):
+        if name in BENCHMARKS:
+            raise ValueError(f'Duplicate benchmark {name}')
+        BENCHMARKS[name] = setup
+        return setup
+    return _decorator
+
+
+def measure(
+        operation: Callable,
+        *,
+        repeat: int = 5,
+        min_time: float = 0.2,
+        loop: Optional[asyncio.AbstractEventLoop] = None) -> dict:
+    """Time an operation, returning per-operation statistics in seconds.
+
+    Coroutine operations are run on the given event loop (or a new one), which
+    is closed afterward.
+    """
+    info = getattr(operation, 'info', {})
+
+    if inspect.iscoroutinefunction(operation):
+        if loop is None:
+            loop = asyncio.new_event_loop()
+        coroutine_function = operation
+
+        def operation():
+            loop.run_until_complete(coroutine_function())
+
+    try:
+        number = _autorange(operation, min_time)
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                operation()
+            timings.append((time.perf_counter() - start) / number)
+    finally:
+        if loop is not None:
+            # Let any background work the operation started finish up.
+            pending = asyncio.all_tasks(loop)
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+
+    return {
+        'number': number,
+        'repeat': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        **info,
+    }
+
+
+def run(names: Optional[List[str]] = None, **measure_kwargs) -> dict:
+    """Run the named benchmarks (or all of them) and collect the results."""
+    if names is None:
+        names = sorted(BENCHMARKS)
+
+    results = {}
+    for name in names:
+        setup = BENCHMARKS[name]
+
+        if inspect.iscoroutinefunction(setup):
+            loop = asyncio.new_event_loop()
+            operation = loop.run_until_complete(setup())
+            results[name] = measure(operation, loop=loop, **measure_kwargs)
+        else:
+            results[name] = measure(setup(), **measure_kwargs)
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'benchmarks': results,
+    }
+
+
+def compare(results: dict, baseline: dict, *, threshold: float) -> List[dict]:
+    """Compare results against a baseline by minimum time per operation.
+
+    A benchmark regresses if it is slower than the baseline by more than the
+    threshold (e.g., 0.1 for 10%).
+    """
+    comparisons = []
+
+    for name, result in sorted(results['benchmarks'].items()):
+        baseline_result = baseline['benchmarks'].get(name)
+        if baseline_result is None:
+            continue
+
+        ratio = result['min'] / baseline_result['min']
+        comparisons.append({
+            'name': name,
+            'baseline': baseline_result['min'],
+            'current': result['min'],
+            'ratio': ratio,
+            'regressed': ratio > 1 + threshold,
+        })
+
+    return comparisons
+
+
+def _autorange(operation: Callable, min_time: float) -> int:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        if time.perf_counter() - start >= min_time:
+            return number
+        number *= 2
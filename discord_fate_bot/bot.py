@@ -1,40 +1,235 @@
-from discord.ext.commands import Bot, Cog
+import asyncio
+import importlib
+import logging
+
+from discord import HTTPException
+from discord.ext.commands import AutoShardedBot, Bot, Cog
 from importlib.util import resolve_name
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Awaitable, Callable, List, Optional, Sequence
 
 from .config import Config
+from .metrics import REGISTRY
+from .outbound import OutboundQueue
+from .startup import StartupTimer
+from .storage import SceneStore
+from .tracing import span, trace
 
 _BOT_EXTENSIONS = [
     '.extensions.error_handling',
     '.extensions.log_invite_url',
+    '.extensions.metrics',
     '.extensions.rolling',
     '.extensions.scene_management',
 ]
 
+logger = logging.getLogger(__name__)
+
+DISCORD_HTTP_SECONDS = REGISTRY.histogram(
+    'dfb_discord_http_duration_seconds',
+    'Time spent on Discord HTTP API requests, including rate limit waits',
+    ['method', 'route'],
+)
+DISCORD_HTTP_ERRORS = REGISTRY.counter(
+    'dfb_discord_http_errors_total',
+    'Discord HTTP API requests that failed, by status',
+    ['method', 'route', 'status'],
+)
+
 class DiscordFateBot(Bot):
     config: Config
-    database: AsyncIOMotorDatabase
+    scene_store: SceneStore
+    outbound: OutboundQueue
+    startup: StartupTimer
+    shutdown_hooks: List[Callable[[], Awaitable[None]]]
 
-    def __init__(self, config, database):
-        super().__init__(command_prefix = '!')
+    def __init__(self, config, scene_store, *, startup=None, **options):
+        super().__init__(command_prefix = '!', **options)
 
         self.config = config
-        self.database = database
+        self.scene_store = scene_store
+        self.startup = startup if startup is not None else StartupTimer()
+        self.outbound = OutboundQueue(
+            channel_concurrency=config.outbound.channel_concurrency,
+            batch_delay=config.outbound.batch_delay,
+        )
+        self.shutdown_hooks = []
+        self._store_opened = None
+
+        # Every Discord API call goes through the HTTP client's request method,
+        # so wrap it to time each call.
+        self.http.request = self._instrument_request(self.http.request)
+
+        self.add_listener(self._report_startup, 'on_ready')
 
-        for extension in _BOT_EXTENSIONS:
-            # The load_extension method expects an "absolute" package name, but we
-            # want to be relative because why not? So we resolve the name relative
-            # to our package name.
-            self.load_extension(resolve_name(extension, __package__))
+    async def load_extensions(self):
+        """Load the bot's extensions.
+
+        Importing them is the slow part, so that's done in a worker thread,
+        where it doesn't hold up the event loop (e.g., while logging in).
+        """
+        # The load_extension method expects an "absolute" package name, but we
+        # want to be relative because why not? So we resolve the name relative
+        # to our package name.
+        names = [resolve_name(extension, __package__) for extension in _BOT_EXTENSIONS]
+
+        await asyncio.get_event_loop().run_in_executor(None, _import_modules, names)
+
+        for name in names:
+            self.load_extension(name)
 
     async def run(self):
-        token = await self.config.bot.read_token()
+        # Opening the store (e.g., creating indexes) doesn't need Discord, and
+        # nothing needs the store until commands come in, so carry on with
+        # connecting in the meantime.
+        self._store_opened = asyncio.ensure_future(
+            self.startup.time('open storage', self.scene_store.open())
+        )
+        self._store_opened.add_done_callback(self._check_store_opened)
 
         # This code is based on the documentation for Bot.run, except it has been
         # adapted to run *inside* the asyncio loop (so there's no need -- or
         # ability -- to close the loop).
         try:
-            await self.start(token)
+            await asyncio.gather(
+                self._log_in(),
+                self.startup.time('load extensions', self.load_extensions()),
+            )
+
+            self.startup.begin('connect')
+            await self.connect()
         finally:
+            if not self._store_opened.done():
+                self._store_opened.cancel()
             await self.logout()
 
+        # If we stopped because the store couldn't be opened, say so.
+        if not self._store_opened.cancelled():
+            self._store_opened.result()
+
+    async def invoke(self, ctx):
+        if ctx.command is None:
+            await super().invoke(ctx)
+            return
+
+        if self._store_opened is not None and not self._store_opened.done():
+            # Commands can come in before the store is ready. Shield it so a
+            # cancelled command doesn't cancel opening the store.
+            await asyncio.shield(self._store_opened)
+
+        # Trace the whole invocation, including checks and hooks (e.g., waiting
+        # for locks), not just the command itself.
+        with trace(
+                ctx.command.qualified_name,
+                command=ctx.command.qualified_name,
+                channel=ctx.channel.id) as command_trace:
+            await super().invoke(ctx)
+
+            if ctx.command_failed:
+                command_trace.attributes['failed'] = True
+
+    async def close(self):
+        if self.is_closed():
+            return
+
+        # Give extensions a chance to finish any outstanding work while we can
+        # still talk to Discord.
+        # Copy the hooks, since a hook finishing may remove itself.
+        for hook in list(self.shutdown_hooks):
+            try:
+                await hook()
+            except Exception:
+                logger.exception('Error running shutdown hook %r', hook)
+
+        # The hooks may have queued up more messages of their own.
+        await self.outbound.drain()
+
+        await super().close()
+
+    async def _log_in(self):
+        token = await self.startup.time('read token', self.config.bot.read_token())
+        await self.startup.time('log in', self.login(token))
+
+    async def _report_startup(self):
+        # We're ready again after every reconnect, but only the first time is
+        # part of start-up.
+        self.remove_listener(self._report_startup, 'on_ready')
+        self.startup.end('connect')
+        self.startup.report()
+
+    def _check_store_opened(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            # There's no point carrying on without the store. Run raises the
+            # error once we've stopped.
+            asyncio.ensure_future(self.close())
+
+    @staticmethod
+    def _instrument_request(request):
+        async def _instrumented_request(route, **kwargs):
+            # The route's path is the template (e.g., /channels/{channel_id}),
+            # which keeps the number of distinct labels bounded.
+            labels = {'method': route.method, 'route': route.path}
+
+            try:
+                with DISCORD_HTTP_SECONDS.time(**labels), span('discord', **labels):
+                    return await request(route, **kwargs)
+            except HTTPException as error:
+                DISCORD_HTTP_ERRORS.inc(**labels, status=error.status)
+                raise
+
+        return _instrumented_request
+
+
+class AutoShardedDiscordFateBot(DiscordFateBot, AutoShardedBot):
+    """A bot that runs several shards in one process."""
+
+
+def create_bot(
+        config: Config,
+        scene_store: SceneStore,
+        shard_ids: Optional[Sequence[int]] = None,
+        *,
+        startup: Optional[StartupTimer] = None) -> DiscordFateBot:
+    """Create a bot for the given shards, as configured.
+
+    A single shard (or no sharding at all) gets a plain bot, unless the config
+    asks for an AutoShardedBot anyway. Several shards in one process need one.
+    """
+    shard_count = config.sharding.count or None
+
+    if (shard_ids is not None and len(shard_ids) > 1) or config.sharding.auto:
+        return AutoShardedDiscordFateBot(
+            config,
+            scene_store,
+            startup=startup,
+            shard_count=shard_count,
+            shard_ids=None if shard_ids is None else list(shard_ids),
+        )
+
+    if shard_ids is not None:
+        (shard_id,) = shard_ids
+        return DiscordFateBot(
+            config,
+            scene_store,
+            startup=startup,
+            shard_id=shard_id,
+            shard_count=shard_count,
+        )
+
+    return DiscordFateBot(config, scene_store, startup=startup)
+
+def shard_groups(shard_count: int, process_count: int) -> List[List[int]]:
+    """Split the shards across processes as evenly as possible.
+
+    Shards are dealt out round-robin, so each process gets a similar mix of
+    (older, busier) low-numbered and high-numbered shards.
+    """
+    process_count = min(process_count, shard_count)
+    return [
+        list(range(process_index, shard_count, process_count))
+        for process_index in range(process_count)
+    ]
+
+
+def _import_modules(names: List[str]):
+    for name in names:
+        importlib.import_module(name)
@@ -0,0 +1,97 @@
+import time
+
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+class LruCache(Generic[K, V]):
+    """A bounded least-recently-used cache with an optional time-to-live.
+
+    Entries beyond max_size are evicted oldest-use first. If ttl is given (in
+    seconds), entries older than that are treated as missing. A max_size of
+    zero disables the cache entirely.
+    """
+
+    max_size: int
+    ttl: Optional[float]
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(
+            self,
+            max_size: int,
+            ttl: Optional[float] = None,
+            *,
+            clock: Callable[[], float] = time.monotonic):
+        if max_size < 0:
+            raise ValueError('Cache size must not be negative')
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._clock = clock
+        self._entries = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        """Look up a key, returning None (and counting a miss) if it is absent
+        or expired.
+        """
+        try:
+            value, stored_at = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        if self.ttl is not None and self._clock() - stored_at >= self.ttl:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: K) -> Optional[V]:
+        """Look up a key without counting it or marking it as recently used."""
+        try:
+            value, stored_at = self._entries[key]
+        except KeyError:
+            return None
+
+        if self.ttl is not None and self._clock() - stored_at >= self.ttl:
+            return None
+
+        return value
+
+    def put(self, key: K, value: V):
+        """Store a value, evicting the least-recently-used entries if the cache
+        is full.
+        """
+        if self.max_size == 0:
+            return
+
+        self._entries[key] = (value, self._clock())
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: K):
+        """Remove a key from the cache, if present."""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
@@ -30,13 +30,73 @@ class BotGroup:
         """Read the token from the config, possibly from the filesystem."""
         return await _read_file_or_immediate_value(self.token_file, self.token)
 
+@environ.config
+class DiceGroup:
+    rng = environ.var(
+        'fast',
+        help = 'How to generate rolls: fast, or secure for a cryptographically secure generator'
+    )
+    secure_channels = environ.var(
+        frozenset(),
+        converter = lambda value: frozenset(int(id) for id in value.split(',') if id.strip()) if isinstance(value, str) else value,
+        help = 'Comma-separated ids of channels that always use the secure generator'
+    )
+    seed = environ.var(
+        None,
+        converter = lambda value: None if value is None else int(value),
+        help = 'Seed for reproducible rolls, e.g., in tests (not with DFB_DICE_RNG=secure)'
+    )
+
+    @rng.validator
+    def _rng_valid(self, attribute, value):
+        if value not in ('fast', 'secure'):
+            raise ValueError('DFB_DICE_RNG must be one of: fast, secure')
+
+    @seed.validator
+    def _seed_valid(self, attribute, value):
+        if value is not None and self.rng == 'secure':
+            raise ValueError('DFB_DICE_SEED cannot be used with DFB_DICE_RNG=secure')
+
+@environ.config
+class ErrorsGroup:
+    window = environ.var(
+        60.0,
+        converter = float,
+        help = 'The number of seconds to hold back repeats of an error message for'
+    )
+    channel_limit = environ.var(
+        5,
+        converter = int,
+        help = 'The number of error messages to send to each channel per window'
+    )
+
+    @channel_limit.validator
+    def _channel_limit_valid(self, attribute, value):
+        if value < 1:
+            raise ValueError('DFB_ERRORS_CHANNEL_LIMIT must be at least 1')
+
 @environ.config
 class LogGroup:
     config_file = environ.var(None, help = 'The path to a configuration file for Python logging')
 
+@environ.config
+class MetricsGroup:
+    host = environ.var(
+        '127.0.0.1',
+        help = 'The address to serve metrics on'
+    )
+    port = environ.var(
+        0,
+        converter = int,
+        help = 'The port to serve Prometheus metrics on at /metrics (0 to disable)'
+    )
+
 @environ.config
 class MongoGroup:
-    connection_url = environ.var(help = "URL for the MongoDB connection")
+    connection_url = environ.var(
+        None,
+        help = 'URL for the MongoDB connection (required for the mongo storage backend)'
+    )
     password = environ.var(
         None,
         help = 'MongoDB password ' \
@@ -60,11 +120,176 @@ class MongoGroup:
         return await _read_file_or_immediate_value(self.password_file, self.password)
 
 
+@environ.config
+class OutboundGroup:
+    channel_concurrency = environ.var(
+        2,
+        converter = int,
+        help = 'The number of requests to have in flight to Discord for each channel ' \
+        '(1 keeps no request free for replies)'
+    )
+    batch_delay = environ.var(
+        0.5,
+        converter = float,
+        help = 'The number of seconds to collect reactions for before sending them'
+    )
+
+    @channel_concurrency.validator
+    def _channel_concurrency_valid(self, attribute, value):
+        if value < 1:
+            raise ValueError('DFB_OUTBOUND_CHANNEL_CONCURRENCY must be at least 1')
+
+
+@environ.config
+class RollHistoryGroup:
+    enabled = environ.bool_var(
+        True,
+        help = 'Keep a history of every roll'
+    )
+    batch_size = environ.var(
+        100,
+        converter = int,
+        help = 'The number of rolls to write to the history at once'
+    )
+    flush_interval = environ.var(
+        5.0,
+        converter = float,
+        help = 'The maximum number of seconds to hold rolls before writing them'
+    )
+    max_pending = environ.var(
+        10000,
+        converter = int,
+        help = 'The maximum number of rolls to hold in memory waiting to be written'
+    )
+
+    @batch_size.validator
+    def _batch_size_valid(self, attribute, value):
+        if value < 1:
+            raise ValueError('DFB_ROLL_HISTORY_BATCH_SIZE must be at least 1')
+
+    @max_pending.validator
+    def _max_pending_valid(self, attribute, value):
+        if value < self.batch_size:
+            raise ValueError(
+                'DFB_ROLL_HISTORY_MAX_PENDING must be at least DFB_ROLL_HISTORY_BATCH_SIZE'
+            )
+
+
+@environ.config
+class ShardingGroup:
+    count = environ.var(
+        0,
+        converter = int,
+        help = 'The total number of shards across all processes (0 to not shard)'
+    )
+    ids = environ.var(
+        None,
+        converter = lambda value: None if value is None else [int(id) for id in value.split(',')],
+        help = 'Comma-separated ids of the shards to run in this process ' \
+        '(default: all of them, split across DFB_SHARDING_PROCESSES)'
+    )
+    processes = environ.var(
+        1,
+        converter = int,
+        help = 'The number of worker processes to split the shards across'
+    )
+    auto = environ.bool_var(
+        False,
+        help = "Use discord.py's AutoShardedBot, even for a single shard"
+    )
+
+    @ids.validator
+    def _ids_valid(self, attribute, value):
+        if value is not None and not all(0 <= id < self.count for id in value):
+            raise ValueError(
+                'DFB_SHARDING_IDS must be between 0 and DFB_SHARDING_COUNT - 1'
+            )
+
+    @processes.validator
+    def _processes_valid(self, attribute, value):
+        if value < 1:
+            raise ValueError('DFB_SHARDING_PROCESSES must be at least 1')
+
+
+@environ.config
+class StorageGroup:
+    backend = environ.var(
+        'mongo',
+        help = 'Where to store scenes: mongo, memory, or sqlite'
+    )
+    sqlite_path = environ.var(
+        'discord_fate_bot.sqlite3',
+        help = 'The path to the SQLite database file (for the sqlite storage backend)'
+    )
+
+    @backend.validator
+    def _backend_valid(self, attribute, value):
+        if value not in ('mongo', 'memory', 'sqlite'):
+            raise ValueError(
+                'DFB_STORAGE_BACKEND must be one of mongo, memory, or sqlite'
+            )
+
+
+@environ.config
+class SceneCacheGroup:
+    size = environ.var(
+        1024,
+        converter = int,
+        help = 'The maximum number of scenes to cache in memory (0 to disable)'
+    )
+    ttl = environ.var(
+        300.0,
+        converter = float,
+        help = 'The number of seconds a cached scene remains valid'
+    )
+
+@environ.config
+class SceneMessageGroup:
+    edit_interval = environ.var(
+        2.0,
+        converter = float,
+        help = 'The minimum number of seconds between edits of a pinned scene message'
+    )
+    cache_size = environ.var(
+        1024,
+        converter = int,
+        help = 'The maximum number of channels to cache pinned scene messages for (0 to disable)'
+    )
+    cache_ttl = environ.var(
+        300.0,
+        converter = float,
+        help = "The number of seconds a channel's cached scene messages remain valid"
+    )
+
+
+@environ.config
+class TracingGroup:
+    slow_threshold = environ.var(
+        1.0,
+        converter = float,
+        help = 'Commands taking at least this many seconds are logged with their trace'
+    )
+    export_file = environ.var(
+        None,
+        help = 'The path to a file to append every trace to, as JSON lines'
+    )
+
+
 @environ.config(prefix = 'DFB')
 class Config:
     bot = environ.group(BotGroup)
+    dice = environ.group(DiceGroup)
+    errors = environ.group(ErrorsGroup)
     log = environ.group(LogGroup)
+    metrics = environ.group(MetricsGroup)
     mongo = environ.group(MongoGroup)
+    outbound = environ.group(OutboundGroup)
+    roll_history = environ.group(RollHistoryGroup)
+    sharding = environ.group(ShardingGroup)
+    storage = environ.group(StorageGroup)
+    scene_cache = environ.group(SceneCacheGroup)
+    scene_message = environ.group(SceneMessageGroup)
+    tracing = environ.group(TracingGroup)
 
 
 async def _read_file_or_immediate_value(path, immediate_value):
@@ -1,24 +1,336 @@
 import aiorun
+import argparse
+import asyncio
+import json
 import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+from typing import List, Optional
 
 from . import __version__ as dfb_version
-from .bot import DiscordFateBot
+from .bot import create_bot, shard_groups
 from .config import Config
-from .database import get_database
 from .logging import configure_logging
+from .metrics import REGISTRY, start_metrics_server
+from .startup import StartupTimer
+from .storage import get_scene_store
+from .tracing import close_tracing, configure_tracing
 
 logger = logging.getLogger(__name__)
 
 def main():
     config = Config.from_environ()
-    configure_logging(config)
+    sharding = config.sharding
+
+    if sharding.ids is not None:
+        # This process was told exactly which shards to run, e.g., by an
+        # orchestrator running one process per container.
+        _run_bot(config, sharding.ids)
+    elif sharding.count and sharding.processes > 1:
+        _run_workers(config)
+    elif sharding.count:
+        _run_bot(config, list(range(sharding.count)))
+    else:
+        _run_bot(config, None)
+
+
+def _run_workers(config: Config):
+    """Run each group of shards in its own worker process, and wait for them
+    all to finish.
+    """
+    configure_logging(config, tag='launcher')
+
+    groups = shard_groups(config.sharding.count, config.sharding.processes)
+    logger.info(
+        f'Starting {len(groups)} worker processes for {config.sharding.count} shards...'
+    )
+
+    workers = [
+        multiprocessing.Process(
+            target=_run_worker,
+            args=(worker_index, shard_ids),
+            name=_shard_tag(shard_ids),
+        )
+        for worker_index, shard_ids in enumerate(groups)
+    ]
+
+    for worker in workers:
+        worker.start()
+
+    # The workers shut down cleanly on SIGTERM, so pass on any request to stop.
+    def _stop_workers(signal_number, frame):
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+
+    signal.signal(signal.SIGINT, _stop_workers)
+    signal.signal(signal.SIGTERM, _stop_workers)
+
+    for worker in workers:
+        worker.join()
+        if worker.exitcode != 0:
+            logger.error('Worker %s exited with status %s', worker.name, worker.exitcode)
+
+    if any(worker.exitcode != 0 for worker in workers):
+        sys.exit(1)
+
+
+def _run_worker(worker_index: int, shard_ids: List[int]):
+    # Each worker reads the same environment as the launcher.
+    _run_bot(Config.from_environ(), shard_ids, worker_index=worker_index)
+
+
+def _run_bot(config: Config, shard_ids: Optional[List[int]], *, worker_index: int = 0):
+    startup = StartupTimer()
+
+    with startup.phase('configure'):
+        configure_logging(config, tag=_shard_tag(shard_ids))
+        configure_tracing(config)
 
     logger.info(f'Starting Discord Fate Bot {dfb_version}...')
 
     async def _main():
-        database = await get_database(config)
-        bot = DiscordFateBot(config, database)
-        await bot.run()
+        metrics_runner = None
+        if config.metrics.port:
+            # Each worker needs a port of its own.
+            metrics_runner = await startup.time('start metrics server', start_metrics_server(
+                REGISTRY,
+                config.metrics.host,
+                config.metrics.port + worker_index,
+            ))
+
+        scene_store = await startup.time('create storage', get_scene_store(config))
+        try:
+            with startup.phase('create bot'):
+                bot = create_bot(config, scene_store, shard_ids, startup=startup)
+            await bot.run()
+        finally:
+            await scene_store.close()
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
+            close_tracing()
 
     aiorun.run(_main(), stop_on_unhandled_errors=True)
 
+
+def _shard_tag(shard_ids: Optional[List[int]]) -> str:
+    if shard_ids is None:
+        return ''
+    if len(shard_ids) == 1:
+        return f'shard {shard_ids[0]}'
+    return 'shards ' + ','.join(map(str, shard_ids))
+
+
+def migrate():
+    """Upgrade every stored document to the current schema version."""
+    # The bot doesn't need this until it loads its extensions, which it does
+    # off the event loop, so don't import it up front.
+    from .scenes import Scene
+
+    config = Config.from_environ()
+    configure_logging(config)
+
+    logger.info(f'Migrating Discord Fate Bot {dfb_version} documents...')
+
+    async def _migrate():
+        scene_store = await get_scene_store(config)
+        try:
+            await scene_store.open()
+            count = await scene_store.migrate(Scene)
+        finally:
+            await scene_store.close()
+        logger.info('Migrated %d scenes to version %d', count, Scene.schema_version)
+
+    asyncio.run(_migrate())
+
+
+def rebuild_stats():
+    """Recompute the roll stats from the roll history."""
+    from .stats import rebuild_stats as _rebuild_stats
+
+    config = Config.from_environ()
+    configure_logging(config)
+
+    logger.info(f'Rebuilding Discord Fate Bot {dfb_version} roll stats...')
+
+    async def _rebuild():
+        scene_store = await get_scene_store(config)
+        try:
+            await scene_store.open()
+            written = await _rebuild_stats(scene_store.roll_store())
+        finally:
+            await scene_store.close()
+        for scope, count in written.items():
+            logger.info('Rebuilt the roll stats of %d %ss', count, scope)
+
+    asyncio.run(_rebuild())
+
+
+def sim(argv=None):
+    """Simulate Fate rolls and contests, e.g., to balance encounters."""
+    from .dice import Outcome
+    from .simulator import INVOKE_MODES, ContestScenario, RollScenario, Side, format_histograms, simulate
+
+    parser = argparse.ArgumentParser(
+        prog='discord-fate-bot-sim',
+        description='Simulate Fate rolls and contests, with invokes and boosts.',
+    )
+    parser.add_argument(
+        '-n', '--trials', type=int, default=1_000_000,
+        help='Number of rolls or contests to simulate (default: 1000000)',
+    )
+    parser.add_argument(
+        '-p', '--processes', type=int, default=os.cpu_count() or 1,
+        help='Number of worker processes (default: one per CPU)',
+    )
+    parser.add_argument(
+        '-s', '--seed', type=int,
+        help='Seed for reproducible results (default: random)',
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=1_000_000,
+        help='Trials per unit of work given to a worker (default: 1000000)',
+    )
+    parser.add_argument(
+        '-o', '--output', metavar='FILE',
+        help='Write the histograms to FILE as JSON',
+    )
+    parser.add_argument(
+        '--invoke-mode', choices=INVOKE_MODES, default='plus2',
+        help='How invokes and boosts are spent: always +2, or reroll dice showing less than 0 (default: plus2)',
+    )
+    parser.add_argument(
+        '--invokes', type=int, default=0,
+        help="Invokes the player can pay for (default: 0)",
+    )
+    parser.add_argument(
+        '--boosts', type=int, default=0,
+        help="Free invokes the player has, spent before paid ones (default: 0)",
+    )
+
+    scenarios = parser.add_subparsers(dest='scenario', required=True)
+
+    roll_parser = scenarios.add_parser(
+        'roll',
+        help='A single roll, against static or active opposition',
+    )
+    roll_parser.add_argument(
+        'modifiers', nargs='*', type=int, metavar='MODIFIER',
+        help="The player's modifiers, e.g., +2 -1",
+    )
+    roll_parser.add_argument(
+        '--vs', type=int, default=0, metavar='OPPOSITION',
+        help='Static opposition (default: 0)',
+    )
+    roll_parser.add_argument(
+        '--opponent', nargs='*', type=int, metavar='MODIFIER',
+        help="Roll active opposition with these modifiers (added to any static opposition)",
+    )
+    roll_parser.add_argument(
+        '--target', choices=('tie', 'success', 'style'), default='success',
+        help='The outcome the player invokes to reach (default: success)',
+    )
+
+    contest_parser = scenarios.add_parser(
+        'contest',
+        help='Exchanges of opposed rolls, until one side has enough victories',
+    )
+    contest_parser.add_argument(
+        'modifiers', nargs='*', type=int, metavar='MODIFIER',
+        help="The player's modifiers, e.g., +2 -1",
+    )
+    contest_parser.add_argument(
+        '--opponent', nargs='*', type=int, default=[], metavar='MODIFIER',
+        help="The opponent's modifiers",
+    )
+    contest_parser.add_argument(
+        '--opponent-invokes', type=int, default=0,
+        help='Invokes the opponent can pay for (default: 0)',
+    )
+    contest_parser.add_argument(
+        '--opponent-boosts', type=int, default=0,
+        help='Free invokes the opponent has (default: 0)',
+    )
+    contest_parser.add_argument(
+        '--victories', type=int, default=3,
+        help='Victories needed to win (default: 3)',
+    )
+    contest_parser.add_argument(
+        '--max-exchanges', type=int, default=20,
+        help='Exchanges after which a contest counts as undecided (default: 20)',
+    )
+
+    args = parser.parse_args(argv)
+
+    player = Side(
+        modifiers=tuple(args.modifiers),
+        invokes=args.invokes,
+        boosts=args.boosts,
+        invoke_mode=args.invoke_mode,
+    )
+
+    if args.scenario == 'roll':
+        scenario = RollScenario(
+            player=player,
+            opposition=args.vs,
+            opponent=None if args.opponent is None else Side(modifiers=tuple(args.opponent)),
+            target={
+                'tie': Outcome.TIE,
+                'success': Outcome.SUCCESS,
+                'style': Outcome.SUCCESS_WITH_STYLE,
+            }[args.target],
+        )
+    else:
+        scenario = ContestScenario(
+            player=player,
+            opponent=Side(
+                modifiers=tuple(args.opponent),
+                invokes=args.opponent_invokes,
+                boosts=args.opponent_boosts,
+                invoke_mode=args.invoke_mode,
+            ),
+            victories=args.victories,
+            max_exchanges=args.max_exchanges,
+        )
+
+    done = 0
+    def _report_progress(size):
+        nonlocal done
+        done += size
+        if sys.stderr.isatty():
+            print(f'\r{done:,} / {args.trials:,}', end='', file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    histograms = simulate(
+        scenario,
+        args.trials,
+        seed=args.seed,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        on_chunk=_report_progress,
+    )
+    elapsed = time.perf_counter() - start
+
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+
+    print(f'{args.trials:,} trials in {elapsed:.1f}s\n')
+    print(format_histograms(histograms, args.trials))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(
+                {
+                    'trials': args.trials,
+                    'seed': args.seed,
+                    'histograms': {
+                        name: {str(int(key)) if isinstance(key, int) else key: count for key, count in histogram.items()}
+                        for name, histogram in histograms.items()
+                    },
+                },
+                file, indent=2, sort_keys=True,
+            )
@@ -1,68 +1,115 @@
+import logging
+import sys
+
 from abc import ABC, abstractmethod
-from bson.objectid import ObjectId
 from dataclasses import dataclass, field
 from mashumaro import DataClassDictMixin
 from mashumaro.types import SerializationStrategy
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from typing import Dict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Type
 
 from .config import Config
 
-async def get_database(config: Config) -> AsyncIOMotorDatabase:
+# Motor, PyMongo, and BSON are slow to import, and only needed with the mongo
+# storage backend, so they're imported where they're used.
+if TYPE_CHECKING:
+    from bson.objectid import ObjectId
+    from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+
+logger = logging.getLogger(__name__)
+
+async def get_database(config: Config) -> 'AsyncIOMotorDatabase':
+    from motor.motor_asyncio import AsyncIOMotorClient
+
     connection_url = config.mongo.connection_url
+    if connection_url is None:
+        raise ValueError('DFB_MONGO_CONNECTION_URL is required for the mongo storage backend')
+
     password = await config.mongo.read_password()
     client = AsyncIOMotorClient(connection_url, password=password)
-    database = client.discord_fate_bot
-
-    # TODO: We should probably do this somewhere more convenient.
-    await database.scenes.create_index(
-        'channel_id',
-        name='ix__scenes__channel_id',
-        unique=True,
-    )
-
-    return database
+    return client.discord_fate_bot
 
 
 class SerializableObjectId(SerializationStrategy):
-    def _serialize(self, value: ObjectId) -> ObjectId:
+    def _serialize(self, value: 'ObjectId') -> 'ObjectId':
         return value
 
-    def _deserialize(self, value: ObjectId) -> ObjectId:
+    def _deserialize(self, value: 'ObjectId') -> 'ObjectId':
         return value
 
 class SubDocument(ABC, DataClassDictMixin):
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
 
+        # A class annotated with ObjectId must have imported BSON already.
+        objectid_module = sys.modules.get('bson.objectid')
+        if objectid_module is None:
+            return
+
         annotations_dict = getattr(cls, '__annotations__', {})
 
         for attr in annotations_dict:
-            if attr == ObjectId:
+            if attr == objectid_module.ObjectId:
                 annotations_dict[attr] = SerializableObjectId()
 
+class SchemaVersionError(Exception):
+    """Exception indicating that a stored document can't be upgraded to the
+    current schema version.
+    """
+
+    version: Optional[int]
+
+    def __init__(self, message, version):
+        super().__init__(message)
+        self.version = version
+
+
+def migration(from_version: Optional[int]):
+    """Declare a method of a Document subclass as the upgrade from the given
+    schema version to the next one.
+
+    The method is called with the stored dict (as a static method) and should
+    return the upgraded dict. It doesn't need to set '_v'. Migrations from
+    successive versions are chained until the document reaches the current
+    version. A from_version of None upgrades documents with no '_v' at all.
+    """
+    def _decorator(function: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        function._migrates_from = from_version
+        return staticmethod(function)
+    return _decorator
+
+
 @dataclass
 class Document(SubDocument):
+    schema_version = None
+
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
 
         current_version = kwargs['version']
+        cls.schema_version = current_version
+
+        # Collect the migrations declared on this class (with @migration),
+        # keyed by the version they upgrade from.
+        cls._migrations = {}
+        for attr in cls.__dict__.values():
+            function = getattr(attr, '__func__', attr)
+            if hasattr(function, '_migrates_from'):
+                cls._migrations[function._migrates_from] = function
 
         orig_to_dict = getattr(cls, 'to_dict')
         orig_from_dict = getattr(cls, 'from_dict')
 
         def to_dict(self, *args, **kwargs):
-            doc_dict = orig_to_dict(self, *args, **kwargs)
+            doc_dict = type(self).encode_dict(orig_to_dict(self, *args, **kwargs))
             if '_v' not in doc_dict:
                 doc_dict['_v'] = current_version
             return doc_dict
 
         @classmethod
         def from_dict(cls, data, *args, **kwargs):
-            version = data.get('_v', None)
-            if version != current_version:
-                return cls.from_old_dict(data, version)
-            return orig_from_dict(data, *args, **kwargs)
+            if data.get('_v', None) != current_version:
+                data = cls.migrate_dict(data)
+            return orig_from_dict(cls.decode_dict(data), *args, **kwargs)
 
         to_dict.__doc__ = orig_to_dict.__doc__
         from_dict.__doc__ = orig_from_dict.__doc__
@@ -71,6 +118,88 @@ class Document(SubDocument):
         setattr(cls, 'from_dict', from_dict)
 
     @classmethod
-    def from_old_dict(cls, version):
-        raise NotImplementedError
+    def encode_dict(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert the dataclass's dict form to the form it is stored in.
+
+        By default these are the same. Subclasses whose stored form differs
+        (e.g., to save space) override this along with decode_dict.
+        """
+        return data
+
+    @classmethod
+    def decode_dict(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a stored dict at the current version to the dataclass's dict
+        form. This is the inverse of encode_dict.
+        """
+        return data
+
+    @classmethod
+    def needs_migration(cls, data: Dict[str, Any]) -> bool:
+        return data.get('_v', None) != cls.schema_version
+
+    @classmethod
+    def migrate_dict(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Upgrade a stored dict to the current schema version by running it
+        through the chain of migrations.
+        """
+        version = data.get('_v', None)
+        data = dict(data)
+
+        while version != cls.schema_version:
+            try:
+                upgrade = cls._migrations[version]
+            except KeyError:
+                raise SchemaVersionError(
+                    f'No migration for {cls.__name__} from version {version} '
+                    f'to version {cls.schema_version}',
+                    version
+                )
+
+            data = upgrade(data)
+            version = 1 if version is None else version + 1
+            data['_v'] = version
+
+        return data
+
+
+async def migrate_collection(
+        collection: 'AsyncIOMotorCollection',
+        document_class: Type[Document],
+        *,
+        batch_size: int = 1000) -> int:
+    """Upgrade every document in the collection that isn't at the current
+    schema version, returning how many were upgraded.
+
+    Documents are streamed from the collection and written back in batches
+    with bulk_write. Each write only applies if the document is still at the
+    version it was read at, so this is safe to run while the bot is up.
+    """
+    from pymongo import ReplaceOne
+
+    current_version = document_class.schema_version
+    migrated_count = 0
+    requests = []
+
+    async def _flush():
+        nonlocal migrated_count, requests
+        if requests:
+            result = await collection.bulk_write(requests, ordered=False)
+            migrated_count += result.modified_count
+            logger.info('Migrated %d %s documents', migrated_count, document_class.__name__)
+            requests = []
+
+    cursor = collection.find(
+        {'_v': {'$ne': current_version}},
+        batch_size=batch_size
+    )
+
+    async for data in cursor:
+        migrated = document_class.migrate_dict(data)
+        requests.append(ReplaceOne({'_id': data['_id'], '_v': data.get('_v')}, migrated))
+
+        if len(requests) >= batch_size:
+            await _flush()
+
+    await _flush()
 
+    return migrated_count
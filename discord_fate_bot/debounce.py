@@ -0,0 +1,110 @@
+import asyncio
+import logging
+
+from asyncio import Task
+from typing import AsyncContextManager, Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar('K', bound=Hashable)
+T = TypeVar('T')
+
+class Debouncer(Generic[K, T]):
+    """Coalesce repeated flush requests per key into at most one flush per
+    interval.
+
+    Callers mark a key dirty with a target (e.g., the channel to render into).
+    The first mark after a quiet period is flushed as soon as possible, and any
+    further marks within the interval are collapsed into a single flush of the
+    latest target at the end of the interval.
+
+    Background flushes hold the lock returned by lock_for(key) while they run.
+    Explicit calls to flush expect the caller to already hold that lock.
+    """
+
+    interval: float
+
+    def __init__(
+            self,
+            interval: float,
+            flush: Callable[[T], Awaitable[None]],
+            lock_for: Callable[[K], AsyncContextManager]):
+        self.interval = interval
+
+        self._flush = flush
+        self._lock_for = lock_for
+        self._dirty: Dict[K, T] = {}
+        self._last_flushed: Dict[K, float] = {}
+        self._tasks: Dict[K, Task] = {}
+
+    def mark_dirty(self, key: K, target: T):
+        """Request a flush for the key, replacing any pending target."""
+        self._dirty[key] = target
+
+        if key in self._tasks:
+            return
+
+        loop = asyncio.get_event_loop()
+        last_flushed = self._last_flushed.get(key)
+
+        if last_flushed is None:
+            delay = 0
+        else:
+            delay = max(0, last_flushed + self.interval - loop.time())
+
+        self._tasks[key] = loop.create_task(self._flush_later(key, delay))
+
+    async def flush(self, key: K):
+        """Flush the key immediately if it is dirty.
+
+        The caller must hold the lock for the key.
+        """
+        self._cancel_task(key)
+        await self._flush_now(key)
+
+    async def flush_all(self):
+        """Flush every dirty key immediately, e.g., on shutdown."""
+        async def _flush_locked(key):
+            self._cancel_task(key)
+            async with self._lock_for(key):
+                await self._flush_now(key)
+
+        await asyncio.gather(*(
+            _flush_locked(key)
+            for key in list(self._dirty)
+        ))
+
+    def discard(self, key: K):
+        """Forget any pending flush for the key without running it."""
+        self._cancel_task(key)
+        self._dirty.pop(key, None)
+        self._last_flushed.pop(key, None)
+
+    def _cancel_task(self, key: K):
+        task = self._tasks.pop(key, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+    async def _flush_later(self, key: K, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+
+        async with self._lock_for(key):
+            # We may have been superseded by an explicit flush while waiting for
+            # the lock, in which case there's nothing left to do.
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+                await self._flush_now(key)
+
+    async def _flush_now(self, key: K):
+        try:
+            target = self._dirty.pop(key)
+        except KeyError:
+            return
+
+        self._last_flushed[key] = asyncio.get_event_loop().time()
+
+        try:
+            await self._flush(target)
+        except Exception:
+            logger.exception('Error flushing %s', key)
@@ -1,26 +1,76 @@
-import random
-
-from dataclasses import dataclass, field, replace
-from functools import total_ordering
-from typing import Sequence
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Dict, List, Optional, Sequence, Tuple
 
+from .rng import DEFAULT_RNG, DiceRng
 from .util import join_as_columns
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 FATE_DIE_POOL_SIZE = 4
 
+# The minimum number of shifts needed to succeed with style.
+STYLE_SHIFTS = 3
+
+# The most face combinations a die pool will memoize renderings for. This covers
+# every combination for 4dF (81) with plenty of room to spare.
+MAX_MEMOIZED_RENDERINGS = 4096
+
 
-@dataclass(eq=True, order=False)
-@total_ordering
 class Value:
-    raw_value: int = field(compare=True)
-    hide_plus: bool = field(default=False, compare=False)
-    show_space: bool = field(default=False, compare=False)
+    """A signed number of shifts, as shown in roll output.
+
+    Values are immutable, and plain values in a small range around zero are
+    interned, so arithmetic on them doesn't allocate. Each value also caches
+    its formatted string and its no_plus/with_space variants.
+
+    Only raw_value takes part in comparisons. Values can be ordered against ints
+    as well as other values.
+    """
+
+    __slots__ = ('raw_value', 'hide_plus', 'show_space', '_str', '_no_plus', '_with_space')
+
+    raw_value: int
+    hide_plus: bool
+    show_space: bool
+
+    def __new__(cls, raw_value: int, hide_plus: bool = False, show_space: bool = False):
+        if cls is Value and not hide_plus and not show_space:
+            interned = _INTERNED_VALUES.get(raw_value)
+            if interned is not None:
+                return interned
+
+        return cls._create(raw_value, hide_plus, show_space)
+
+    @classmethod
+    def _create(cls, raw_value, hide_plus, show_space):
+        value = object.__new__(cls)
+        object.__setattr__(value, 'raw_value', raw_value)
+        object.__setattr__(value, 'hide_plus', hide_plus)
+        object.__setattr__(value, 'show_space', show_space)
+        object.__setattr__(value, '_str', None)
+        object.__setattr__(value, '_no_plus', None)
+        object.__setattr__(value, '_with_space', None)
+        return value
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self):
+        return (type(self), (self.raw_value, self.hide_plus, self.show_space))
 
     def no_plus(self):
-        return replace(self, hide_plus=True)
+        if self._no_plus is None:
+            object.__setattr__(self, '_no_plus', Value._create(self.raw_value, True, self.show_space))
+        return self._no_plus
 
     def with_space(self):
-        return replace(self, show_space=True)
+        if self._with_space is None:
+            object.__setattr__(self, '_with_space', Value._create(self.raw_value, self.hide_plus, True))
+        return self._with_space
 
     def __add__(self, other):
         if isinstance(other, Value):
@@ -50,28 +100,96 @@ class Value:
             return Value(other - self.raw_value)
         return NotImplemented
 
-    def __lt__(self, other):
+    def __eq__(self, other):
         if isinstance(other, Value):
-            return self.raw_value < other.raw_value
-        elif isinstance(other, int):
-            return self.raw_value < other
+            return self.raw_value == other.raw_value
         return NotImplemented
 
-    def __str__(self):
-        output = ''
+    def __hash__(self):
+        return hash(self.raw_value)
 
-        if self.raw_value >= 0:
-            if not self.hide_plus:
-                output += '+'
+    def __lt__(self, other):
+        other_raw_value = _comparable_raw_value(other)
+        if other_raw_value is None:
+            return NotImplemented
+        return self.raw_value < other_raw_value
+
+    def __le__(self, other):
+        other_raw_value = _comparable_raw_value(other)
+        if other_raw_value is None:
+            return NotImplemented
+        return self.raw_value <= other_raw_value
+
+    def __gt__(self, other):
+        other_raw_value = _comparable_raw_value(other)
+        if other_raw_value is None:
+            return NotImplemented
+        return self.raw_value > other_raw_value
+
+    def __ge__(self, other):
+        other_raw_value = _comparable_raw_value(other)
+        if other_raw_value is None:
+            return NotImplemented
+        return self.raw_value >= other_raw_value
+
+    def __repr__(self):
+        return (
+            f'Value(raw_value={self.raw_value!r}, '
+            f'hide_plus={self.hide_plus!r}, show_space={self.show_space!r})'
+        )
+
+    def __str__(self):
+        if self._str is None:
+            output = ''
+
+            if self.raw_value >= 0:
+                if not self.hide_plus:
+                    output += '+'
+                    if self.show_space:
+                        output += ' '
+            else:
+                output += '−'
                 if self.show_space:
                     output += ' '
-        else:
-            output += '−'
-            if self.show_space:
-                output += ' '
 
-        output += str(abs(self.raw_value))
-        return output
+            output += str(abs(self.raw_value))
+            object.__setattr__(self, '_str', output)
+
+        return self._str
+
+def _comparable_raw_value(other):
+    if isinstance(other, Value):
+        return other.raw_value
+    elif isinstance(other, int):
+        return other
+    return None
+
+# Plain values that commonly turn up in rolls, shared so that arithmetic on them
+# doesn't need to allocate.
+_INTERNED_VALUES: Dict[int, Value] = {
+    raw_value: Value._create(raw_value, False, False)
+    for raw_value in range(-64, 65)
+}
+
+class Outcome(IntEnum):
+    FAIL = 0
+    TIE = 1
+    SUCCESS = 2
+    SUCCESS_WITH_STYLE = 3
+
+def outcome_for(shifts: int) -> Outcome:
+    """Categorize the result of a roll by its shifts vs opposition."""
+    # Each comparison contributes one step up the scale. The same formula works
+    # elementwise on whole arrays of shifts (see outcomes_for).
+    return Outcome((shifts > 0) + (shifts >= 0) + (shifts >= STYLE_SHIFTS))
+
+def outcomes_for(shifts):
+    """Categorize a NumPy array of shifts, giving an array of Outcome values."""
+    return (
+        (shifts > 0).astype(numpy.int8)
+        + (shifts >= 0)
+        + (shifts >= STYLE_SHIFTS)
+    )
 
 @dataclass
 class RollContext:
@@ -102,22 +220,64 @@ class DieFace:
 class Die:
     faces: Sequence[DieFace]
 
-    def roll(self) -> DieFace:
-        return random.choice(self.faces)
+    def roll(self, rng: DiceRng = None) -> DieFace:
+        return self.faces[self.roll_index(rng)]
+
+    def roll_index(self, rng: DiceRng = None) -> int:
+        """Roll the die, returning the index of the face rolled."""
+        return (rng or DEFAULT_RNG).index(len(self.faces))
+
+@dataclass
+class RollRendering:
+    """The parts of a roll's output that depend only on the faces rolled."""
+
+    dice_display: str
+    dice_total: Value
+    dice_total_explanation: str
+
+    @classmethod
+    def for_faces(cls, faces: Sequence[DieFace]) -> 'RollRendering':
+        dice_total = sum(face.value for face in faces)
+        return cls(
+            dice_display = join_as_columns(faces),
+            dice_total = dice_total,
+            dice_total_explanation = f'You rolled  \\[{dice_total.no_plus()}\\]',
+        )
 
 @dataclass
 class Roll:
     faces: Sequence[DieFace]
     context: RollContext
+    rendering: Optional[RollRendering] = field(default=None, compare=False, repr=False)
+
+    # The total and result, computed the first time either is needed.
+    _totals: Optional[Tuple[Value, Value]] = field(
+        default=None, init=False, compare=False, repr=False
+    )
+
+    def _rendering(self) -> RollRendering:
+        if self.rendering is None:
+            self.rendering = RollRendering.for_faces(self.faces)
+        return self.rendering
+
+    def _compute_totals(self) -> Tuple[Value, Value]:
+        if self._totals is None:
+            total = self.dice_total() + self.context.total_modifier()
+            result = total - self.context.total_opposition()
+            self._totals = (total, result)
+        return self._totals
 
     def dice_total(self):
-        return sum(face.value for face in self.faces)
+        return self._rendering().dice_total
 
     def total(self):
-        return sum(face.value for face in self.faces) + self.context.total_modifier()
+        return self._compute_totals()[0]
 
     def result(self):
-        return self.total() - self.context.total_opposition()
+        return self._compute_totals()[1]
+
+    def outcome(self) -> Outcome:
+        return outcome_for(self.result().raw_value)
 
     def description(self):
         shifts = self.result()
@@ -125,20 +285,22 @@ class Roll:
         if self.context.opposition is None:
             return f'You generated **{shifts}** shifts.'
 
-        if shifts >= 3:
+        outcome = self.outcome()
+
+        if outcome == Outcome.SUCCESS_WITH_STYLE:
             return f'You **succeeded with style** with **{shifts}** shifts!'
-        elif shifts > 0:
+        elif outcome == Outcome.SUCCESS:
             return f'You **succeeded** with **{shifts}** shifts.'
-        elif shifts < 0:
+        elif outcome == Outcome.FAIL:
             return f'You **failed** with **{shifts}** shifts.'
         else:
             return "You **tied**."
 
     def dice_display(self):
-        return join_as_columns(self.faces)
+        return self._rendering().dice_display
 
     def explanation(self):
-        explanation_str = f'You rolled  \[{self.dice_total().no_plus()}\]'
+        explanation_str = self._rendering().dice_total_explanation
 
         if self.context.modifiers:
             explanation_str += f' {self.context.total_modifier().with_space()}'
@@ -154,10 +316,178 @@ class Roll:
 
 @dataclass
 class DiePool:
+    """Some dice, rolled together.
+
+    Rolls use the generator passed in, or else the pool's own generator (if it
+    has one), or else the shared default.
+    """
+
     dice: Sequence[Die]
 
-    def roll(self, context: RollContext) -> Roll:
-        return Roll(tuple(die.roll() for die in self.dice), context)
+    _renderings: Dict[Tuple[int, ...], RollRendering] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    rng: Optional[DiceRng] = field(default=None, repr=False, compare=False)
+
+    def roll(self, context: RollContext, *, rng: DiceRng = None) -> Roll:
+        rng = rng or self.rng or DEFAULT_RNG
+        return self.roll_for_indices(
+            tuple(rng.index(len(die.faces)) for die in self.dice),
+            context
+        )
+
+    def roll_for_indices(self, face_indices: Sequence[int], context: RollContext) -> Roll:
+        """Build the roll with the given face index for each die."""
+        face_indices = tuple(face_indices)
+
+        faces = tuple(
+            die.faces[index]
+            for die, index in zip(self.dice, face_indices)
+        )
+
+        return Roll(faces, context, self._rendering_for(face_indices, faces))
+
+    def _rendering_for(self, face_indices: Tuple[int, ...], faces) -> RollRendering:
+        try:
+            return self._renderings[face_indices]
+        except KeyError:
+            pass
+
+        rendering = RollRendering.for_faces(faces)
+
+        if len(self._renderings) < MAX_MEMOIZED_RENDERINGS:
+            self._renderings[face_indices] = rendering
+
+        return rendering
+
+    def roll_many(
+            self,
+            n: int,
+            context: RollContext,
+            *,
+            vectorized: bool = None,
+            rng: DiceRng = None) -> 'RollBatch':
+        """Roll the pool n times at once.
+
+        The rolls are kept as face indices in a compact integer array, and Roll
+        objects are only built on request. If vectorized is true (the default
+        when NumPy is installed), the array is a NumPy array.
+        """
+        if vectorized is None:
+            vectorized = numpy is not None
+
+        rng = rng or self.rng or DEFAULT_RNG
+
+        if vectorized:
+            if numpy is None:
+                raise RuntimeError('Vectorized rolling requires NumPy')
+
+            face_indices = numpy.column_stack([
+                rng.index_array(len(die.faces), n)
+                for die in self.dice
+            ]) if self.dice else numpy.zeros((n, 0), dtype=numpy.uint8)
+        else:
+            face_indices = [
+                rng.indices(len(die.faces), n)
+                for die in self.dice
+            ]
+
+        return RollBatch(self, context, face_indices, n)
+
+class RollBatch:
+    """Many rolls of the same pool in the same context.
+
+    Totals, results, and outcomes are computed for the whole batch at once and
+    returned as NumPy arrays (for a vectorized batch) or lists of ints.
+    """
+
+    pool: DiePool
+    context: RollContext
+
+    def __init__(self, pool: DiePool, context: RollContext, face_indices, n: int):
+        self.pool = pool
+        self.context = context
+
+        # Either an (n, dice) NumPy array, or one array of length n per die.
+        self._face_indices = face_indices
+        self._n = n
+
+        self._vectorized = numpy is not None and isinstance(face_indices, numpy.ndarray)
+        self._dice_totals = None
+
+    def __len__(self):
+        return self._n
+
+    def dice_totals(self):
+        if self._dice_totals is None:
+            face_values = [
+                [face.value.raw_value for face in die.faces]
+                for die in self.pool.dice
+            ]
+
+            if self._vectorized:
+                totals = numpy.zeros(self._n, dtype=numpy.int32)
+                for column, values in enumerate(face_values):
+                    totals += numpy.array(values, dtype=numpy.int32)[self._face_indices[:, column]]
+            else:
+                totals = [0] * self._n
+                for indices, values in zip(self._face_indices, face_values):
+                    totals = [
+                        total + values[index]
+                        for total, index in zip(totals, indices)
+                    ]
+
+            self._dice_totals = totals
+
+        return self._dice_totals
+
+    def totals(self):
+        return self._offset(self.context.total_modifier().raw_value)
+
+    def results(self):
+        return self._offset(
+            self.context.total_modifier().raw_value
+            - self.context.total_opposition().raw_value
+        )
+
+    def outcomes(self):
+        """The outcome of each roll, as Outcome values (see outcome_for)."""
+        results = self.results()
+
+        if self._vectorized:
+            return outcomes_for(results)
+
+        return [outcome_for(result) for result in results]
+
+    def outcome_counts(self) -> Dict[Outcome, int]:
+        outcomes = self.outcomes()
+
+        if self._vectorized:
+            counts = numpy.bincount(outcomes, minlength=len(Outcome))
+        else:
+            counts = [0] * len(Outcome)
+            for outcome in outcomes:
+                counts[outcome] += 1
+
+        return {outcome: int(counts[outcome]) for outcome in Outcome}
+
+    def roll(self, i: int) -> Roll:
+        """Build the Roll object for the i-th roll in the batch."""
+        if self._vectorized:
+            indices = (int(index) for index in self._face_indices[i])
+        else:
+            indices = (column[i] for column in self._face_indices)
+
+        return self.pool.roll_for_indices(indices, self.context)
+
+    def _offset(self, offset: int):
+        dice_totals = self.dice_totals()
+
+        if self._vectorized:
+            return dice_totals + offset
+
+        return [total + offset for total in dice_totals]
 
 
 class FateDie(Die):
@@ -171,6 +501,6 @@ class FateDie(Die):
         )
 
 class FateDiePool(DiePool):
-    def __init__(self, size: int = FATE_DIE_POOL_SIZE):
-        super().__init__(tuple(FateDie() for _ in range(size)))
+    def __init__(self, size: int = FATE_DIE_POOL_SIZE, *, rng: DiceRng = None):
+        super().__init__(tuple(FateDie() for _ in range(size)), rng=rng)
 
@@ -4,6 +4,7 @@ from discord import Message
 
 SCENE_EMOJI = '\N{Clapper Board}'
 ROLL_EMOJI = '\N{Game Die}'
+STATS_EMOJI = '\N{Bar Chart}'
 
 ERROR_EMOJIS = [
     '\N{Confounded Face}',
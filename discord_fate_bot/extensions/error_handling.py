@@ -4,18 +4,26 @@ import textwrap
 from discord.ext.commands import (
     CheckFailure, Cog, CommandNotFound, CommandInvokeError, UserInputError
 )
+from functools import lru_cache, partial
+from typing import Optional
 
-from ..emojis import random_error_emoji
+from ..emojis import random_error_emoji, react_error
+from ..outbound import send_response
 from ..scenes import AspectIdError, NoCurrentSceneError
+from ..throttle import ErrorThrottle
 from ..util import ValidationError
 
 logger = logging.getLogger(__name__)
 
 def setup(bot):
-    bot.add_cog(ErrorHandlingCog())
+    bot.add_cog(ErrorHandlingCog(bot))
 
 
 class ErrorHandlingCog(Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.throttle = ErrorThrottle.from_config(bot.config)
+
     @Cog.listener()
     async def on_command_error(self, ctx, error):
         try:
@@ -30,35 +38,35 @@ class ErrorHandlingCog(Cog):
                     f"Sorry, there's no aspect in the current scene with id " \
                     f"{error.aspect_id}."
                 )
-                await send_error_message(ctx, message)
+                await self._send_error_message(ctx, error, message)
             elif isinstance(error, CommandNotFound) or isinstance(error, UserInputError):
                 message = (
                     f"Sorry, I didn't understand:\n\n" \
                     f"{quote(ctx.message)}\n\n" \
                     f"{punctuate(error)}"
                 )
-                await send_error_message(ctx, message, help_separator=' ')
+                await self._send_error_message(ctx, error, message, help_separator=' ')
             elif isinstance(error, CheckFailure):
                 message = (
                     f"Sorry, that command cannot be used right now. {punctuate(error)}"
                 )
-                await send_error_message(ctx, message)
+                await self._send_error_message(ctx, error, message)
             elif isinstance(error, NoCurrentSceneError):
                 message = (
                     f"Sorry, there's no current scene in this channel. You can " \
                     f"start a new scene using **!scene new**."
                 )
-                await send_error_message(ctx, message)
+                await self._send_error_message(ctx, error, message)
             elif isinstance(error, ValidationError):
                 message = f"{error}:\n\n"
                 message += '\n'.join(
                     f'    •  {complaint}'
                     for complaint in error.complaints
                 )
-                await send_error_message(ctx, message)
+                await self._send_error_message(ctx, error, message)
             else:
                 message = f"Sorry, something unexpected went wrong."
-                await send_error_message(ctx, message)
+                await self._send_error_message(ctx, error, message)
                 raise original_error
         except Exception as ex:
             # This whole method is basically a catch clause, but we don't get
@@ -70,27 +78,49 @@ class ErrorHandlingCog(Cog):
                 raise original_error
             raise ex from original_error
 
-async def send_error_message(ctx, message, *, help_separator='\n\n'):
-    """Send an error message with our standard boilerplate."""
-    emoji = random_error_emoji()
+    async def _send_error_message(self, ctx, error, message, **kwargs):
+        decision = self.throttle.check(ctx.channel.id, ctx.author.id, error)
 
-    if ctx.command:
-        help_command = '!help ' + ctx.command.qualified_name
-    else:
-        help_command = '!help'
+        if decision.react:
+            # Nobody is waiting on the reaction, so don't hold anything up.
+            self.bot.outbound.defer(ctx.channel.id, partial(react_error, ctx.message))
+        if decision.send:
+            await send_error_message(ctx, message, suppressed=decision.suppressed, **kwargs)
+
+async def send_error_message(ctx, message, *, help_separator='\n\n', suppressed=0):
+    """Send an error message with our standard boilerplate, noting how many
+    more like it were suppressed (see ErrorThrottle).
+    """
+    emoji = random_error_emoji()
+    command_name = ctx.command.qualified_name if ctx.command else None
 
     if ctx.guild:
         mention = f"{ctx.author.mention} "
-        dm_offer = f"(Feel free to DM that to {ctx.me.mention}.)"
+        dm_mention = ctx.me.mention
     else:
         mention = ""
-        dm_offer = ""
+        dm_mention = None
 
     final_message = (
         f"{emoji}  {mention}{message}{help_separator}" \
-        f"Try **{help_command}** for more information. {dm_offer}"
+        f"{boilerplate(command_name, dm_mention)}"
     )
-    await ctx.send(content=final_message)
+    if suppressed:
+        final_message += f"\n\n{suppressed_note(suppressed)}"
+    await send_response(ctx, final_message)
+
+@lru_cache(maxsize=256)
+def boilerplate(command_name: Optional[str], dm_mention: Optional[str]) -> str:
+    """The help suggestion (and, in a guild, DM offer) that ends an error
+    message.
+    """
+    help_command = f'!help {command_name}' if command_name else '!help'
+    dm_offer = f"(Feel free to DM that to {dm_mention}.)" if dm_mention else ""
+    return f"Try **{help_command}** for more information. {dm_offer}"
+
+def suppressed_note(suppressed: int) -> str:
+    errors = 'error' if suppressed == 1 else 'errors'
+    return f"_(I skipped replying to {suppressed} earlier {errors} like this one.)_"
 
 def quote(message):
     content = message.content
@@ -0,0 +1,69 @@
+import time
+
+from discord.ext.commands import Cog, CommandInvokeError
+
+from ..bot import DiscordFateBot
+from ..metrics import REGISTRY
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    'dfb_command_duration_seconds',
+    'Time spent running commands, not counting argument parsing or checks',
+    ['command'],
+)
+COMMAND_ERRORS = REGISTRY.counter(
+    'dfb_command_errors_total',
+    'Commands that ended in an error, by error type',
+    ['command', 'error'],
+)
+
+def setup(bot):
+    if not isinstance(bot, DiscordFateBot):
+        raise TypeError('Argument bot must be an instance of DiscordFateBot')
+    bot.add_cog(MetricsCog(bot))
+
+
+class MetricsCog(Cog):
+    """Record metrics for every command."""
+
+    def __init__(self, bot: DiscordFateBot):
+        self.bot = bot
+
+        # Cogs only get before and after hooks for their own commands, so hook
+        # in at the bot level instead.
+        bot.before_invoke(self._before_invoke)
+        bot.after_invoke(self._after_invoke)
+
+    def cog_unload(self):
+        # discord.py has no way to remove bot-level hooks, so clear them by
+        # hand, but only if they're still ours (another extension may have
+        # replaced them since).
+        if self.bot._before_invoke == self._before_invoke:
+            self.bot._before_invoke = None
+        if self.bot._after_invoke == self._after_invoke:
+            self.bot._after_invoke = None
+
+    @Cog.listener()
+    async def on_command_error(self, ctx, error):
+        # Commands wrap their exceptions with this one.
+        if isinstance(error, CommandInvokeError):
+            error = error.__cause__
+
+        COMMAND_ERRORS.inc(
+            command=_command_name(ctx),
+            error=type(error).__name__,
+        )
+
+    async def _before_invoke(self, ctx):
+        ctx.metrics_start_time = time.perf_counter()
+
+    async def _after_invoke(self, ctx):
+        COMMAND_SECONDS.observe(
+            time.perf_counter() - ctx.metrics_start_time,
+            command=_command_name(ctx),
+        )
+
+
+def _command_name(ctx) -> str:
+    if ctx.command is None:
+        return ''
+    return ctx.command.qualified_name
@@ -1,31 +1,65 @@
-from discord.ext.commands import BadArgument, Cog, Converter, Greedy, command
+import asyncio
+import logging
+import math
+import time
+
+from discord import User
+from discord.ext.commands import BadArgument, Cog, Converter, Greedy, command, group, guild_only
+from discord.utils import escape_markdown
 from typing import Optional
 
-from ..dice import FateDiePool, Roll, RollContext, Value
-from ..emojis import ROLL_EMOJI
+from ..bot import DiscordFateBot
+from ..dice import FateDiePool, Outcome, Roll, RollContext, Value
+from ..emojis import ROLL_EMOJI, STATS_EMOJI
+from ..history import RollHistoryWriter, RollRecord
+from ..odds import dice_total_distribution, outcome_probabilities
+from ..outbound import send_response
+from ..rng import ChannelRngs
+from ..stats import RollStats, find_stats
+
+logger = logging.getLogger(__name__)
 
 def setup(bot):
-    bot.add_cog(RollingCog())
+    if not isinstance(bot, DiscordFateBot):
+        raise TypeError('Argument bot must be an instance of DiscordFateBot')
+    bot.add_cog(RollingCog(bot))
 
 DICE_POOL = FateDiePool()
 
+OUTCOME_LABELS = {
+    Outcome.FAIL: 'Fail',
+    Outcome.TIE: 'Tie',
+    Outcome.SUCCESS: 'Succeed',
+    Outcome.SUCCESS_WITH_STYLE: 'Succeed with style',
+}
+
+#: Modifiers and opposition must be smaller than this either way, so that rolls
+#: can be stored (e.g., MongoDB can't store integers beyond 8 bytes).
+MAX_VALUE = 2 ** 31
+
 class Modifier(Converter):
     """A positive or negative roll modifier."""
     async def convert(self, ctx, argument):
         if argument[:1] not in ('+', '-'):
             raise BadArgument('A modifier must have format: {+|-}VALUE')
         try:
-            return Value(int(argument))
+            value = int(argument)
         except ValueError:
             raise BadArgument('A modifier must be a number')
+        if abs(value) >= MAX_VALUE:
+            raise BadArgument(f'A modifier must be between -{MAX_VALUE - 1} and +{MAX_VALUE - 1}')
+        return Value(value)
 
 class Opposition(Converter):
     """A numeric value."""
     async def convert(self, ctx, argument):
         try:
-            return Value(int(argument))
+            value = int(argument)
         except ValueError:
             raise BadArgument('Opposition must be a number')
+        if abs(value) >= MAX_VALUE:
+            raise BadArgument(f'Opposition must be between -{MAX_VALUE - 1} and {MAX_VALUE - 1}')
+        return Value(value)
 
 class OppositionSigil(Converter):
     """A separator."""
@@ -38,6 +72,45 @@ class OppositionSigil(Converter):
 class RollingCog(Cog, name = 'Rolling'):
     """Commands for rolling dice."""
 
+    bot: DiscordFateBot
+    rngs: ChannelRngs
+    roll_history: Optional[RollHistoryWriter]
+
+    def __init__(self, bot: DiscordFateBot):
+        self.bot = bot
+        self.rngs = ChannelRngs.from_config(bot.config)
+        self.roll_history = None
+
+        history_config = bot.config.roll_history
+        if history_config.enabled:
+            self.roll_history = RollHistoryWriter(
+                bot.scene_store.roll_store(),
+                batch_size=history_config.batch_size,
+                flush_interval=history_config.flush_interval,
+                max_pending=history_config.max_pending,
+            )
+            bot.shutdown_hooks.append(self.roll_history.close)
+
+    def cog_unload(self):
+        if self.roll_history is not None:
+            self.bot.shutdown_hooks.remove(self.roll_history.close)
+
+            # Don't lose whatever is still waiting to be written. Start writing
+            # it out now, but keep a shutdown hook for it until it's done, so
+            # the task is kept alive and the bot waits for it if it's stopping.
+            closing = asyncio.ensure_future(self.roll_history.close())
+
+            async def _wait_for_close():
+                await asyncio.wait([closing])
+
+            def _closed(task):
+                self.bot.shutdown_hooks.remove(_wait_for_close)
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error('Error closing the roll history', exc_info=task.exception())
+
+            self.bot.shutdown_hooks.append(_wait_for_close)
+            closing.add_done_callback(_closed)
+
     @command(aliases = ['r'], ignore_extra = False)
     async def roll(
             self, ctx,
@@ -81,11 +154,158 @@ class RollingCog(Cog, name = 'Rolling'):
             opposition = opposition
         )
 
-        roll = DICE_POOL.roll(context)
+        roll = DICE_POOL.roll(context, rng=self.rngs.for_channel(ctx.channel.id))
 
         message = f'{ROLL_EMOJI} {player.mention} \[{ctx.message.content}\]  {roll.description()}\n\n'
         message += f'```\n{roll.dice_display()}```\n'
         message += f'({roll.explanation()})'
 
-        await ctx.send(message)
+        await send_response(ctx, message)
+
+        # Only after replying, so the player never waits on the database. This
+        # only waits at all if the history has fallen far behind.
+        if self.roll_history is not None:
+            await self.roll_history.record(RollRecord.for_roll(
+                roll,
+                channel_id=ctx.channel.id,
+                guild_id=ctx.guild.id if ctx.guild is not None else None,
+                player_id=player.id,
+                rolled_at=time.time(),
+            ))
+
+
+    @command(ignore_extra = False)
+    async def odds(
+            self, ctx,
+            modifiers: Greedy[Modifier],
+            vs: OppositionSigil = None,
+            opposition: Opposition = None):
+        """Show the exact odds of each outcome for a roll.
+
+        This takes the same modifiers and opposition as !roll, but rather than
+        rolling, it reports how likely each result is. If no opposition is
+        given, the odds are against 0.
+
+        EXAMPLES
+
+          !odds +2 vs 3
+              The odds of rolling with a +2 modifier against an opposition of 3.
+        """
+        if vs is not None and opposition is None:
+            raise BadArgument('Found "vs" but no opposition')
+
+        context = RollContext(
+            modifiers = tuple(modifiers),
+            opposition = opposition
+        )
+
+        probabilities = outcome_probabilities(
+            DICE_POOL,
+            context.total_modifier(),
+            context.total_opposition()
+        )
+
+        message = f'{ROLL_EMOJI} Odds for \\[{ctx.message.content}\\]\n\n'
+        message += '\n'.join(
+            f'    •  {OUTCOME_LABELS[outcome]}:  **{float(probability):.1%}**'
+            for outcome, probability in probabilities.items()
+        )
+
+        await send_response(ctx, message)
+
+
+    @group(invoke_without_command = True, ignore_extra = False)
+    async def stats(self, ctx, player: User = None):
+        """Show how a player's rolls have gone, vs the exact odds.
+
+        Stats cover every roll recorded in the roll history: how many rolls
+        there were, how often each dice total came up, and how many of each
+        outcome there were, each next to what the exact odds of four Fate dice
+        would lead you to expect.
+
+        EXAMPLES
+
+          !stats
+              Your own stats.
+
+          !stats @Alice
+              Alice's stats.
+
+          !stats channel
+              Stats for everyone's rolls in this channel.
+
+          !stats guild
+              Stats for everyone's rolls in this server.
+        """
+        player = player or ctx.author
+        await self._send_stats(ctx, 'player', player.id, escape_markdown(player.display_name))
+
+    @stats.command(name = 'channel', ignore_extra = False)
+    async def stats_channel(self, ctx):
+        """Show how everyone's rolls in this channel have gone"""
+        await self._send_stats(ctx, 'channel', ctx.channel.id, 'this channel')
+
+    @stats.command(name = 'guild', aliases = ['server'], ignore_extra = False)
+    @guild_only()
+    async def stats_guild(self, ctx):
+        """Show how everyone's rolls in this server have gone"""
+        await self._send_stats(ctx, 'guild', ctx.guild.id, 'this server')
+
+    async def _send_stats(self, ctx, scope: str, key: int, name: str):
+        if self.roll_history is None:
+            await send_response(ctx, f"{STATS_EMOJI} Sorry, rolls aren't being recorded, so there are no stats.")
+            return
+
+        # Include any rolls still waiting to be written, e.g., the one the
+        # player just made.
+        await self.roll_history.flush()
+        stats = await find_stats(self.roll_history.store, scope, key)
+
+        if stats is None or not stats.rolls:
+            await send_response(ctx, f'{STATS_EMOJI} No rolls recorded for {name} yet.')
+            return
+
+        await send_response(ctx, stats_message(stats, name))
+
+
+def stats_message(stats: RollStats, name: str) -> str:
+    """Render stats next to what the exact odds of DICE_POOL would expect."""
+    distribution = dice_total_distribution(DICE_POOL)
+    totals = range(distribution.min_total, distribution.max_total + 1)
+
+    expected_mean = sum(total * distribution.probability(total) for total in totals)
+    variance = sum(
+        (total - expected_mean) ** 2 * distribution.probability(total)
+        for total in totals
+    )
+    mean = stats.mean_dice_total()
+    # How far the average is from the expected one, in standard errors.
+    deviation = (mean - float(expected_mean)) / math.sqrt(variance / stats.rolls)
+
+    message = f'{STATS_EMOJI} Roll stats for {name}:  **{stats.rolls}** rolls\n\n'
+    message += (
+        f'Average dice total **{mean:+.2f}** vs an expected **{float(expected_mean):+.2f}** '
+        f'({deviation:+.1f} standard errors)\n'
+    )
+
+    rows = [('Total', 'Rolled', 'Expected')]
+    rows.extend(
+        (
+            f'{total:+d}' if total else '0',
+            f'{stats.dice_totals.get(total, 0) / stats.rolls:.1%}',
+            f'{float(distribution.probability(total)):.1%}',
+        )
+        for total in totals
+    )
+    widths = [max(len(row[column]) for row in rows) for column in range(3)]
+    message += '```\n' + '\n'.join(
+        '  '.join(value.rjust(width) for value, width in zip(row, widths))
+        for row in rows
+    ) + '```\n'
 
+    message += '\n'.join(
+        f'    •  {label}:  **{stats.outcomes.get(outcome, 0)}**  '
+        f'({stats.expected_outcomes.get(outcome, 0.0):.1f} expected)'
+        for outcome, label in OUTCOME_LABELS.items()
+    )
+    return message
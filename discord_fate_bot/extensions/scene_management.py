@@ -1,19 +1,28 @@
 import dataclasses
 import logging
 
-from asyncio import Lock
-from collections import defaultdict
-from discord import NotFound
+from discord import Message, NotFound, RawBulkMessageDeleteEvent, RawMessageDeleteEvent
+from discord.abc import Messageable
 from discord.ext.commands import BadArgument, Bot, Cog, Converter, Greedy, command, group, guild_only
 from discord.utils import escape_markdown, find
+from functools import partial
 from typing import Dict, List, Optional, Union
 
 from ..bot import DiscordFateBot
+from ..cache import LruCache
+from ..debounce import Debouncer
+from ..locks import LockRegistry
 from ..emojis import react_success
+from ..outbound import Priority
 from ..scenes import NoCurrentSceneError, Scene, SceneAspect, SceneDao
+from ..tracing import span, trace
+from ..util import gather_limited
 
 logger = logging.getLogger(__name__)
 
+# How many requests for a single scene's messages we'll have in flight at once.
+MESSAGE_REQUEST_LIMIT = 4
+
 def setup(bot):
     if not isinstance(bot, DiscordFateBot):
         raise TypeError('Argument bot must be an instance of DiscordFateBot')
@@ -45,12 +54,41 @@ class SceneManagementCog(Cog, name='Scene Management'):
 
     bot: DiscordFateBot
     scene_dao: SceneDao
-    scene_locks: Dict[int, Lock]
+    scene_locks: LockRegistry[int]
+    message_updates: Debouncer[int, Messageable]
+    scene_messages: LruCache[int, Dict[int, Message]]
 
     def __init__(self, bot: DiscordFateBot):
         self.bot = bot
-        self.scene_dao = SceneDao(bot.database)
-        self.scene_locks = defaultdict(Lock)
+        self.scene_dao = SceneDao(
+            bot.scene_store,
+            cache_size=bot.config.scene_cache.size,
+            cache_ttl=bot.config.scene_cache.ttl,
+        )
+        self.scene_locks = LockRegistry('scene')
+        self.message_updates = Debouncer(
+            bot.config.scene_message.edit_interval,
+            self._flush_message_update,
+            lock_for=self.scene_locks.lock,
+        )
+        self.scene_messages = LruCache(
+            bot.config.scene_message.cache_size,
+            bot.config.scene_message.cache_ttl,
+        )
+
+        bot.shutdown_hooks.append(self.message_updates.flush_all)
+
+    def cog_unload(self):
+        self.bot.shutdown_hooks.remove(self.message_updates.flush_all)
+
+
+    @Cog.listener()
+    async def on_raw_message_delete(self, payload: RawMessageDeleteEvent):
+        self._forget_scene_messages(payload.channel_id, (payload.message_id,))
+
+    @Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: RawBulkMessageDeleteEvent):
+        self._forget_scene_messages(payload.channel_id, payload.message_ids)
 
 
     async def cog_check(self, ctx):
@@ -60,12 +98,12 @@ class SceneManagementCog(Cog, name='Scene Management'):
     async def cog_before_invoke(self, ctx):
         """Gate each command by a per-channel lock."""
         channel_id = ctx.channel.id
-        await self.scene_locks[channel_id].acquire()
+        await self.scene_locks.acquire(channel_id)
 
     async def cog_after_invoke(self, ctx):
         """Release the per-channel lock."""
         channel_id = ctx.channel.id
-        self.scene_locks[channel_id].release()
+        self.scene_locks.release(channel_id)
 
 
     @group(invoke_without_command=True)
@@ -91,8 +129,12 @@ class SceneManagementCog(Cog, name='Scene Management'):
         """Sync the pinned scene message with the database"""
         channel_id = ctx.channel.id
         scene = await self.scene_dao.find(channel_id)
+
+        # This is an explicit request to sync, so don't wait for any pending
+        # update.
+        self.message_updates.discard(channel_id)
         await self._update_message(ctx, scene)
-        await react_success(ctx.message)
+        self._react_success(ctx)
 
     @scene.command(name='end')
     async def scene_end(self, ctx):
@@ -100,7 +142,7 @@ class SceneManagementCog(Cog, name='Scene Management'):
         channel_id = ctx.channel.id
         scene = await self.scene_dao.find(channel_id)
         await self._delete_scene_and_unpin_message(ctx, scene)
-        await react_success(ctx.message)
+        self._react_success(ctx)
 
 
     @group(invoke_without_command=True)
@@ -113,7 +155,7 @@ class SceneManagementCog(Cog, name='Scene Management'):
 
         scene.add_aspect(new_aspect)
         await self._save_scene_and_update_message(ctx, scene)
-        await react_success(ctx.message)
+        self._react_success(ctx)
 
     @group(invoke_without_command=True)
     async def boost(self, ctx, *, name: AspectName):
@@ -125,7 +167,7 @@ class SceneManagementCog(Cog, name='Scene Management'):
 
         scene.add_aspect(new_aspect)
         await self._save_scene_and_update_message(ctx, scene)
-        await react_success(ctx.message)
+        self._react_success(ctx)
 
     @aspect.command(name='remove', aliases=['rem'])
     async def aspect_remove(self, ctx, aspect_ids: Greedy[int]):
@@ -137,7 +179,7 @@ class SceneManagementCog(Cog, name='Scene Management'):
             scene.remove_aspect(aspect_id)
 
         await self._save_scene_and_update_message(ctx, scene)
-        await react_success(ctx.message)
+        self._react_success(ctx)
 
     @aspect.command(name='rename')
     async def aspect_rename(self, ctx, aspect_id: int, *, name: AspectName):
@@ -150,7 +192,7 @@ class SceneManagementCog(Cog, name='Scene Management'):
 
         scene.replace_aspect(aspect_id, aspect)
         await self._save_scene_and_update_message(ctx, scene)
-        await react_success(ctx.message)
+        self._react_success(ctx)
 
     @boost.command(name='upgrade')
     async def boost_upgrade(self, ctx, aspect_id: int, *, name: AspectName = None):
@@ -170,7 +212,7 @@ class SceneManagementCog(Cog, name='Scene Management'):
 
         scene.replace_aspect(aspect_id, aspect)
         await self._save_scene_and_update_message(ctx, scene)
-        await react_success(ctx.message)
+        self._react_success(ctx)
 
     @boost.command(name='downgrade')
     async def boost_downgrade(self, ctx, aspect_id: int, *, name: AspectName = None):
@@ -190,7 +232,7 @@ class SceneManagementCog(Cog, name='Scene Management'):
 
         scene.replace_aspect(aspect_id, aspect)
         await self._save_scene_and_update_message(ctx, scene)
-        await react_success(ctx.message)
+        self._react_success(ctx)
 
     @group(invoke_without_command=True)
     async def invoke(self, ctx, aspect_id: int):
@@ -205,7 +247,7 @@ class SceneManagementCog(Cog, name='Scene Management'):
 
         scene.replace_aspect(aspect_id, aspect)
         await self._save_scene_and_update_message(ctx, scene)
-        await react_success(ctx.message)
+        self._react_success(ctx)
 
     @invoke.command(name='add')
     async def invoke_add(self, ctx, amount: Optional[AdjustInvokes], aspect_id: int):
@@ -226,48 +268,229 @@ class SceneManagementCog(Cog, name='Scene Management'):
 
         scene.replace_aspect(aspect_id, aspect)
         await self._save_scene_and_update_message(ctx, scene)
-        await react_success(ctx.message)
+        self._react_success(ctx)
 
 
     async def _delete_scene_and_unpin_message(self, ctx, scene):
+        # Make sure the pinned message reflects the final state of the scene
+        # before we let it go.
+        await self.message_updates.flush(scene.channel_id)
+        self.message_updates.discard(scene.channel_id)
+
         await self.scene_dao.remove(scene.channel_id)
 
-        for message_id in scene.message_ids:
-            try:
-                message = await ctx.fetch_message(message_id)
-                await message.unpin()
-            except NotFound:
-                # That's ok, if it doesn't exist we just won't unpin it.
-                pass
+        async def _unpin(message_id):
+            message = await self._fetch_scene_message(ctx, scene.channel_id, message_id)
+            await self._send_scene_action(scene.channel_id, message.unpin)
+
+        message_ids = list(scene.message_ids)
+        results = await gather_limited(
+            (_unpin(message_id) for message_id in message_ids),
+            limit=MESSAGE_REQUEST_LIMIT,
+        )
+
+        # If a message doesn't exist that's ok, we just won't unpin it.
+        errors = _unexpected_errors(message_ids, results, expected=NotFound)
 
         # Clear out the list of messages to be safe. There are none now.
+        self._forget_scene_messages(scene.channel_id, scene.message_ids)
         scene.message_ids.clear()
 
+        if errors:
+            raise errors[0]
+
     async def _save_scene_and_update_message(self, ctx, scene):
         await self.scene_dao.save(scene)
-        await self._update_message(ctx, scene)
-
-    async def _update_message(self, ctx, scene):
-        # Make a copy because we many modify the set in the loop.
-        copied_message_ids = scene.message_ids.copy()
 
-        for message_id in copied_message_ids:
+        if scene.message_ids:
+            # Edits to an existing message are coalesced, so a burst of commands
+            # costs one edit rather than one each.
+            self.message_updates.mark_dirty(scene.channel_id, ctx.channel)
+        else:
+            # A new message has to exist before we can pin it and remember its
+            # id, so create it right away.
+            await self._update_message(ctx, scene)
+
+    async def _flush_message_update(self, channel):
+        # This runs in the background, after the commands that asked for it, so
+        # it gets a trace of its own.
+        with trace('scene message update', channel=channel.id):
             try:
-                existing_message = await ctx.fetch_message(message_id)
-                await existing_message.edit(content=scene)
+                scene = await self.scene_dao.find(channel.id)
+            except NoCurrentSceneError:
+                # The scene ended before we got to it, so there's nothing to show.
+                return
 
-                edited_any = True
-            except NotFound:
-                # Ok, we couldn't find it so we couldn't edit it. We'll remove
-                # the message id since it's not valid anymore. If there are no
-                # valid message ids, we'll create a new message below.
-                self.message_ids.remove(message_id)
+            await self._update_message(channel, scene)
 
-        if not scene.message_ids:
-            new_message = await ctx.send(content=scene)
-            scene.message_ids = { new_message.id }
+    async def _update_message(self, messageable, scene):
+        """Bring the scene's pinned messages in line with the scene, one message
+        per page, editing only the pages whose text changed.
+        """
+        with span('scene_message.update'):
+            await self._update_message_pages(messageable, scene)
+
+    async def _update_message_pages(self, messageable, scene):
+        pages = scene.pages()
+
+        # Message ids are snowflakes, so sorting them puts the messages in the
+        # order they were sent, which is also the order of the pages.
+        message_ids = sorted(scene.message_ids)
+        results = await gather_limited(
+            (
+                self._fetch_scene_message(messageable, scene.channel_id, message_id)
+                for message_id in message_ids
+            ),
+            limit=MESSAGE_REQUEST_LIMIT,
+        )
 
-            await new_message.pin()
+        errors = _unexpected_errors(message_ids, results, expected=NotFound)
+        if errors:
+            # We can't lay out the pages without knowing which messages exist.
+            raise errors[0]
+
+        messages = []
+
+        for message_id, result in zip(message_ids, results):
+            if isinstance(result, NotFound):
+                # Ok, we couldn't find it so we can't edit it. We'll remove the
+                # message id since it's not valid anymore, and the remaining
+                # messages will shift up a page.
+                self._remove_scene_message(scene, message_id)
+            else:
+                messages.append(result)
+
+        message_ids_changed = len(messages) != len(message_ids)
+
+        # If there are more pages than messages, send new messages for the rest.
+        # These go one at a time so that they stay in order.
+        for page in pages[len(messages):]:
+            new_message = await self._send_scene_action(
+                scene.channel_id,
+                partial(messageable.send, content=page),
+            )
+            scene.message_ids.add(new_message.id)
+            self._cached_scene_messages(scene.channel_id)[new_message.id] = new_message
+            message_ids_changed = True
+
+            await self._send_scene_action(scene.channel_id, new_message.pin)
+
+        # If there are fewer pages than messages, we don't need the rest.
+        extra_messages = messages[len(pages):]
+        if extra_messages:
+            results = await gather_limited(
+                (
+                    self._send_scene_action(scene.channel_id, message.delete)
+                    for message in extra_messages
+                ),
+                limit=MESSAGE_REQUEST_LIMIT,
+            )
+            for message in extra_messages:
+                self._remove_scene_message(scene, message.id)
+            message_ids_changed = True
+
+            errors.extend(_unexpected_errors(
+                [message.id for message in extra_messages], results, expected=NotFound
+            ))
+
+        # Edit any existing messages whose page has changed.
+        edits = [
+            (message, page)
+            for message, page in zip(messages, pages)
+            if message.content != page
+        ]
+        results = await gather_limited(
+            (
+                self._send_scene_action(
+                    scene.channel_id,
+                    partial(message.edit, content=page),
+                    key=('edit', message.id),
+                )
+                for message, page in edits
+            ),
+            limit=MESSAGE_REQUEST_LIMIT,
+        )
 
+        edited_message_ids = [message.id for message, _ in edits]
+        missing_message_ids = [
+            message_id
+            for message_id, result in zip(edited_message_ids, results)
+            if isinstance(result, NotFound)
+        ]
+        errors.extend(_unexpected_errors(edited_message_ids, results, expected=NotFound))
+
+        if missing_message_ids:
+            # Some messages disappeared out from under us, so the pages no
+            # longer line up. Lay them out again without those messages.
+            for message_id in missing_message_ids:
+                self._remove_scene_message(scene, message_id)
+            await self._update_message(messageable, scene)
+        elif message_ids_changed:
             await self.scene_dao.save(scene)
 
+        if errors:
+            raise errors[0]
+
+    async def _send_scene_action(self, channel_id: int, run, *, key=None):
+        # Scene messages are kept up to date in the background, so they can wait
+        # for anyone waiting on a reply.
+        return await self.bot.outbound.submit(channel_id, Priority.SCENE, run, key=key)
+
+    def _react_success(self, ctx):
+        # Nobody is waiting on the reaction, so don't hold up the command (or
+        # the scene lock) for it.
+        self.bot.outbound.defer(ctx.channel.id, partial(react_success, ctx.message))
+
+    def _remove_scene_message(self, scene, message_id: int):
+        scene.message_ids.discard(message_id)
+        self._forget_scene_messages(scene.channel_id, (message_id,))
+
+
+    def _cached_scene_messages(self, channel_id: int) -> Dict[int, Message]:
+        messages = self.scene_messages.get(channel_id)
+
+        if messages is None:
+            messages = {}
+            self.scene_messages.put(channel_id, messages)
+
+        return messages
+
+    def _forget_scene_messages(self, channel_id: int, message_ids):
+        # Peek rather than get, since we see deletes for every channel and we
+        # don't want them to count as cache traffic.
+        messages = self.scene_messages.peek(channel_id)
+
+        if messages is not None:
+            for message_id in message_ids:
+                messages.pop(message_id, None)
+
+    async def _fetch_scene_message(self, messageable, channel_id: int, message_id: int):
+        """Get a scene message, reusing the one we already have if possible.
+
+        A cached message may have been deleted without us hearing about it, in
+        which case using it raises NotFound. Callers should forget it then.
+        """
+        messages = self._cached_scene_messages(channel_id)
+
+        try:
+            return messages[message_id]
+        except KeyError:
+            pass
+
+        message = await messageable.fetch_message(message_id)
+        messages[message_id] = message
+        return message
+
+
+def _unexpected_errors(message_ids, results, *, expected):
+    """Pick out the failures from a batch of message requests that we didn't
+    expect, logging each one.
+    """
+    errors = []
+
+    for message_id, result in zip(message_ids, results):
+        if isinstance(result, BaseException) and not isinstance(result, expected):
+            logger.warning('Request for message %s failed: %r', message_id, result)
+            errors.append(result)
+
+    return errors
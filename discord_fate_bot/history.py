@@ -0,0 +1,188 @@
+import asyncio
+import logging
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .database import Document
+from .dice import Roll
+from .metrics import REGISTRY
+from .stats import stats_increments
+from .storage import RollStore
+
+logger = logging.getLogger(__name__)
+
+ROLL_HISTORY_WRITE_SECONDS = REGISTRY.histogram(
+    'dfb_roll_history_write_seconds',
+    'Time spent writing batches of rolls to the roll history',
+)
+ROLL_HISTORY_WAITS = REGISTRY.counter(
+    'dfb_roll_history_waits_total',
+    'Rolls that had to wait for room in the roll history buffer',
+)
+ROLL_HISTORY_DROPPED = REGISTRY.counter(
+    'dfb_roll_history_dropped_total',
+    'Rolls that could not be written to the roll history',
+)
+
+@dataclass
+class RollRecord(Document, version=1):
+    """A roll, as kept in the roll history.
+
+    Faces are stored by value (e.g., -1, 0, or +1 for a Fate die), and the
+    modifiers and opposition as raw values. The outcome is vs the opposition, or
+    vs 0 if there was none.
+    """
+
+    channel_id: int
+    guild_id: Optional[int]
+    player_id: int
+    rolled_at: float
+    faces: List[int]
+    modifiers: List[int]
+    opposition: Optional[int]
+    total: int
+    result: int
+    outcome: int
+
+    @classmethod
+    def for_roll(
+            cls,
+            roll: Roll,
+            *,
+            channel_id: int,
+            guild_id: Optional[int],
+            player_id: int,
+            rolled_at: float) -> 'RollRecord':
+        opposition = roll.context.opposition
+
+        return cls(
+            channel_id=channel_id,
+            guild_id=guild_id,
+            player_id=player_id,
+            rolled_at=rolled_at,
+            faces=[face.value.raw_value for face in roll.faces],
+            modifiers=[modifier.raw_value for modifier in roll.context.modifiers],
+            opposition=None if opposition is None else opposition.raw_value,
+            total=roll.total().raw_value,
+            result=roll.result().raw_value,
+            outcome=int(roll.outcome()),
+        )
+
+
+class RollHistoryWriter:
+    """Write rolls to the roll history in batches, in the background.
+
+    Recorded rolls are buffered in memory and written with a single insert once
+    batch_size of them have built up, or every flush_interval seconds, whichever
+    comes first. At most max_pending rolls are buffered (or being written) at
+    once. Beyond that, record waits for room, so a slow database pushes back on
+    the rolls rather than using up memory.
+
+    Each batch also increments the stats of every player, channel, and guild in
+    it, so the stats stay in step with the history without ever reading it.
+    """
+
+    store: RollStore
+    batch_size: int
+    flush_interval: float
+    max_pending: int
+
+    def __init__(
+            self,
+            store: RollStore,
+            *,
+            batch_size: int = 100,
+            flush_interval: float = 5.0,
+            max_pending: int = 10000):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._buffer: List[RollRecord] = []
+        self._closing = False
+
+        # These are created on first use, on the event loop that uses them.
+        self._room: Optional[asyncio.Semaphore] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._flushing: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def record(self, record: RollRecord):
+        """Add a roll to the history, waiting only if the buffer is full."""
+        if self._closing:
+            logger.warning('Dropping a roll recorded after the history was closed')
+            ROLL_HISTORY_DROPPED.inc()
+            return
+
+        if self._task is None:
+            self._room = asyncio.Semaphore(self.max_pending)
+            self._batch_ready = asyncio.Event()
+            self._flushing = asyncio.Lock()
+            self._task = asyncio.ensure_future(self._run())
+
+        if self._room.locked():
+            ROLL_HISTORY_WAITS.inc()
+        await self._room.acquire()
+
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def flush(self):
+        """Write out everything that's buffered now, e.g., before reading the
+        stats, and wait for any batch already being written.
+        """
+        if self._task is not None:
+            await self._flush()
+
+    async def close(self):
+        """Write out everything that's buffered, e.g., on shutdown."""
+        self._closing = True
+
+        if self._task is not None:
+            self._batch_ready.set()
+            await self._task
+
+    async def _run(self):
+        while True:
+            if not self._closing:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._batch_ready.clear()
+
+            await self._flush()
+
+            if self._closing and not self._buffer:
+                return
+
+    async def _flush(self):
+        async with self._flushing:
+            while self._buffer:
+                batch = self._buffer[:self.batch_size]
+                del self._buffer[:self.batch_size]
+
+                try:
+                    with ROLL_HISTORY_WRITE_SECONDS.time():
+                        await self._write(batch)
+                finally:
+                    for _ in batch:
+                        self._room.release()
+
+    async def _write(self, batch: List[RollRecord]):
+        try:
+            await self.store.insert_rolls([record.to_dict() for record in batch])
+        except Exception:
+            logger.exception('Error writing %d rolls to the roll history', len(batch))
+            ROLL_HISTORY_DROPPED.inc(len(batch))
+            return
+
+        # Only once the rolls are in the history, so that rebuilding the stats
+        # from the history can fix up any that were missed.
+        try:
+            await self.store.increment_stats(stats_increments(batch))
+        except Exception:
+            logger.exception('Error updating the roll stats for %d rolls', len(batch))
@@ -0,0 +1,147 @@
+import logging
+import time
+
+from asyncio import Lock
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, Hashable, TypeVar
+
+from .cache import LruCache
+from .metrics import REGISTRY
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar('K', bound=Hashable)
+
+LOCK_WAIT_SECONDS = REGISTRY.histogram(
+    'dfb_lock_wait_seconds',
+    'Time spent waiting to acquire a lock',
+    ['registry'],
+)
+LOCK_CONTENDED = REGISTRY.counter(
+    'dfb_lock_contended_total',
+    'Lock acquisitions that had to wait for another holder',
+    ['registry'],
+)
+
+@dataclass
+class LockWaitStats:
+    """How often a lock (or set of locks) was acquired, and how long acquirers
+    had to wait for it.
+    """
+
+    acquisitions: int = 0
+    contended: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record(self, wait: float, contended: bool):
+        self.acquisitions += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        if contended:
+            self.contended += 1
+
+class _Entry:
+    __slots__ = ('lock', 'references')
+
+    def __init__(self):
+        self.lock = Lock()
+        self.references = 0
+
+class LockRegistry(Generic[K]):
+    """A set of locks keyed by, e.g., channel id.
+
+    Locks are created on demand and dropped again as soon as nobody holds or is
+    waiting for them, so the registry only ever holds as many locks as there are
+    keys in active use.
+
+    Wait statistics are kept both overall and per key. The per-key statistics
+    are kept in an LRU cache so they stay bounded too. Waits are also recorded
+    in the lock metrics, labeled with the registry's name.
+    """
+
+    name: str
+    stats: LockWaitStats
+    key_stats: LruCache[K, LockWaitStats]
+
+    def __init__(
+            self,
+            name: str = 'lock',
+            *,
+            stats_size: int = 1024,
+            clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.stats = LockWaitStats()
+        self.key_stats = LruCache(stats_size)
+
+        self._clock = clock
+        self._entries: Dict[K, _Entry] = {}
+
+    def __len__(self):
+        """The number of live locks."""
+        return len(self._entries)
+
+    def locked(self, key: K) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry.lock.locked()
+
+    async def acquire(self, key: K):
+        entry = self._entries.get(key)
+
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+
+        entry.references += 1
+
+        contended = entry.lock.locked()
+        start = self._clock()
+
+        try:
+            with span('lock.wait', lock=self.name, contended=contended):
+                await entry.lock.acquire()
+        except BaseException:
+            self._dereference(key, entry)
+            raise
+
+        self._record(key, self._clock() - start, contended)
+
+    def release(self, key: K):
+        entry = self._entries[key]
+        entry.lock.release()
+        self._dereference(key, entry)
+
+    def lock(self, key: K) -> '_KeyLock[K]':
+        """Get an async context manager that holds the lock for the key."""
+        return _KeyLock(self, key)
+
+    def _dereference(self, key: K, entry: _Entry):
+        entry.references -= 1
+        if entry.references == 0:
+            del self._entries[key]
+
+    def _record(self, key: K, wait: float, contended: bool):
+        self.stats.record(wait, contended)
+
+        key_stats = self.key_stats.peek(key)
+        if key_stats is None:
+            key_stats = LockWaitStats()
+        key_stats.record(wait, contended)
+        self.key_stats.put(key, key_stats)
+
+        LOCK_WAIT_SECONDS.observe(wait, registry=self.name)
+
+        if contended:
+            LOCK_CONTENDED.inc(registry=self.name)
+            logger.debug('Waited %.3fs for lock %s', wait, key)
+
+class _KeyLock(Generic[K]):
+    def __init__(self, registry: LockRegistry[K], key: K):
+        self._registry = registry
+        self._key = key
+
+    async def __aenter__(self):
+        await self._registry.acquire(self._key)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._registry.release(self._key)
@@ -6,7 +6,12 @@ from .config import Config
 
 logger = logging.getLogger(__name__)
 
-def configure_logging(config: Config):
+def configure_logging(config: Config, *, tag: str = ''):
+    """Configure logging, with every record tagged with the given tag (e.g.,
+    which shards a worker process runs), as %(tag)s.
+    """
+    _install_tag(f'[{tag}] ' if tag else '')
+
     # Always start by applying our base log configuration.
     with importlib.resources.path('discord_fate_bot', 'logging.ini') as path:
         logging.config.fileConfig(path, disable_existing_loggers=False)
@@ -18,3 +23,15 @@ def configure_logging(config: Config):
         logging.config.fileConfig(config_file, disable_existing_loggers=False)
         logger.info( 'Logging configuration read from %s', config_file)
 
+def _install_tag(tag: str):
+    base_factory = getattr(logging.getLogRecordFactory(), '_base_factory', logging.getLogRecordFactory())
+
+    def _record_factory(*args, **kwargs):
+        record = base_factory(*args, **kwargs)
+        record.tag = tag
+        return record
+
+    # Keep track of the original factory, so configuring again replaces our
+    # factory rather than wrapping it.
+    _record_factory._base_factory = base_factory
+    logging.setLogRecordFactory(_record_factory)
@@ -0,0 +1,232 @@
+import logging
+import time
+
+from aiohttp import web
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# The Prometheus client's default buckets, in seconds, which suit request
+# latencies.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metric:
+    """A named metric, with one series of values per combination of label
+    values.
+    """
+
+    type: str
+    name: str
+    help: str
+    label_names: Tuple[str, ...]
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+
+    def render(self) -> List[str]:
+        """Render the metric in the Prometheus text format."""
+        lines = [
+            f'# HELP {self.name} {_escape_help(self.help)}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if labels.keys() != set(self.label_names):
+            raise ValueError(
+                f'Metric {self.name} expects labels {self.label_names}, not {tuple(labels)}'
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _sample(self, suffix: str, key: Tuple[str, ...], value: float, **extra_labels) -> str:
+        labels = [*zip(self.label_names, key), *extra_labels.items()]
+
+        if labels:
+            label_str = '{' + ','.join(
+                f'{name}="{_escape_label_value(label_value)}"'
+                for name, label_value in labels
+            ) + '}'
+        else:
+            label_str = ''
+
+        return f'{self.name}{suffix}{label_str} {_format_value(value)}'
+
+class Counter(Metric):
+    """A count that only goes up, e.g., of errors."""
+
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self._sample('', key, value)
+
+class _HistogramSeries:
+    __slots__ = ('bucket_counts', 'sum', 'count')
+
+    def __init__(self, bucket_count: int):
+        # One more than the number of buckets, for the implicit +Inf bucket.
+        # These aren't cumulative until they're rendered.
+        self.bucket_counts = [0] * (bucket_count + 1)
+        self.sum = 0.0
+        self.count = 0
+
+class Histogram(Metric):
+    """A distribution of observed values, e.g., latencies, counted into
+    buckets.
+    """
+
+    type = 'histogram'
+
+    buckets: Tuple[float, ...]
+
+    def __init__(
+            self,
+            name: str,
+            help: str,
+            label_names: Sequence[str] = (),
+            *,
+            buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _HistogramSeries(len(self.buckets))
+
+        series.bucket_counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the body of a with statement takes, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return 0 if series is None else series.count
+
+    def sum(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return 0.0 if series is None else series.sum
+
+    def _render_samples(self):
+        for key, series in sorted(self._series.items()):
+            cumulative_count = 0
+            for bound, bucket_count in zip((*self.buckets, float('inf')), series.bucket_counts):
+                cumulative_count += bucket_count
+                yield self._sample('_bucket', key, cumulative_count, le=_format_value(bound))
+
+            yield self._sample('_sum', key, series.sum)
+            yield self._sample('_count', key, series.count)
+
+class MetricsRegistry:
+    """A collection of metrics, rendered together.
+
+    Metrics are registered by name. Registering a metric that already exists
+    returns the existing one.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def counter(self, name: str, help: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, label_names))
+
+    def histogram(
+            self,
+            name: str,
+            help: str,
+            label_names: Sequence[str] = (),
+            **kwargs) -> Histogram:
+        return self._register(Histogram(name, help, label_names, **kwargs))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return ''.join(f'{line}\n' for line in lines)
+
+    def _register(self, metric: Metric) -> Metric:
+        # Extensions are re-executed each time they're loaded, so registering
+        # the same metric again gets the existing one back.
+        existing = self._metrics.get(metric.name)
+
+        if existing is None:
+            self._metrics[metric.name] = metric
+            return metric
+
+        if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+            raise ValueError(f'Conflicting definitions of metric {metric.name}')
+
+        return existing
+
+# The registry the bot's own metrics are kept in.
+REGISTRY = MetricsRegistry()
+
+
+async def start_metrics_server(
+        registry: MetricsRegistry,
+        host: str,
+        port: int) -> web.AppRunner:
+    """Serve the registry's metrics at /metrics, for Prometheus to scrape.
+
+    Call cleanup on the returned runner to stop the server.
+    """
+    async def _metrics(request):
+        return web.Response(
+            body=registry.render().encode('utf-8'),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'},
+        )
+
+    app = web.Application()
+    app.router.add_get('/metrics', _metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    logger.info('Serving metrics on http://%s:%d/metrics', host, port)
+    return runner
+
+
+def _escape_help(help: str) -> str:
+    return help.replace('\\', r'\\').replace('\n', r'\n')
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
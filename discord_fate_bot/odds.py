@@ -0,0 +1,112 @@
+from fractions import Fraction
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, Sequence, Tuple
+
+from .dice import STYLE_SHIFTS, DiePool, Outcome, Value
+
+class DiceTotalDistribution:
+    """The exact distribution of a die pool's dice total.
+
+    The counts are kept as integers (the number of equally likely face
+    combinations giving each total), along with their running sums, so that any
+    outcome probability can be answered with a few lookups.
+    """
+
+    min_total: int
+    counts: Tuple[int, ...]
+    combinations: int
+
+    def __init__(self, min_total: int, counts: Sequence[int]):
+        self.min_total = min_total
+        self.counts = tuple(counts)
+        self.combinations = sum(self.counts)
+
+        self._cumulative_counts = (0, *accumulate(self.counts))
+
+    @property
+    def max_total(self) -> int:
+        return self.min_total + len(self.counts) - 1
+
+    def count_below(self, dice_total: int) -> int:
+        """The number of combinations with a dice total strictly less than the
+        given total.
+        """
+        index = min(max(dice_total - self.min_total, 0), len(self.counts))
+        return self._cumulative_counts[index]
+
+    def probability(self, dice_total: int) -> Fraction:
+        return Fraction(
+            self.count_below(dice_total + 1) - self.count_below(dice_total),
+            self.combinations
+        )
+
+    def outcome_probabilities(self, modifier: int, opposition: int) -> Dict[Outcome, Fraction]:
+        """The probability of each outcome when rolling with the given total
+        modifier against the given opposition.
+        """
+        # Rolling a dice total of needed exactly ties. One more succeeds, and
+        # STYLE_SHIFTS more succeeds with style.
+        needed = opposition - modifier
+
+        below_tie = self.count_below(needed)
+        below_success = self.count_below(needed + 1)
+        below_style = self.count_below(needed + STYLE_SHIFTS)
+
+        return {
+            Outcome.FAIL: Fraction(below_tie, self.combinations),
+            Outcome.TIE: Fraction(below_success - below_tie, self.combinations),
+            Outcome.SUCCESS: Fraction(below_style - below_success, self.combinations),
+            Outcome.SUCCESS_WITH_STYLE: Fraction(
+                self.combinations - below_style,
+                self.combinations
+            ),
+        }
+
+
+def dice_total_distribution(pool: DiePool) -> DiceTotalDistribution:
+    """Get the exact distribution of the pool's dice total.
+
+    Distributions are memoized by the pool's face values, so any two pools with
+    the same dice share one distribution.
+    """
+    face_values = tuple(sorted(
+        tuple(face.value.raw_value for face in die.faces)
+        for die in pool.dice
+    ))
+    return _distribution_for_face_values(face_values)
+
+def outcome_probabilities(
+        pool: DiePool,
+        modifier: Value,
+        opposition: Value) -> Dict[Outcome, Fraction]:
+    """The probability of each outcome of rolling the pool with the given
+    modifier against the given opposition.
+    """
+    distribution = dice_total_distribution(pool)
+    return distribution.outcome_probabilities(modifier.raw_value, opposition.raw_value)
+
+
+@lru_cache(maxsize=None)
+def _distribution_for_face_values(face_values: Tuple[Tuple[int, ...], ...]) -> DiceTotalDistribution:
+    # Start with the distribution of rolling no dice (a total of zero), and
+    # convolve in one die at a time.
+    min_total = 0
+    counts = [1]
+
+    for die_values in face_values:
+        die_min = min(die_values)
+        die_counts = [0] * (max(die_values) - die_min + 1)
+        for value in die_values:
+            die_counts[value - die_min] += 1
+
+        convolved = [0] * (len(counts) + len(die_counts) - 1)
+        for i, count in enumerate(counts):
+            if count:
+                for j, die_count in enumerate(die_counts):
+                    convolved[i + j] += count * die_count
+
+        min_total += die_min
+        counts = convolved
+
+    return DiceTotalDistribution(min_total, counts)
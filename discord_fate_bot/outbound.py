@@ -0,0 +1,266 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, TypeVar
+
+from .metrics import REGISTRY
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+OUTBOUND_WAIT_SECONDS = REGISTRY.histogram(
+    'dfb_outbound_wait_seconds',
+    'Time outbound Discord actions spent queued before they were sent',
+    ['priority'],
+)
+OUTBOUND_SUPERSEDED = REGISTRY.counter(
+    'dfb_outbound_superseded_total',
+    'Queued outbound Discord actions that were replaced by a newer one',
+    ['priority'],
+)
+
+class Priority(IntEnum):
+    """How urgently an outbound action should be sent. Lower goes first."""
+
+    #: Replies the user is waiting on, e.g., roll results and error messages.
+    RESPONSE = 0
+    #: Keeping the pinned scene messages up to date.
+    SCENE = 1
+    #: Reactions and other acknowledgements nobody is waiting on.
+    COSMETIC = 2
+
+class _Action:
+    __slots__ = ('priority', 'sequence', 'key', 'run', 'futures', 'context', 'queued_at', 'dropped')
+
+    def __init__(self, priority, sequence, key, run, futures):
+        self.priority = priority
+        self.sequence = sequence
+        self.key = key
+        self.run = run
+        self.futures = futures
+        # Run the action in its submitter's context, so that its requests show
+        # up in the submitter's trace rather than whichever one dispatched it.
+        self.context = contextvars.copy_context()
+        self.queued_at = time.perf_counter()
+        self.dropped = False
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+    def abandoned(self) -> bool:
+        # Everyone waiting on the action gave up (e.g., was cancelled).
+        return all(future.done() for future in self.futures)
+
+class _ChannelQueue:
+    __slots__ = ('heap', 'keyed', 'running', 'running_background')
+
+    def __init__(self):
+        self.heap: List[_Action] = []
+        self.keyed: Dict[Hashable, _Action] = {}
+        self.running = 0
+        self.running_background = 0
+
+class OutboundQueue:
+    """Schedule outbound Discord actions (sends, edits, pins, reactions) per
+    channel, most urgent first.
+
+    Discord rate limits requests per channel, and discord.py waits out a rate
+    limit by making later requests queue up behind a lock in the order they
+    arrived. To keep a burst of scene edits from holding up a roll result, we
+    only let a few of each channel's actions through to discord.py at a time and
+    keep the rest here, where they can be reordered. One of those slots is kept
+    free for responses, so a response never waits for more than the requests
+    already in flight. (With a channel_concurrency of 1 there's no slot to
+    spare, so nothing is reserved: a response still goes ahead of anything
+    queued, but may wait for a scene edit or reaction already in flight.)
+
+    Queued actions with the same key supersede one another: only the latest is
+    sent, and everyone waiting on the earlier ones gets its result.
+    """
+
+    channel_concurrency: int
+    batch_delay: float
+
+    def __init__(self, *, channel_concurrency: int = 2, batch_delay: float = 0.5):
+        self.channel_concurrency = channel_concurrency
+        self.batch_delay = batch_delay
+
+        self._channels: Dict[int, _ChannelQueue] = {}
+        self._sequence = itertools.count()
+        self._running: Set[asyncio.Task] = set()
+        self._batches: Dict[int, Dict[Hashable, Callable[[], Awaitable[Any]]]] = {}
+        self._batch_timers: Dict[int, asyncio.TimerHandle] = {}
+        self._deferred: Set[asyncio.Task] = set()
+
+    async def submit(
+            self,
+            channel_id: int,
+            priority: Priority,
+            run: Callable[[], Awaitable[T]],
+            *,
+            key: Optional[Hashable] = None) -> T:
+        """Queue an action for the channel and wait for its result.
+
+        The action is a function returning an awaitable (e.g., a lambda calling
+        ctx.send), so that nothing is sent until it's the action's turn.
+        """
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self._channels[channel_id] = _ChannelQueue()
+
+        future = asyncio.get_event_loop().create_future()
+        futures = [future]
+        sequence = next(self._sequence)
+
+        superseded = channel.keyed.pop(key, None) if key is not None else None
+        if superseded is not None:
+            # Take the earlier action's place in line (unless we're more urgent)
+            # so that a steady stream of replacements can't starve it.
+            superseded.dropped = True
+            futures = superseded.futures + futures
+            sequence = superseded.sequence
+            priority = min(priority, superseded.priority)
+            OUTBOUND_SUPERSEDED.inc(priority=superseded.priority.name.lower())
+
+        with span('outbound', priority=priority.name.lower()):
+            action = _Action(priority, sequence, key, run, futures)
+            heapq.heappush(channel.heap, action)
+            if key is not None:
+                channel.keyed[key] = action
+
+            self._dispatch(channel_id, channel)
+            return await future
+
+    def defer(
+            self,
+            channel_id: int,
+            run: Callable[[], Awaitable[Any]],
+            *,
+            key: Optional[Hashable] = None):
+        """Send a cosmetic action (e.g., a reaction) later, without waiting.
+
+        Deferred actions for a channel are collected for a short while and then
+        sent together as a single cosmetic action, so a burst of them takes up
+        one slot rather than competing with scene edits for every one. Actions
+        with the same key in a batch are only sent once. Failures are logged.
+        """
+        batch = self._batches.get(channel_id)
+
+        if batch is None:
+            batch = self._batches[channel_id] = {}
+            self._batch_timers[channel_id] = asyncio.get_event_loop().call_later(
+                self.batch_delay, self._send_batch, channel_id
+            )
+
+        batch[key if key is not None else object()] = run
+
+    async def drain(self):
+        """Send everything that's queued or deferred, e.g., on shutdown."""
+        for channel_id in list(self._batches):
+            self._batch_timers[channel_id].cancel()
+            self._send_batch(channel_id)
+
+        while self._deferred or self._running:
+            await asyncio.gather(
+                *self._deferred, *self._running,
+                return_exceptions=True,
+            )
+
+    def _send_batch(self, channel_id: int):
+        del self._batch_timers[channel_id]
+        runs = list(self._batches.pop(channel_id).values())
+
+        async def _run_batch():
+            for run in runs:
+                try:
+                    await run()
+                except Exception:
+                    logger.exception('Error sending deferred action in channel %s', channel_id)
+
+        task = asyncio.get_event_loop().create_task(
+            self.submit(channel_id, Priority.COSMETIC, _run_batch)
+        )
+        self._deferred.add(task)
+        task.add_done_callback(self._deferred.discard)
+
+    def _dispatch(self, channel_id: int, channel: _ChannelQueue):
+        """Start as many of the channel's queued actions as it has slots for."""
+        loop = asyncio.get_event_loop()
+        # Keep a slot free for responses, unless there's only the one.
+        background_limit = max(1, self.channel_concurrency - 1)
+
+        while channel.heap:
+            action = channel.heap[0]
+
+            if action.dropped or action.abandoned():
+                heapq.heappop(channel.heap)
+                if channel.keyed.get(action.key) is action:
+                    del channel.keyed[action.key]
+                continue
+
+            if channel.running >= self.channel_concurrency:
+                break
+
+            background = action.priority != Priority.RESPONSE
+            if background and channel.running_background >= background_limit:
+                # Everything else in the heap is background work too.
+                break
+
+            heapq.heappop(channel.heap)
+            if channel.keyed.get(action.key) is action:
+                del channel.keyed[action.key]
+
+            channel.running += 1
+            if background:
+                channel.running_background += 1
+
+            task = action.context.run(
+                loop.create_task, self._run(channel_id, channel, action, background)
+            )
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+        if not channel.heap and not channel.running and self._channels.get(channel_id) is channel:
+            del self._channels[channel_id]
+
+    async def _run(self, channel_id: int, channel: _ChannelQueue, action: _Action, background: bool):
+        OUTBOUND_WAIT_SECONDS.observe(
+            time.perf_counter() - action.queued_at,
+            priority=action.priority.name.lower(),
+        )
+
+        try:
+            result = await action.run()
+        except asyncio.CancelledError:
+            for future in action.futures:
+                future.cancel()
+            raise
+        except Exception as error:
+            for future in action.futures:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            for future in action.futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            channel.running -= 1
+            if background:
+                channel.running_background -= 1
+            self._dispatch(channel_id, channel)
+
+
+async def send_response(ctx, content: str):
+    """Reply to a command in its channel, ahead of any less urgent traffic."""
+    return await ctx.bot.outbound.submit(
+        ctx.channel.id,
+        Priority.RESPONSE,
+        lambda: ctx.send(content=content),
+    )
@@ -0,0 +1,170 @@
+import os
+import random
+
+from array import array
+from typing import Callable, Collection, Optional
+
+from .cache import LruCache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#: The ways the bot can generate rolls (see DFB_DICE_RNG).
+RNG_MODES = ('fast', 'secure')
+
+class DiceRng:
+    """A source of fair face indices, drawn from a buffer of random bytes.
+
+    Rather than calling into a generator for every die, bytes are drawn from the
+    source in bulk and used up one per die. A byte is turned into a face by
+    rejection: with n faces, bytes at or above the largest multiple of n that
+    fits in a byte are skipped, so every face is equally likely. Dice can have
+    at most 256 faces.
+    """
+
+    source: Callable[[int], bytes]
+    buffer_size: int
+
+    def __init__(self, source: Callable[[int], bytes], *, buffer_size: int = 4096):
+        self.source = source
+        self.buffer_size = buffer_size
+
+        self._buffer = b''
+        self._position = 0
+
+    @classmethod
+    def seeded(cls, seed=None, **kwargs) -> 'DiceRng':
+        """A fast generator (Python's Mersenne Twister, but not the shared one
+        in the random module). Give a seed for reproducible rolls, e.g., in
+        tests, or leave it out to seed from the operating system.
+        """
+        generator = random.Random(seed)
+        return cls(lambda n: generator.getrandbits(8 * n).to_bytes(n, 'little'), **kwargs)
+
+    @classmethod
+    def secure(cls, **kwargs) -> 'DiceRng':
+        """A cryptographically secure generator, reading the operating system's
+        entropy (as the secrets module does).
+        """
+        return cls(os.urandom, **kwargs)
+
+    @staticmethod
+    def from_numpy(generator: 'numpy.random.Generator', **kwargs) -> 'DiceRng':
+        """A generator backed by a NumPy generator, e.g., for simulations."""
+        return _NumpyDiceRng(generator, **kwargs)
+
+    def index(self, faces: int) -> int:
+        """Roll a die with the given number of faces, returning the index of
+        the face rolled.
+        """
+        limit = _rejection_limit(faces)
+
+        while True:
+            if self._position >= len(self._buffer):
+                self._buffer = self.source(self.buffer_size)
+                self._position = 0
+
+            byte = self._buffer[self._position]
+            self._position += 1
+
+            if byte < limit:
+                return byte % faces
+
+    def indices(self, faces: int, n: int) -> array:
+        """Roll a die n times, as an array of face indices."""
+        return array('B', (self.index(faces) for _ in range(n)))
+
+    def index_array(self, faces: int, n: int) -> 'numpy.ndarray':
+        """Roll a die n times, as a NumPy array of face indices.
+
+        This draws straight from the source, in one go for all but the few
+        bytes rejected, rather than through the buffer.
+        """
+        limit = _rejection_limit(faces)
+        parts = []
+        remaining = n
+
+        while remaining > 0:
+            # A little extra, so that rejections rarely need another draw.
+            size = remaining + remaining // 64 + 16
+            drawn = numpy.frombuffer(self.source(size), dtype=numpy.uint8)
+            accepted = drawn[drawn < limit][:remaining]
+            parts.append(accepted)
+            remaining -= len(accepted)
+
+        indices = numpy.concatenate(parts) if len(parts) != 1 else parts[0]
+        return (indices % faces).astype(numpy.uint8)
+
+class _NumpyDiceRng(DiceRng):
+    def __init__(self, generator: 'numpy.random.Generator', **kwargs):
+        super().__init__(generator.bytes, **kwargs)
+        self.generator = generator
+
+    def index_array(self, faces: int, n: int) -> 'numpy.ndarray':
+        # NumPy draws bounded integers in bulk itself, and fairly, and about
+        # three times as fast as we can filter bytes.
+        _rejection_limit(faces)
+        return self.generator.integers(faces, size=n, dtype=numpy.uint8)
+
+class ChannelRngs:
+    """The generator to roll with in each channel.
+
+    Normally every channel shares one generator: fast, or secure if the whole
+    bot is. Secure channels always share a secure one, e.g., for tables that
+    want to be able to vouch for their rolls. With a seed, each other channel
+    gets a generator of its own, seeded from the seed and the channel id, so a
+    channel's rolls can be replayed no matter what happens in other channels.
+    Seeded generators are kept for the most recently used max_channels
+    channels, and a channel starts its sequence over if it's evicted.
+    """
+
+    def __init__(
+            self,
+            *,
+            mode: str = 'fast',
+            seed: Optional[int] = None,
+            secure_channels: Collection[int] = (),
+            max_channels: int = 1024):
+        if mode not in RNG_MODES:
+            raise ValueError(f'Unknown dice generator mode {mode}')
+        if mode == 'secure' and seed is not None:
+            raise ValueError('A secure generator cannot be seeded')
+
+        self.seed = seed
+        self.secure_channels = frozenset(secure_channels)
+
+        self._secure = DiceRng.secure()
+        self._shared = self._secure if mode == 'secure' else DiceRng.seeded()
+        self._seeded: LruCache[int, DiceRng] = LruCache(max_channels)
+
+    @classmethod
+    def from_config(cls, config) -> 'ChannelRngs':
+        return cls(
+            mode=config.dice.rng,
+            seed=config.dice.seed,
+            secure_channels=config.dice.secure_channels,
+        )
+
+    def for_channel(self, channel_id: int) -> DiceRng:
+        if channel_id in self.secure_channels:
+            return self._secure
+        if self.seed is None:
+            return self._shared
+
+        rng = self._seeded.get(channel_id)
+        if rng is None:
+            # A small buffer, since there may be many of these.
+            rng = DiceRng.seeded(f'{self.seed}:{channel_id}', buffer_size=64)
+            self._seeded.put(channel_id, rng)
+        return rng
+
+
+def _rejection_limit(faces: int) -> int:
+    if not 0 < faces <= 256:
+        raise ValueError('A die must have between 1 and 256 faces')
+    return 256 - 256 % faces
+
+#: The generator for dice rolled without one, e.g., in tests.
+DEFAULT_RNG = DiceRng.seeded()
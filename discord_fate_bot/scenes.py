@@ -1,11 +1,28 @@
-from bson.objectid import ObjectId
+import asyncio
+import logging
+
+from copy import deepcopy
 from dataclasses import dataclass, field, replace
-from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
-from typing import Dict, Optional, Set
+from typing import Any, Dict, List, Optional, Set
 
-from .database import Document, SubDocument
+from .cache import LruCache
+from .database import Document, SubDocument, migration
 from .emojis import SCENE_EMOJI
-from .util import ValidationError, pluralize
+from .metrics import REGISTRY
+from .storage import SceneStore
+from .tracing import annotate, span
+from .util import ValidationError, paginate, pluralize
+
+logger = logging.getLogger(__name__)
+
+# Discord won't accept a message longer than this.
+MAX_MESSAGE_LENGTH = 2000
+
+SCENE_DAO_SECONDS = REGISTRY.histogram(
+    'dfb_scene_dao_duration_seconds',
+    'Time spent in scene data access operations, including cache hits',
+    ['operation'],
+)
 
 class NoCurrentSceneError(Exception):
     def __init__(self):
@@ -34,7 +51,19 @@ class SceneAspect(SubDocument):
         if complaints:
             raise ValidationError(message, complaints)
 
+    # The last rendering of this aspect, along with the state it was rendered
+    # from. Not a dataclass field, so it's never serialized.
+    _rendered = None
+
     def __str__(self):
+        state = (self.name, self.boost, self.invokes)
+
+        if self._rendered is None or self._rendered[0] != state:
+            self._rendered = (state, self._render())
+
+        return self._rendered[1]
+
+    def _render(self):
         aspect_str = f'{self.name}'
 
         # Italicize boosts
@@ -60,13 +89,172 @@ class SceneAspect(SubDocument):
         return aspect_str
 
 @dataclass
-class Scene(Document, version=1):
+class SceneChanges:
+    """The differences between a scene and its last saved state."""
+
+    fields: Dict[str, Any] = field(default_factory=dict)
+    next_aspect_id_delta: int = 0
+    added_aspects: Dict[str, SceneAspect] = field(default_factory=dict)
+    removed_aspect_ids: List[str] = field(default_factory=list)
+    aspect_fields: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    aspect_invokes_deltas: Dict[str, int] = field(default_factory=dict)
+
+    def __bool__(self):
+        return bool(
+            self.fields
+            or self.next_aspect_id_delta
+            or self.added_aspects
+            or self.removed_aspect_ids
+            or self.aspect_fields
+            or self.aspect_invokes_deltas
+        )
+
+@dataclass
+class Scene(Document, version=2):
     channel_id: int
     message_ids: Set[int] = field(default_factory=set)
     description: Optional[str] = None
     aspects: Dict[str, SceneAspect] = field(default_factory=dict)
     next_aspect_id: int = 1
 
+    # Snapshot of the state last written to (or read from) the database. This
+    # is deliberately not a dataclass field, so it is never serialized. None
+    # means the scene has never been saved.
+    _saved_state = None
+
+    # Scenes are stored in a compact form (schema version 2), since every
+    # command reads and writes one:
+    #
+    #   channel_id  the channel id (full name, since it's the indexed key)
+    #   m           the message ids, omitted if there are none
+    #   d           the description, omitted if there is none
+    #   n           the next aspect id
+    #   a           the aspects, in order, each as {'i': id, 'n': name, 'f': flags}
+    #
+    # An aspect's flags pack its invokes and boost together as invokes * 2 +
+    # boost, and are omitted if zero.
+
+    @classmethod
+    def encode_dict(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        stored = {
+            'channel_id': data['channel_id'],
+            'n': data['next_aspect_id'],
+            'a': [
+                _encode_aspect(id, aspect_dict)
+                for id, aspect_dict in data['aspects'].items()
+            ],
+        }
+
+        if data['message_ids']:
+            stored['m'] = list(data['message_ids'])
+        if data['description'] is not None:
+            stored['d'] = data['description']
+
+        return stored
+
+    @classmethod
+    def decode_dict(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'channel_id': data['channel_id'],
+            'message_ids': data.get('m', []),
+            'description': data.get('d'),
+            'aspects': {
+                str(aspect['i']): _decode_aspect(aspect)
+                for aspect in data.get('a', [])
+            },
+            'next_aspect_id': data['n'],
+        }
+
+    @classmethod
+    def encode_aspect(cls, id: str, aspect: SceneAspect) -> Dict[str, Any]:
+        """An aspect in the stored form, as an element of a stored scene's
+        aspects array (see encode_dict), e.g., for updating it in place.
+        """
+        return _encode_aspect(id, aspect.to_dict())
+
+    @migration(from_version=1)
+    def _compact(data):
+        # This writes the version 2 form itself, rather than with encode_dict,
+        # so that it keeps writing version 2 documents (for the next migration
+        # to pick up) whatever later versions look like.
+        stored = {
+            'channel_id': data['channel_id'],
+            'n': data.get('next_aspect_id', 1),
+            'a': [],
+        }
+
+        for id, aspect_dict in data.get('aspects', {}).items():
+            stored_aspect = {'i': int(id), 'n': aspect_dict['name']}
+            flags = aspect_dict.get('invokes', 0) * 2 + aspect_dict.get('boost', False)
+            if flags:
+                stored_aspect['f'] = flags
+            stored['a'].append(stored_aspect)
+
+        if data.get('message_ids'):
+            stored['m'] = list(data['message_ids'])
+        if data.get('description') is not None:
+            stored['d'] = data['description']
+        if '_id' in data:
+            stored['_id'] = data['_id']
+
+        return stored
+
+    def mark_saved(self):
+        """Record the current state as the state stored in the database."""
+        self._saved_state = (
+            frozenset(self.message_ids),
+            self.description,
+            self.next_aspect_id,
+            {
+                id: (aspect.name, aspect.boost, aspect.invokes)
+                for id, aspect in self.aspects.items()
+            },
+        )
+
+    def is_saved(self) -> bool:
+        return self._saved_state is not None
+
+    def changes(self) -> SceneChanges:
+        """Compare the scene against its last saved state.
+
+        This should only be called on a scene that has been saved (see
+        is_saved), since there is nothing to compare against otherwise.
+        """
+        saved_message_ids, saved_description, saved_next_aspect_id, saved_aspects = \
+            self._saved_state
+
+        changes = SceneChanges(
+            next_aspect_id_delta=self.next_aspect_id - saved_next_aspect_id,
+        )
+
+        if self.message_ids != saved_message_ids:
+            changes.fields['message_ids'] = list(self.message_ids)
+        if self.description != saved_description:
+            changes.fields['description'] = self.description
+
+        for id in saved_aspects.keys() - self.aspects.keys():
+            changes.removed_aspect_ids.append(id)
+
+        for id, aspect in self.aspects.items():
+            try:
+                saved_name, saved_boost, saved_invokes = saved_aspects[id]
+            except KeyError:
+                changes.added_aspects[id] = aspect
+                continue
+
+            aspect_fields = {}
+            if aspect.name != saved_name:
+                aspect_fields['name'] = aspect.name
+            if aspect.boost != saved_boost:
+                aspect_fields['boost'] = aspect.boost
+            if aspect_fields:
+                changes.aspect_fields[id] = aspect_fields
+
+            if aspect.invokes != saved_invokes:
+                changes.aspect_invokes_deltas[id] = aspect.invokes - saved_invokes
+
+        return changes
+
     def add_aspect(self, aspect: SceneAspect):
         self.aspects[str(self.next_aspect_id)] = aspect
         self.next_aspect_id += 1
@@ -87,51 +275,154 @@ class Scene(Document, version=1):
         self.aspects[str(aspect_id)] = aspect
 
     def __str__(self):
+        return '\n'.join(self._lines())
+
+    def pages(self, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+        """Render the scene as one or more messages, each at most limit
+        characters long.
+        """
+        return paginate(
+            self._lines(),
+            limit,
+            continuation=f'{SCENE_EMOJI}  _(continued)_',
+        )
+
+    def _lines(self) -> List[str]:
         description = self.description or 'Current Scene'
+        description_lines = description.splitlines()
+
+        lines = [
+            f'{SCENE_EMOJI}  __**{description_lines[0]}**__',
+            *description_lines[1:],
+        ]
+
+        if len(description_lines) > 1:
+            lines.append('')
 
         if self.aspects:
-            aspects_str = '\n'.join(
+            # Each aspect caches its own rendering, so only the aspects that
+            # changed since the last render are rendered again.
+            lines.extend(
                 f'    •  [{id}]  {aspect}'
                 for id, aspect in self.aspects.items()
             )
         else:
-            aspects_str = '    •  _No aspects. Add some with **!aspect**._'
+            lines.append('    •  _No aspects. Add some with **!aspect**._')
 
-        description_lines = description.splitlines()
-        description_str = '\n'.join([
-            f'__**{description_lines[0]}**__',
-            *description_lines[1:],
-        ])
+        return lines
 
-        if len(description_lines) > 1:
-            description_str += '\n'
 
-        return f'{SCENE_EMOJI}  {description_str}\n{aspects_str}'
+class SceneDao:
+    """Data access for scenes, with a write-through cache in front of the
+    store.
+
+    The cache holds private copies of scenes, so callers are free to mutate the
+    scenes they get back from find without affecting the cache until they call
+    save.
+    """
 
+    store: SceneStore
+    cache: LruCache[int, Scene]
 
-class SceneDao:
-    database: AsyncIOMotorDatabase
-    scenes: AsyncIOMotorCollection
+    def __init__(
+            self,
+            store: SceneStore,
+            *,
+            cache_size: int = 0,
+            cache_ttl: Optional[float] = None):
+        self.store = store
+        self.cache = LruCache(cache_size, cache_ttl)
 
-    def __init__(self, database: AsyncIOMotorDatabase):
-        self.database = database
-        self.scenes = database.scenes
+        self._write_back_tasks = set()
 
     async def find(self, channel_id: int) -> Optional[Scene]:
-        scene_dict = await self.scenes.find_one({'channel_id': channel_id})
+        with SCENE_DAO_SECONDS.time(operation='find'), span('scene_dao.find'):
+            return await self._find(channel_id)
+
+    async def remove(self, channel_id: int):
+        with SCENE_DAO_SECONDS.time(operation='remove'), span('scene_dao.remove'):
+            self.cache.discard(channel_id)
+            await self.store.remove(channel_id)
+
+    async def save(self, scene: Scene):
+        """Save a scene, writing only what changed since it was last saved.
+
+        Scenes that have never been saved are written as whole documents. Scenes
+        that were read from the store are written as a targeted update.
+        """
+        with SCENE_DAO_SECONDS.time(operation='save'), span('scene_dao.save'):
+            await self._save(scene)
+
+    async def _find(self, channel_id: int) -> Scene:
+        cached_scene = self.cache.get(channel_id)
+
+        if cached_scene is not None:
+            annotate(cached=True)
+            return deepcopy(cached_scene)
+
+        scene_dict = await self.store.find(channel_id)
 
         if scene_dict is None:
             raise NoCurrentSceneError()
 
-        return Scene.from_dict(scene_dict)
+        scene = Scene.from_dict(scene_dict)
 
-    async def remove(self, channel_id: int):
-        await self.scenes.delete_one({'channel_id': channel_id})
+        if Scene.needs_migration(scene_dict):
+            # The stored document is in an older schema, so a targeted update
+            # wouldn't line up with it. Leave the scene unsaved, so the next
+            # save writes the whole document, and write back the upgraded
+            # document in the meantime.
+            self._write_back(scene, scene_dict.get('_v'))
+        else:
+            scene.mark_saved()
 
-    async def save(self, scene: Scene):
-        await self.scenes.replace_one(
-            {'channel_id': scene.channel_id},
-            scene.to_dict(),
-            upsert=True
-        )
+        self.cache.put(channel_id, deepcopy(scene))
+        return scene
+
+    async def _save(self, scene: Scene):
+        # Drop the cached copy first, so that if the write fails the next find
+        # goes back to the store rather than trusting a stale copy.
+        self.cache.discard(scene.channel_id)
 
+        if scene.is_saved():
+            changes = scene.changes()
+            if changes:
+                await self._update(scene, changes)
+        else:
+            await self.store.save(scene.to_dict())
+
+        scene.mark_saved()
+        self.cache.put(scene.channel_id, deepcopy(scene))
+
+    def _write_back(self, scene: Scene, stored_version: Optional[int]):
+        async def _upgrade(scene_dict):
+            try:
+                # Only replace the stored document if it hasn't been upgraded by
+                # anyone else in the meantime.
+                await self.store.upgrade(scene_dict, stored_version)
+            except Exception:
+                logger.exception(
+                    'Error writing back migrated scene for channel %s',
+                    scene.channel_id
+                )
+
+        task = asyncio.ensure_future(_upgrade(scene.to_dict()))
+        self._write_back_tasks.add(task)
+        task.add_done_callback(self._write_back_tasks.discard)
+
+    async def _update(self, scene: Scene, changes: SceneChanges):
+        # If the document has disappeared out from under us, an update has
+        # nothing to apply to. Fall back to writing out the whole scene.
+        if not await self.store.update(scene, changes):
+            await self.store.save(scene.to_dict())
+
+
+def _encode_aspect(id: str, aspect_dict: Dict[str, Any]) -> Dict[str, Any]:
+    flags = aspect_dict['invokes'] * 2 + aspect_dict['boost']
+    if flags:
+        return {'i': int(id), 'n': aspect_dict['name'], 'f': flags}
+    return {'i': int(id), 'n': aspect_dict['name']}
+
+def _decode_aspect(stored: Dict[str, Any]) -> Dict[str, Any]:
+    flags = stored.get('f', 0)
+    return {'name': stored['n'], 'boost': flags & 1 == 1, 'invokes': flags >> 1}
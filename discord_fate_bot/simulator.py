@@ -0,0 +1,307 @@
+"""Monte Carlo simulation of Fate rolls and contests, for balancing encounters.
+
+Trials are run in chunks, vectorized with NumPy (via DiePool.roll_many), and the
+chunks are spread across a process pool. Each chunk draws from its own
+generator, seeded from a single seed, so a simulation gives the same results
+however many processes run it. Each chunk's results are reduced to histograms,
+which are all that's sent back and merged.
+"""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+
+from .dice import STYLE_SHIFTS, FateDiePool, Outcome, RollContext, Value, numpy, outcomes_for
+from .rng import DiceRng
+
+#: Ways to spend an invoke.
+INVOKE_MODES = ('plus2', 'reroll')
+
+#: Histograms of results by name, e.g., {'outcome': {Outcome.TIE: 10, ...}}.
+Histograms = Dict[str, Counter]
+
+DICE_POOL = FateDiePool()
+
+# The fewest shifts that get each outcome.
+_SHIFTS_NEEDED = {
+    Outcome.TIE: 0,
+    Outcome.SUCCESS: 1,
+    Outcome.SUCCESS_WITH_STYLE: STYLE_SHIFTS,
+}
+
+@dataclass(frozen=True)
+class Side:
+    """Someone rolling in a simulation.
+
+    Boosts and invokes are both spent to improve a roll that falls short, boosts
+    first since they're free. Each is spent as the side's invoke mode says:
+    plus2 always adds +2, while reroll rerolls the dice while they're showing
+    less than 0, and only adds +2 once they aren't.
+    """
+
+    modifiers: Tuple[int, ...] = ()
+    invokes: int = 0
+    boosts: int = 0
+    invoke_mode: str = 'plus2'
+
+    def context(self, opposition: int = 0) -> RollContext:
+        return RollContext(
+            modifiers=tuple(Value(modifier) for modifier in self.modifiers),
+            opposition=Value(opposition),
+        )
+
+@dataclass(frozen=True)
+class RollScenario:
+    """A single roll against a static opposition, or against an opponent's roll
+    (plus the opposition) if opponent is given.
+
+    The player spends boosts and invokes until the roll reaches the target
+    outcome (a tie or better), or they run out. The opponent doesn't invoke.
+    """
+
+    player: Side
+    opposition: int = 0
+    opponent: Optional[Side] = None
+    target: Outcome = Outcome.SUCCESS
+
+@dataclass(frozen=True)
+class ContestScenario:
+    """A contest: exchanges of opposed rolls until one side has enough
+    victories.
+
+    Winning an exchange scores a victory, or two when succeeding with style.
+    Ties score nothing. In each exchange, the player invokes to win it if they
+    can, and then the opponent invokes to win it back. Boosts and invokes are
+    spent across the whole contest. A contest still going after max_exchanges
+    is counted as undecided.
+    """
+
+    player: Side
+    opponent: Side
+    victories: int = 3
+    max_exchanges: int = 20
+
+Scenario = Union[RollScenario, ContestScenario]
+
+
+def simulate(
+        scenario: Scenario,
+        trials: int,
+        *,
+        seed: Optional[int] = None,
+        processes: int = 1,
+        chunk_size: int = 1_000_000,
+        on_chunk: Optional[Callable[[int], None]] = None) -> Histograms:
+    """Run trials of the scenario, returning the merged histograms.
+
+    The trials are split into chunks of chunk_size, which are run on a pool of
+    processes (or in this process, if processes is 1). If on_chunk is given,
+    it's called with the size of each chunk as it finishes, e.g., to report
+    progress.
+    """
+    if numpy is None:
+        raise RuntimeError(
+            'The simulator requires NumPy (install discord-fate-bot[sim])'
+        )
+
+    chunk_sizes = [chunk_size] * (trials // chunk_size)
+    if trials % chunk_size:
+        chunk_sizes.append(trials % chunk_size)
+
+    # Chunks, rather than processes, get their own seeds, so the results don't
+    # depend on how many processes there are.
+    seeds = numpy.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    chunks = [(scenario, size, chunk_seed) for size, chunk_seed in zip(chunk_sizes, seeds)]
+
+    def _merge(all_histograms: Iterable[Histograms]) -> Histograms:
+        merged: Histograms = {}
+        for size, histograms in zip(chunk_sizes, all_histograms):
+            merge_histograms(merged, histograms)
+            if on_chunk is not None:
+                on_chunk(size)
+        return merged
+
+    if processes == 1:
+        return _merge(map(_simulate_chunk, chunks))
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return _merge(executor.map(_simulate_chunk, chunks))
+
+def merge_histograms(merged: Histograms, histograms: Histograms):
+    """Add histograms into merged, in place."""
+    for name, histogram in histograms.items():
+        merged.setdefault(name, Counter()).update(histogram)
+
+def format_histograms(histograms: Histograms, trials: int) -> str:
+    """Render histograms as a table of each value's count and share of the
+    trials.
+    """
+    lines = []
+
+    for name, histogram in histograms.items():
+        lines.append(name)
+        for key, count in sorted(histogram.items()):
+            label = key.name.replace('_', ' ').lower() if isinstance(key, Outcome) else str(key)
+            lines.append(f'  {label:<20} {count:>14,} {count / trials:>9.3%}')
+
+    return '\n'.join(lines)
+
+
+def _simulate_chunk(chunk: Tuple[Scenario, int, 'numpy.random.SeedSequence']) -> Histograms:
+    scenario, size, seed = chunk
+    rng = DiceRng.from_numpy(numpy.random.default_rng(seed))
+
+    if isinstance(scenario, RollScenario):
+        return _simulate_rolls(scenario, size, rng)
+    return _simulate_contests(scenario, size, rng)
+
+def _simulate_rolls(scenario: RollScenario, size: int, rng: DiceRng) -> Histograms:
+    player = scenario.player
+    dice_totals = _roll(size, rng)
+    bonuses = numpy.zeros(size, dtype=numpy.int32)
+    offsets = numpy.full(size, _offset(player.context(scenario.opposition)), dtype=numpy.int32)
+
+    if scenario.opponent is not None:
+        offsets -= _roll(size, rng) + _offset(scenario.opponent.context())
+
+    boosts = numpy.full(size, player.boosts, dtype=numpy.int32)
+    invokes = numpy.full(size, player.invokes, dtype=numpy.int32)
+    spent = _invoke(
+        player, _SHIFTS_NEEDED[scenario.target],
+        dice_totals, bonuses, offsets, boosts, invokes, rng,
+    )
+
+    results = dice_totals + bonuses + offsets
+    return {
+        'outcome': _histogram(outcomes_for(results), Outcome),
+        'shifts': _histogram(results),
+        'invokes spent': _histogram(spent),
+    }
+
+class _Contestant:
+    """A side's state across a chunk of contests."""
+
+    def __init__(self, side: Side, size: int):
+        self.side = side
+        self.modifier = _offset(side.context())
+        self.victories = numpy.zeros(size, dtype=numpy.int32)
+        self.boosts = numpy.full(size, side.boosts, dtype=numpy.int32)
+        self.invokes = numpy.full(size, side.invokes, dtype=numpy.int32)
+        self.spent = numpy.zeros(size, dtype=numpy.int32)
+
+    def invoke(self, active, dice_totals, bonuses, other_totals, rng):
+        """Invoke to win the active contests' exchanges against the other
+        side's totals.
+        """
+        boosts, invokes = self.boosts[active], self.invokes[active]
+        self.spent[active] += _invoke(
+            self.side, _SHIFTS_NEEDED[Outcome.SUCCESS],
+            dice_totals, bonuses, self.modifier - other_totals,
+            boosts, invokes, rng,
+        )
+        self.boosts[active], self.invokes[active] = boosts, invokes
+
+def _simulate_contests(scenario: ContestScenario, size: int, rng: DiceRng) -> Histograms:
+    player = _Contestant(scenario.player, size)
+    opponent = _Contestant(scenario.opponent, size)
+    exchanges = numpy.zeros(size, dtype=numpy.int32)
+
+    # The contests still going. Each exchange only rolls for these.
+    active = numpy.arange(size)
+
+    for _ in range(scenario.max_exchanges):
+        if not len(active):
+            break
+
+        count = len(active)
+        player_dice, player_bonuses = _roll(count, rng), numpy.zeros(count, dtype=numpy.int32)
+        opponent_dice, opponent_bonuses = _roll(count, rng), numpy.zeros(count, dtype=numpy.int32)
+
+        player.invoke(
+            active, player_dice, player_bonuses,
+            opponent_dice + opponent_bonuses + opponent.modifier, rng,
+        )
+        opponent.invoke(
+            active, opponent_dice, opponent_bonuses,
+            player_dice + player_bonuses + player.modifier, rng,
+        )
+
+        results = (
+            (player_dice + player_bonuses + player.modifier)
+            - (opponent_dice + opponent_bonuses + opponent.modifier)
+        )
+        player.victories[active] += _victories(results)
+        opponent.victories[active] += _victories(-results)
+        exchanges[active] += 1
+
+        done = (
+            (player.victories[active] >= scenario.victories)
+            | (opponent.victories[active] >= scenario.victories)
+        )
+        active = active[~done]
+
+    # Only one side can win an exchange, so only one side can reach the
+    # victories needed.
+    player_won = int((player.victories >= scenario.victories).sum())
+    opponent_won = int((opponent.victories >= scenario.victories).sum())
+
+    return {
+        'winner': Counter({
+            'player': player_won,
+            'opponent': opponent_won,
+            'undecided': size - player_won - opponent_won,
+        }),
+        'exchanges': _histogram(exchanges),
+        'player invokes spent': _histogram(player.spent),
+        'opponent invokes spent': _histogram(opponent.spent),
+    }
+
+def _invoke(side: Side, needed: int, dice_totals, bonuses, offsets, boosts, invokes, rng):
+    """Spend boosts, then invokes, on every roll short of needed shifts.
+
+    A roll's result is its dice total plus its bonus (+2 per invoke) plus its
+    offset (modifiers less opposition). Rerolls replace dice totals and invokes
+    add to bonuses, in place, as do the boosts and invokes spent. Returns how
+    many each roll spent.
+    """
+    spent = numpy.zeros(len(dice_totals), dtype=numpy.int32)
+
+    while True:
+        short = ((dice_totals + bonuses + offsets) < needed) & ((boosts > 0) | (invokes > 0))
+        if not short.any():
+            return spent
+
+        use_boost = short & (boosts > 0)
+        boosts -= use_boost
+        invokes -= short & ~use_boost
+        spent += short
+
+        if side.invoke_mode == 'reroll':
+            reroll = short & (dice_totals < 0)
+            rerolled = numpy.flatnonzero(reroll)
+            if len(rerolled):
+                dice_totals[rerolled] = _roll(len(rerolled), rng)
+            bonuses += 2 * (short & ~reroll)
+        else:
+            bonuses += 2 * short
+
+def _roll(n: int, rng: DiceRng):
+    return DICE_POOL.roll_many(n, RollContext(), rng=rng).dice_totals()
+
+def _offset(context: RollContext) -> int:
+    return (context.total_modifier() - context.total_opposition()).raw_value
+
+def _victories(results):
+    outcomes = outcomes_for(results)
+    return (outcomes >= Outcome.SUCCESS) + (outcomes == Outcome.SUCCESS_WITH_STYLE)
+
+def _histogram(values, key: Callable = int) -> Counter:
+    """Count the values in a NumPy array, converting each with key (e.g., to an
+    enum).
+    """
+    uniques, counts = numpy.unique(values, return_counts=True)
+    return Counter({
+        key(value): count
+        for value, count in zip(uniques.tolist(), counts.tolist())
+    })
@@ -0,0 +1,65 @@
+import logging
+import time
+
+from contextlib import contextmanager
+from typing import Awaitable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+class StartupTimer:
+    """Time each phase of start-up, for a breakdown once the bot is ready.
+
+    Phases may overlap (e.g., loading extensions while logging in), so each is
+    recorded with its own start time, relative to when the timer was created.
+    """
+
+    start: float
+    phases: Dict[str, List[Optional[float]]]
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+
+    def begin(self, name: str):
+        self.phases[name] = [time.perf_counter() - self.start, None]
+
+    def end(self, name: str):
+        phase = self.phases[name]
+        phase[1] = time.perf_counter() - self.start - phase[0]
+
+    @contextmanager
+    def phase(self, name: str):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    async def time(self, name: str, awaitable: Awaitable[T]) -> T:
+        with self.phase(name):
+            return await awaitable
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def format_phases(self) -> List[str]:
+        """Render the phases as lines, in the order they started."""
+        return [
+            f'{name} +{_milliseconds(offset)}ms '
+            + (f'{_milliseconds(duration)}ms' if duration is not None else 'unfinished')
+            for name, (offset, duration) in sorted(self.phases.items(), key=lambda item: item[1][0])
+        ]
+
+    def report(self):
+        """Log how long start-up took, phase by phase."""
+        logger.info(
+            'Ready after %dms:\n%s',
+            _milliseconds(self.elapsed()),
+            '\n'.join(f'  {line}' for line in self.format_phases()),
+        )
+
+
+def _milliseconds(seconds: float) -> int:
+    return round(seconds * 1000)
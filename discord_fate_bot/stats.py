@@ -0,0 +1,162 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Tuple
+
+from .dice import STYLE_SHIFTS, FateDiePool, Outcome, outcome_for
+from .odds import dice_total_distribution
+from .storage import STATS_SCOPES, RollStore
+
+if TYPE_CHECKING:
+    from .history import RollRecord
+
+@dataclass
+class RollStats:
+    """Counts of a player's, channel's, or guild's rolls.
+
+    Along with what was rolled, this keeps how many of each outcome were
+    expected, i.e., the sum over every roll of each outcome's probability given
+    that roll's modifiers and opposition. Everything is a plain sum, so stats can
+    be kept up to date with increments alone.
+    """
+
+    rolls: int = 0
+    dice_totals: Dict[int, int] = field(default_factory=dict)
+    outcomes: Dict[Outcome, int] = field(default_factory=dict)
+    expected_outcomes: Dict[Outcome, float] = field(default_factory=dict)
+
+    def add(self, dice_count: int, dice_total: int, result: int, count: int = 1):
+        """Count rolls of dice_count Fate dice that came up dice_total, for the
+        given result (shifts vs opposition).
+        """
+        self.rolls += count
+        self.dice_totals[dice_total] = self.dice_totals.get(dice_total, 0) + count
+
+        outcome = outcome_for(result)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+
+        # The roll tied on a dice total of exactly dice_total - result, whatever
+        # its modifiers and opposition were. Beyond the dice's range (plus the
+        # shifts for style) either way, every roll fails or every roll succeeds
+        # with style, so the probabilities stop changing there. Clamping to it
+        # keeps modifiers and opposition from growing the cache.
+        limit = dice_count + STYLE_SHIFTS
+        needed = max(-limit, min(dice_total - result, limit))
+        for outcome, probability in _outcome_probabilities(dice_count, needed):
+            self.expected_outcomes[outcome] = (
+                self.expected_outcomes.get(outcome, 0.0) + count * probability
+            )
+
+    def add_record(self, record: 'RollRecord'):
+        self.add(len(record.faces), sum(record.faces), record.result)
+
+    def mean_dice_total(self) -> float:
+        return sum(total * count for total, count in self.dice_totals.items()) / self.rolls
+
+    def increments(self) -> Dict[str, float]:
+        """The stats as increments to a stored stats document, by dotted field
+        path (as for MongoDB's $inc).
+        """
+        increments: Dict[str, float] = {'rolls': self.rolls}
+        increments.update(
+            (f'dice_totals.{total}', count) for total, count in self.dice_totals.items()
+        )
+        increments.update(
+            (f'outcomes.{int(outcome)}', count) for outcome, count in self.outcomes.items()
+        )
+        increments.update(
+            (f'expected_outcomes.{int(outcome)}', expected)
+            for outcome, expected in self.expected_outcomes.items()
+        )
+        return increments
+
+    def to_document(self, scope: str, key: int) -> Dict[str, Any]:
+        # Field names must be strings to be stored.
+        return {
+            'scope': scope,
+            'key': key,
+            'rolls': self.rolls,
+            'dice_totals': {str(total): count for total, count in self.dice_totals.items()},
+            'outcomes': {str(int(outcome)): count for outcome, count in self.outcomes.items()},
+            'expected_outcomes': {
+                str(int(outcome)): expected
+                for outcome, expected in self.expected_outcomes.items()
+            },
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> 'RollStats':
+        return cls(
+            rolls=document.get('rolls', 0),
+            dice_totals={
+                int(total): count
+                for total, count in document.get('dice_totals', {}).items()
+            },
+            outcomes={
+                Outcome(int(outcome)): count
+                for outcome, count in document.get('outcomes', {}).items()
+            },
+            expected_outcomes={
+                Outcome(int(outcome)): expected
+                for outcome, expected in document.get('expected_outcomes', {}).items()
+            },
+        )
+
+
+def stats_increments(records: Iterable['RollRecord']) -> Dict[Tuple[str, int], Dict[str, float]]:
+    """Total up the increments to every stats document the records count
+    towards, keyed by scope and key.
+
+    A batch of rolls by the same player in the same channel comes to one
+    increment per scope, however many rolls it holds.
+    """
+    stats: Dict[Tuple[str, int], RollStats] = defaultdict(RollStats)
+
+    for record in records:
+        for scope, key_field in STATS_SCOPES.items():
+            key = getattr(record, key_field)
+            if key is not None:
+                stats[scope, key].add_record(record)
+
+    return {scope_key: scope_stats.increments() for scope_key, scope_stats in stats.items()}
+
+async def find_stats(store: RollStore, scope: str, key: int) -> Optional[RollStats]:
+    document = await store.find_stats(scope, key)
+    return None if document is None else RollStats.from_document(document)
+
+async def rebuild_stats(store: RollStore) -> Dict[str, int]:
+    """Recompute every stats document from the roll history, e.g., to backfill
+    stats for rolls recorded before they were kept. Returns how many documents
+    were written for each scope.
+
+    Rolls recorded while this runs may be missed, so it's best run while the
+    bot is stopped.
+    """
+    written = {}
+
+    for scope in STATS_SCOPES:
+        stats: Dict[int, RollStats] = defaultdict(RollStats)
+        for group in await store.aggregate_rolls(scope):
+            stats[group['key']].add(
+                group['dice_count'],
+                group['dice_total'],
+                group['result'],
+                group['count'],
+            )
+
+        await store.replace_stats(
+            scope,
+            [scope_stats.to_document(scope, key) for key, scope_stats in stats.items()]
+        )
+        written[scope] = len(stats)
+
+    return written
+
+
+@lru_cache(maxsize=None)
+def _outcome_probabilities(dice_count: int, needed: int) -> Tuple[Tuple[Outcome, float], ...]:
+    distribution = dice_total_distribution(FateDiePool(dice_count))
+    return tuple(
+        (outcome, float(probability))
+        for outcome, probability in distribution.outcome_probabilities(0, needed).items()
+    )
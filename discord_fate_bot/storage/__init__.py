@@ -0,0 +1,173 @@
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from ..config import Config
+
+if TYPE_CHECKING:
+    from ..database import Document
+    from ..scenes import Scene, SceneChanges
+
+#: What roll stats are kept for, each with the roll document field giving its
+#: key.
+STATS_SCOPES = {
+    'player': 'player_id',
+    'channel': 'channel_id',
+    'guild': 'guild_id',
+}
+
+class SceneStore(ABC):
+    """Somewhere to keep scenes.
+
+    A store holds stored scene documents (the dicts produced by Scene.to_dict),
+    keyed by channel id. Schema versions and caching are handled above the
+    store, by SceneDao.
+    """
+
+    @abstractmethod
+    async def find(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        """Get the stored document for a channel's scene, or None if there
+        isn't one.
+        """
+
+    @abstractmethod
+    async def save(self, document: Dict[str, Any]):
+        """Write a whole scene document, replacing any stored one."""
+
+    @abstractmethod
+    async def update(self, scene: 'Scene', changes: 'SceneChanges') -> bool:
+        """Write just the given changes to the scene, returning False if there
+        is no stored scene to update.
+        """
+
+    @abstractmethod
+    async def upgrade(self, document: Dict[str, Any], from_version: Optional[int]) -> bool:
+        """Replace a stored document with an upgraded one, but only if the
+        stored one is still at from_version. Returns whether it was replaced.
+        """
+
+    @abstractmethod
+    async def remove(self, channel_id: int):
+        """Remove a channel's scene, if it has one."""
+
+    @abstractmethod
+    async def migrate(self, document_class: Type['Document']) -> int:
+        """Upgrade every stored document to the current schema version,
+        returning how many were upgraded.
+        """
+
+    @abstractmethod
+    def roll_store(self) -> 'RollStore':
+        """Get the store for roll history kept alongside the scenes.
+
+        It shares this store's connection, so it's opened and closed along with
+        this store.
+        """
+
+    async def open(self):
+        """Get the store ready for use, e.g., by creating tables or indexes.
+
+        This is separate from creating the store so that it can run at the same
+        time as other start-up work, like connecting to Discord.
+        """
+
+    async def close(self):
+        """Release any connections or files held by the store."""
+
+
+class RollStore(ABC):
+    """Somewhere to keep the history of rolls.
+
+    Rolls are stored as documents (the dicts produced by RollRecord.to_dict).
+    The history is only ever appended to, in batches. Alongside it are running
+    stats for each player, channel, and guild (see stats.RollStats), kept up to
+    date by increments rather than by reading the history back.
+    """
+
+    @abstractmethod
+    async def insert_rolls(self, documents: List[Dict[str, Any]]):
+        """Append roll documents to the history."""
+
+    @abstractmethod
+    async def find_rolls(self, channel_id: int) -> List[Dict[str, Any]]:
+        """Get the recorded rolls in a channel, oldest first."""
+
+    @abstractmethod
+    async def increment_stats(self, increments: Dict[Tuple[str, int], Dict[str, float]]):
+        """Add to the stats documents of each scope and key (e.g., ('player',
+        id)), creating any that don't exist yet. Increments are keyed by dotted
+        field path, as for MongoDB's $inc.
+        """
+
+    @abstractmethod
+    async def find_stats(self, scope: str, key: int) -> Optional[Dict[str, Any]]:
+        """Get the stats document for a scope and key, or None if there isn't
+        one.
+        """
+
+    @abstractmethod
+    async def aggregate_rolls(self, scope: str) -> List[Dict[str, Any]]:
+        """Count the recorded rolls for each key in the scope by dice count,
+        dice total, and result, as dicts with those fields plus key and count.
+        """
+
+    @abstractmethod
+    async def replace_stats(self, scope: str, documents: List[Dict[str, Any]]):
+        """Replace every stats document in the scope."""
+
+
+def group_rolls(documents: Iterable[Dict[str, Any]], scope: str) -> List[Dict[str, Any]]:
+    """Count roll documents by key, dice count, dice total, and result, for
+    stores that can't do so themselves.
+    """
+    key_field = STATS_SCOPES[scope]
+    counts: Dict[Tuple[int, int, int, int], int] = defaultdict(int)
+
+    for document in documents:
+        key = document.get(key_field)
+        if key is not None:
+            faces = document['faces']
+            counts[key, len(faces), sum(faces), document['result']] += 1
+
+    return [
+        {'key': key, 'dice_count': dice_count, 'dice_total': dice_total, 'result': result, 'count': count}
+        for (key, dice_count, dice_total, result), count in counts.items()
+    ]
+
+def apply_increments(document: Dict[str, Any], increments: Dict[str, float]):
+    """Add increments to a stats document in place, the way $inc would."""
+    for path, amount in increments.items():
+        *parents, last = path.split('.')
+        target = document
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[last] = target.get(last, 0) + amount
+
+
+async def get_scene_store(config: Config) -> SceneStore:
+    """Create the scene store for the configured backend. It must be opened
+    before it's used.
+    """
+    backend = config.storage.backend
+
+    # Backends are imported as needed, so only the configured one's
+    # dependencies are loaded. The backends import scenes only for type hints:
+    # scenes are imported along with the bot's extensions, off the event loop.
+    if backend == 'mongo':
+        from ..database import get_database
+        from .mongo import MongoSceneStore
+
+        database = await get_database(config)
+        return MongoSceneStore(database.scenes)
+
+    if backend == 'memory':
+        from .memory import MemorySceneStore
+
+        return MemorySceneStore()
+
+    if backend == 'sqlite':
+        from .sqlite import SqliteSceneStore
+
+        return SqliteSceneStore(config.storage.sqlite_path)
+
+    raise ValueError(f'Unknown storage backend {backend}')
@@ -0,0 +1,98 @@
+from copy import deepcopy
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type
+
+from . import RollStore, SceneStore, apply_increments, group_rolls
+
+if TYPE_CHECKING:
+    from ..database import Document
+    from ..scenes import Scene, SceneChanges
+
+class MemorySceneStore(SceneStore):
+    """Scenes kept in a dict in memory, e.g., for tests and load testing.
+
+    Nothing survives a restart. Documents are copied in and out, so callers
+    can't change the stored copies behind the store's back.
+    """
+
+    documents: Dict[int, Dict[str, Any]]
+
+    def __init__(self):
+        self.documents = {}
+        self._roll_store = MemoryRollStore()
+
+    def roll_store(self) -> 'MemoryRollStore':
+        return self._roll_store
+
+    async def find(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        return deepcopy(self.documents.get(channel_id))
+
+    async def save(self, document: Dict[str, Any]):
+        self.documents[document['channel_id']] = deepcopy(document)
+
+    async def update(self, scene: 'Scene', changes: 'SceneChanges') -> bool:
+        if scene.channel_id not in self.documents:
+            return False
+
+        # There's nothing to gain from patching a dict in place over just
+        # encoding the scene again.
+        self.documents[scene.channel_id] = scene.to_dict()
+        return True
+
+    async def upgrade(self, document: Dict[str, Any], from_version: Optional[int]) -> bool:
+        stored = self.documents.get(document['channel_id'])
+        if stored is None or stored.get('_v') != from_version:
+            return False
+
+        self.documents[document['channel_id']] = deepcopy(document)
+        return True
+
+    async def remove(self, channel_id: int):
+        self.documents.pop(channel_id, None)
+
+    async def migrate(self, document_class: Type['Document']) -> int:
+        migrated_count = 0
+
+        for channel_id, document in self.documents.items():
+            if document_class.needs_migration(document):
+                self.documents[channel_id] = document_class.migrate_dict(document)
+                migrated_count += 1
+
+        return migrated_count
+
+
+class MemoryRollStore(RollStore):
+    """Roll history kept in a list in memory, and stats in a dict."""
+
+    documents: List[Dict[str, Any]]
+    stats: Dict[Tuple[str, int], Dict[str, Any]]
+
+    def __init__(self):
+        self.documents = []
+        self.stats = {}
+
+    async def insert_rolls(self, documents: List[Dict[str, Any]]):
+        self.documents.extend(deepcopy(documents))
+
+    async def find_rolls(self, channel_id: int) -> List[Dict[str, Any]]:
+        return [
+            deepcopy(document)
+            for document in self.documents
+            if document['channel_id'] == channel_id
+        ]
+
+    async def increment_stats(self, increments: Dict[Tuple[str, int], Dict[str, float]]):
+        for (scope, key), scope_increments in increments.items():
+            document = self.stats.setdefault((scope, key), {'scope': scope, 'key': key})
+            apply_increments(document, scope_increments)
+
+    async def find_stats(self, scope: str, key: int) -> Optional[Dict[str, Any]]:
+        return deepcopy(self.stats.get((scope, key)))
+
+    async def aggregate_rolls(self, scope: str) -> List[Dict[str, Any]]:
+        return group_rolls(self.documents, scope)
+
+    async def replace_stats(self, scope: str, documents: List[Dict[str, Any]]):
+        for scope_key in [scope_key for scope_key in self.stats if scope_key[0] == scope]:
+            del self.stats[scope_key]
+        for document in documents:
+            self.stats[scope, document['key']] = deepcopy(document)
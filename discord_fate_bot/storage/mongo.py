@@ -0,0 +1,224 @@
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from ..database import Document, migrate_collection
+from ..scenes import Scene, SceneChanges
+from . import STATS_SCOPES, RollStore, SceneStore
+
+class MongoSceneStore(SceneStore):
+    """Scenes stored in a MongoDB collection, with changes written as targeted
+    updates.
+    """
+
+    collection: AsyncIOMotorCollection
+
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+        self._roll_store = MongoRollStore(
+            collection.database.rolls,
+            collection.database.roll_stats,
+        )
+
+    def roll_store(self) -> 'MongoRollStore':
+        return self._roll_store
+
+    async def open(self):
+        await self.collection.create_index(
+            'channel_id',
+            name='ix__scenes__channel_id',
+            unique=True,
+        )
+        await self._roll_store.open()
+
+    async def find(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({'channel_id': channel_id})
+
+    async def save(self, document: Dict[str, Any]):
+        await self.collection.replace_one(
+            {'channel_id': document['channel_id']},
+            document,
+            upsert=True
+        )
+
+    async def update(self, scene: Scene, changes: SceneChanges) -> bool:
+        update, array_filters = _update_document(scene, changes)
+
+        result = await self.collection.update_one(
+            {'channel_id': scene.channel_id},
+            update,
+            array_filters=array_filters or None,
+        )
+        return result.matched_count > 0
+
+    async def upgrade(self, document: Dict[str, Any], from_version: Optional[int]) -> bool:
+        result = await self.collection.replace_one(
+            {'channel_id': document['channel_id'], '_v': from_version},
+            document,
+        )
+        return result.matched_count > 0
+
+    async def remove(self, channel_id: int):
+        await self.collection.delete_one({'channel_id': channel_id})
+
+    async def migrate(self, document_class: Type[Document]) -> int:
+        return await migrate_collection(self.collection, document_class)
+
+    async def close(self):
+        self.collection.database.client.close()
+
+
+class MongoRollStore(RollStore):
+    """Roll history stored in a MongoDB collection, one document per roll, and
+    stats in another, one document per scope and key.
+    """
+
+    collection: AsyncIOMotorCollection
+    stats_collection: AsyncIOMotorCollection
+
+    def __init__(self, collection: AsyncIOMotorCollection, stats_collection: AsyncIOMotorCollection):
+        self.collection = collection
+        self.stats_collection = stats_collection
+
+    async def open(self):
+        await self.collection.create_index(
+            [('channel_id', 1), ('rolled_at', 1)],
+            name='ix__rolls__channel_id__rolled_at',
+        )
+        await self.stats_collection.create_index(
+            [('scope', 1), ('key', 1)],
+            name='ix__roll_stats__scope__key',
+            unique=True,
+        )
+
+    async def insert_rolls(self, documents: List[Dict[str, Any]]):
+        # Unordered, so one document the server rejects doesn't stop the rest of
+        # the batch. (Documents the driver can't encode at all, e.g., with
+        # integers beyond 8 bytes, still fail the whole batch.)
+        await self.collection.insert_many(documents, ordered=False)
+
+    async def find_rolls(self, channel_id: int) -> List[Dict[str, Any]]:
+        cursor = self.collection.find(
+            {'channel_id': channel_id},
+            {'_id': False},
+            sort=[('_id', 1)],
+        )
+        return [document async for document in cursor]
+
+    async def increment_stats(self, increments: Dict[Tuple[str, int], Dict[str, float]]):
+        # One round trip for the lot, upserting any stats seen for the first
+        # time.
+        await self.stats_collection.bulk_write(
+            [
+                UpdateOne({'scope': scope, 'key': key}, {'$inc': scope_increments}, upsert=True)
+                for (scope, key), scope_increments in increments.items()
+            ],
+            ordered=False,
+        )
+
+    async def find_stats(self, scope: str, key: int) -> Optional[Dict[str, Any]]:
+        return await self.stats_collection.find_one({'scope': scope, 'key': key}, {'_id': False})
+
+    async def aggregate_rolls(self, scope: str) -> List[Dict[str, Any]]:
+        key_field = STATS_SCOPES[scope]
+
+        # Only the counts come back, so this reads the history on the server.
+        cursor = self.collection.aggregate([
+            {'$match': {key_field: {'$ne': None}}},
+            {'$group': {
+                '_id': {
+                    'key': f'${key_field}',
+                    'dice_count': {'$size': '$faces'},
+                    'dice_total': {'$sum': '$faces'},
+                    'result': '$result',
+                },
+                'count': {'$sum': 1},
+            }},
+        ], allowDiskUse=True)
+
+        return [{**group['_id'], 'count': group['count']} async for group in cursor]
+
+    async def replace_stats(self, scope: str, documents: List[Dict[str, Any]]):
+        await self.stats_collection.delete_many({'scope': scope})
+        if documents:
+            await self.stats_collection.insert_many(documents, ordered=False)
+
+
+def _update_document(
+        scene: Scene,
+        changes: SceneChanges) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """Translate scene changes into a MongoDB update document and the array
+    filters it uses.
+    """
+    set_fields = {}
+    inc_fields = {}
+    unset_fields = {}
+    push_fields = {}
+    pull_fields = {}
+    array_filters = []
+
+    if 'message_ids' in changes.fields:
+        if changes.fields['message_ids']:
+            set_fields['m'] = list(changes.fields['message_ids'])
+        else:
+            unset_fields['m'] = ''
+
+    if 'description' in changes.fields:
+        if changes.fields['description'] is not None:
+            set_fields['d'] = changes.fields['description']
+        else:
+            unset_fields['d'] = ''
+
+    if changes.next_aspect_id_delta:
+        inc_fields['n'] = changes.next_aspect_id_delta
+
+    modified_aspect_ids = changes.aspect_fields.keys() | changes.aspect_invokes_deltas.keys()
+
+    # Mongo won't push to, pull from, or modify elements of the same array in a
+    # single update, so if more than one of those happened, just set the whole
+    # array. Commands only ever do one at a time anyway.
+    array_changes = sum(map(bool, (
+        changes.added_aspects,
+        changes.removed_aspect_ids,
+        modified_aspect_ids,
+    )))
+
+    if array_changes > 1:
+        set_fields['a'] = [
+            Scene.encode_aspect(id, aspect)
+            for id, aspect in scene.aspects.items()
+        ]
+    elif changes.added_aspects:
+        push_fields['a'] = {'$each': [
+            Scene.encode_aspect(id, aspect)
+            for id, aspect in changes.added_aspects.items()
+        ]}
+    elif changes.removed_aspect_ids:
+        pull_fields['a'] = {'i': {'$in': [int(id) for id in changes.removed_aspect_ids]}}
+    else:
+        for id in sorted(modified_aspect_ids, key=int):
+            element = f'a.$[a{id}]'
+            array_filters.append({f'a{id}.i': int(id)})
+
+            aspect_fields = changes.aspect_fields.get(id, {})
+            if 'name' in aspect_fields:
+                set_fields[f'{element}.n'] = aspect_fields['name']
+
+            flags_delta = changes.aspect_invokes_deltas.get(id, 0) * 2
+            if 'boost' in aspect_fields:
+                flags_delta += 1 if aspect_fields['boost'] else -1
+            if flags_delta:
+                inc_fields[f'{element}.f'] = flags_delta
+
+    update = {}
+    if set_fields:
+        update['$set'] = set_fields
+    if inc_fields:
+        update['$inc'] = inc_fields
+    if unset_fields:
+        update['$unset'] = unset_fields
+    if push_fields:
+        update['$push'] = push_fields
+    if pull_fields:
+        update['$pull'] = pull_fields
+    return update, array_filters
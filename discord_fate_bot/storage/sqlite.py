@@ -0,0 +1,265 @@
+import asyncio
+import json
+import sqlite3
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+from . import STATS_SCOPES, RollStore, SceneStore, apply_increments
+
+if TYPE_CHECKING:
+    from ..database import Document
+    from ..scenes import Scene, SceneChanges
+
+T = TypeVar('T')
+
+_CREATE_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS scenes (
+        channel_id INTEGER PRIMARY KEY,
+        version INTEGER,
+        document TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS rolls (
+        id INTEGER PRIMARY KEY,
+        channel_id INTEGER NOT NULL,
+        document TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS ix__rolls__channel_id ON rolls (channel_id)',
+    '''
+    CREATE TABLE IF NOT EXISTS roll_stats (
+        scope TEXT NOT NULL,
+        key INTEGER NOT NULL,
+        document TEXT NOT NULL,
+        PRIMARY KEY (scope, key)
+    )
+    ''',
+]
+
+class SqliteSceneStore(SceneStore):
+    """Scenes stored in a SQLite database file, for deployments that don't
+    want to run a MongoDB server.
+
+    The sqlite3 module blocks, so every statement runs on a single worker
+    thread that owns the connection. Each scene is one row holding its document
+    as JSON, so an update rewrites just that row.
+    """
+
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        self._connection: Optional[sqlite3.Connection] = None
+        self._roll_store = SqliteRollStore(self)
+
+    def roll_store(self) -> 'SqliteRollStore':
+        return self._roll_store
+
+    async def open(self):
+        await self._run(self._open)
+
+    async def find(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        row = await self._run(
+            self._fetch_one,
+            'SELECT document FROM scenes WHERE channel_id = ?',
+            (channel_id,)
+        )
+        return None if row is None else json.loads(row[0])
+
+    async def save(self, document: Dict[str, Any]):
+        await self._run(
+            self._execute,
+            'INSERT OR REPLACE INTO scenes (channel_id, version, document) VALUES (?, ?, ?)',
+            (document['channel_id'], document.get('_v'), _dumps(document))
+        )
+
+    async def update(self, scene: 'Scene', changes: 'SceneChanges') -> bool:
+        document = scene.to_dict()
+        row_count = await self._run(
+            self._execute,
+            'UPDATE scenes SET version = ?, document = ? WHERE channel_id = ?',
+            (document.get('_v'), _dumps(document), scene.channel_id)
+        )
+        return row_count > 0
+
+    async def upgrade(self, document: Dict[str, Any], from_version: Optional[int]) -> bool:
+        row_count = await self._run(
+            self._execute,
+            'UPDATE scenes SET version = ?, document = ? WHERE channel_id = ? AND version IS ?',
+            (document.get('_v'), _dumps(document), document['channel_id'], from_version)
+        )
+        return row_count > 0
+
+    async def remove(self, channel_id: int):
+        await self._run(
+            self._execute,
+            'DELETE FROM scenes WHERE channel_id = ?',
+            (channel_id,)
+        )
+
+    async def migrate(self, document_class: Type['Document']) -> int:
+        return await self._run(self._migrate, document_class)
+
+    async def close(self):
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown()
+
+    async def _run(self, function: Callable[..., T], *args) -> T:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, partial(function, *args))
+
+    # Everything below runs on the worker thread.
+
+    def _open(self):
+        # With no implicit transactions, each statement commits on its own.
+        connection = sqlite3.connect(self.path, isolation_level=None)
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        for statement in _CREATE_TABLES:
+            connection.execute(statement)
+        self._connection = connection
+
+    def _fetch_one(self, sql: str, parameters: tuple) -> Optional[tuple]:
+        return self._connection.execute(sql, parameters).fetchone()
+
+    def _execute(self, sql: str, parameters: tuple) -> int:
+        return self._connection.execute(sql, parameters).rowcount
+
+    def _migrate(self, document_class: Type['Document']) -> int:
+        current_version = document_class.schema_version
+
+        rows = self._connection.execute(
+            'SELECT channel_id, version, document FROM scenes WHERE version IS NOT ?',
+            (current_version,)
+        ).fetchall()
+
+        updates = [
+            (current_version, _dumps(document_class.migrate_dict(json.loads(document))), channel_id, version)
+            for channel_id, version, document in rows
+        ]
+
+        with self._connection:
+            self._connection.execute('BEGIN')
+            cursor = self._connection.executemany(
+                'UPDATE scenes SET version = ?, document = ? WHERE channel_id = ? AND version IS ?',
+                updates
+            )
+
+        return cursor.rowcount
+
+    def _execute_many(self, sql: str, parameters: List[tuple]):
+        with self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.executemany(sql, parameters)
+
+    def _fetch_all(self, sql: str, parameters: tuple) -> List[tuple]:
+        return self._connection.execute(sql, parameters).fetchall()
+
+
+class SqliteRollStore(RollStore):
+    """Roll history stored in the same SQLite database as the scenes, one row
+    per roll, with one row of stats per scope and key.
+    """
+
+    def __init__(self, scene_store: SqliteSceneStore):
+        # Share the scene store's connection, and with it its worker thread.
+        self._scene_store = scene_store
+
+    async def insert_rolls(self, documents: List[Dict[str, Any]]):
+        # A batch goes in as one transaction, which is much cheaper than one
+        # commit per row.
+        await self._scene_store._run(
+            self._scene_store._execute_many,
+            'INSERT INTO rolls (channel_id, document) VALUES (?, ?)',
+            [(document['channel_id'], _dumps(document)) for document in documents]
+        )
+
+    async def find_rolls(self, channel_id: int) -> List[Dict[str, Any]]:
+        rows = await self._scene_store._run(
+            self._scene_store._fetch_all,
+            'SELECT document FROM rolls WHERE channel_id = ? ORDER BY id',
+            (channel_id,)
+        )
+        return [json.loads(document) for document, in rows]
+
+    async def increment_stats(self, increments: Dict[Tuple[str, int], Dict[str, float]]):
+        await self._scene_store._run(self._increment_stats, increments)
+
+    async def find_stats(self, scope: str, key: int) -> Optional[Dict[str, Any]]:
+        row = await self._scene_store._run(
+            self._scene_store._fetch_one,
+            'SELECT document FROM roll_stats WHERE scope = ? AND key = ?',
+            (scope, key)
+        )
+        return None if row is None else json.loads(row[0])
+
+    async def aggregate_rolls(self, scope: str) -> List[Dict[str, Any]]:
+        # Grouped in SQL, so only the counts are decoded. The key field comes
+        # from STATS_SCOPES, not from the caller.
+        key_path = f'$.{STATS_SCOPES[scope]}'
+        rows = await self._scene_store._run(
+            self._scene_store._fetch_all,
+            '''
+            SELECT
+                json_extract(document, ?) AS key,
+                json_array_length(document, '$.faces') AS dice_count,
+                (SELECT sum(value) FROM json_each(document, '$.faces')) AS dice_total,
+                json_extract(document, '$.result') AS result,
+                count(*)
+            FROM rolls
+            WHERE key IS NOT NULL
+            GROUP BY key, dice_count, dice_total, result
+            ''',
+            (key_path,)
+        )
+        return [
+            {'key': key, 'dice_count': dice_count, 'dice_total': dice_total, 'result': result, 'count': count}
+            for key, dice_count, dice_total, result, count in rows
+        ]
+
+    async def replace_stats(self, scope: str, documents: List[Dict[str, Any]]):
+        await self._scene_store._run(self._replace_stats, scope, documents)
+
+    # Everything below runs on the worker thread.
+
+    def _increment_stats(self, increments: Dict[Tuple[str, int], Dict[str, float]]):
+        # The worker thread is the only writer, so reading and rewriting each
+        # row in a transaction is as good as an atomic increment.
+        connection = self._scene_store._connection
+        with connection:
+            connection.execute('BEGIN')
+            for (scope, key), scope_increments in increments.items():
+                row = connection.execute(
+                    'SELECT document FROM roll_stats WHERE scope = ? AND key = ?',
+                    (scope, key)
+                ).fetchone()
+
+                document = json.loads(row[0]) if row is not None else {'scope': scope, 'key': key}
+                apply_increments(document, scope_increments)
+
+                connection.execute(
+                    'INSERT OR REPLACE INTO roll_stats (scope, key, document) VALUES (?, ?, ?)',
+                    (scope, key, _dumps(document))
+                )
+
+    def _replace_stats(self, scope: str, documents: List[Dict[str, Any]]):
+        connection = self._scene_store._connection
+        with connection:
+            connection.execute('BEGIN')
+            connection.execute('DELETE FROM roll_stats WHERE scope = ?', (scope,))
+            connection.executemany(
+                'INSERT INTO roll_stats (scope, key, document) VALUES (?, ?, ?)',
+                [(scope, document['key'], _dumps(document)) for document in documents]
+            )
+
+
+def _dumps(document: Dict[str, Any]) -> str:
+    return json.dumps(document, separators=(',', ':'))
@@ -0,0 +1,111 @@
+import time
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Optional, Tuple
+
+from .cache import LruCache
+from .metrics import REGISTRY
+
+ERRORS_SUPPRESSED = REGISTRY.counter(
+    'dfb_errors_suppressed_total',
+    'Error messages not sent because of error throttling',
+    ['error', 'reason'],
+)
+
+@dataclass(frozen=True)
+class ThrottleDecision:
+    """What to do about an error: send a message for it (noting how many like
+    it were suppressed since the last one), react to it instead, or neither.
+    """
+
+    send: bool
+    react: bool = False
+    suppressed: int = 0
+
+class _Entry:
+    __slots__ = ('sent_at', 'reacted', 'suppressed')
+
+    def __init__(self):
+        self.sent_at: Optional[float] = None
+        self.reacted = False
+        self.suppressed = 0
+
+class ErrorThrottle:
+    """Decides which error messages are worth sending, so that a burst of
+    errors (e.g., someone trying another bot's commands, which share our prefix)
+    doesn't flood a channel.
+
+    An error is identified by its channel, its user, and its type and text.
+    Once a message is sent for an error, the same error is suppressed for the
+    next window seconds, except that the first repeat gets a reaction, so the
+    user knows the command failed. Each channel also gets at most channel_limit
+    error messages per window, whatever the errors, and errors beyond that get
+    no reaction either, since a channel hitting the limit is already being
+    flooded. So however many errors there are, each error gets at most a
+    message and a reaction per window. Suppressed errors are counted, so the
+    next message sent for the error can say how many there were.
+
+    State is kept for the most recent max_errors errors and max_channels
+    channels, so it stays bounded however many users make mistakes.
+    """
+
+    window: float
+    channel_limit: int
+
+    def __init__(
+            self,
+            *,
+            window: float = 60.0,
+            channel_limit: int = 5,
+            max_errors: int = 4096,
+            max_channels: int = 1024,
+            clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.channel_limit = channel_limit
+
+        self._clock = clock
+        self._errors: LruCache[Tuple[int, int, str, str], _Entry] = LruCache(max_errors)
+        self._channel_sends: LruCache[int, Deque[float]] = LruCache(max_channels)
+
+    @classmethod
+    def from_config(cls, config) -> 'ErrorThrottle':
+        return cls(
+            window=config.errors.window,
+            channel_limit=config.errors.channel_limit,
+        )
+
+    def check(self, channel_id: int, user_id: int, error: Exception) -> ThrottleDecision:
+        """Decide what to do about an error."""
+        now = self._clock()
+        error_type = type(error).__name__
+        key = (channel_id, user_id, error_type, str(error))
+
+        entry = self._errors.get(key)
+        if entry is None:
+            entry = _Entry()
+            self._errors.put(key, entry)
+
+        if entry.sent_at is not None and now - entry.sent_at < self.window:
+            entry.suppressed += 1
+            ERRORS_SUPPRESSED.inc(error=error_type, reason='repeated')
+            react, entry.reacted = not entry.reacted, True
+            return ThrottleDecision(send=False, react=react)
+
+        sends = self._channel_sends.get(channel_id)
+        if sends is None:
+            sends = deque()
+            self._channel_sends.put(channel_id, sends)
+        while sends and now - sends[0] >= self.window:
+            sends.popleft()
+
+        if len(sends) >= self.channel_limit:
+            entry.suppressed += 1
+            ERRORS_SUPPRESSED.inc(error=error_type, reason='channel_limit')
+            return ThrottleDecision(send=False)
+
+        sends.append(now)
+        suppressed, entry.suppressed = entry.suppressed, 0
+        entry.sent_at = now
+        entry.reacted = False
+        return ThrottleDecision(send=True, suppressed=suppressed)
@@ -0,0 +1,192 @@
+import json
+import logging
+import time
+
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, TextIO
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+class Span:
+    """A timed operation within a trace, e.g., a database call, with the spans
+    of the operations it's made up of.
+    """
+
+    __slots__ = ('name', 'attributes', 'children', 'start', 'duration', '_token')
+
+    name: str
+    attributes: Dict[str, Any]
+    children: List['Span']
+    start: Optional[float]
+    duration: Optional[float]
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.children = []
+        self.start = None
+        self.duration = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+
+        if exc_type is not None:
+            self.attributes['error'] = exc_type.__name__
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """Convert the span tree to a dict, with times in milliseconds relative
+        to origin (by default, the start of this span).
+        """
+        if origin is None:
+            origin = self.start
+
+        return {
+            'name': self.name,
+            'offset_ms': _milliseconds(self.start - origin),
+            'duration_ms': _milliseconds(self.duration),
+            'attributes': self.attributes,
+            'children': [child.to_dict(origin) for child in self.children],
+        }
+
+    def format_tree(self, origin: Optional[float] = None, depth: int = 0) -> List[str]:
+        """Render the span tree as indented lines, one per span."""
+        if origin is None:
+            origin = self.start
+
+        attributes = ', '.join(f'{key}={value}' for key, value in self.attributes.items())
+        lines = [
+            f'{"  " * depth}{self.name} '
+            f'+{_milliseconds(self.start - origin)}ms '
+            f'{_milliseconds(self.duration)}ms'
+            + (f' [{attributes}]' if attributes else '')
+        ]
+
+        for child in self.children:
+            lines.extend(child.format_tree(origin, depth + 1))
+
+        return lines
+
+class _Trace(Span):
+    """The root span of a trace, which reports the whole tree when it ends."""
+
+    __slots__ = ('timestamp',)
+
+    def __enter__(self):
+        self.timestamp = time.time()
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        _report(self)
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        return {'timestamp': self.timestamp, **super().to_dict(origin)}
+
+class _NullSpan:
+    """Stands in for a span outside of any trace."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class JsonLinesExporter:
+    """Write each finished trace to a file as one line of JSON."""
+
+    path: str
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: TextIO = open(path, 'a', buffering=1, encoding='utf-8')
+
+    def export(self, trace: Span):
+        self._file.write(json.dumps(trace.to_dict(), default=str) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+# The innermost span in progress in the current task, if any.
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+# Traces at least this many seconds long are logged.
+_slow_threshold: float = 1.0
+
+_exporter: Optional[JsonLinesExporter] = None
+
+
+def configure_tracing(config: Config):
+    global _slow_threshold, _exporter
+
+    _slow_threshold = config.tracing.slow_threshold
+
+    if config.tracing.export_file is not None:
+        _exporter = JsonLinesExporter(config.tracing.export_file)
+        logger.info('Exporting traces to %s', config.tracing.export_file)
+
+def close_tracing():
+    """Close the trace exporter, if any."""
+    global _exporter
+
+    if _exporter is not None:
+        _exporter.close()
+        _exporter = None
+
+def trace(name: str, **attributes) -> Span:
+    """Start a new trace, as a context manager.
+
+    The trace is a root span, even if another trace is in progress, e.g., when
+    a background task is started from within a command. When it ends, it's
+    logged if it was slow, and exported if an exporter is configured.
+    """
+    return _Trace(name, attributes)
+
+def span(name: str, **attributes) -> Span:
+    """Start a span within the current trace, as a context manager.
+
+    Outside of a trace (or after it has finished, for background work that
+    outlives it), this does nothing.
+    """
+    parent = _current_span.get()
+    if parent is None or parent.duration is not None:
+        return _NULL_SPAN
+
+    child = Span(name, attributes)
+    parent.children.append(child)
+    return child
+
+def annotate(**attributes):
+    """Add attributes to the current span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def _report(trace: _Trace):
+    if _exporter is not None:
+        try:
+            _exporter.export(trace)
+        except Exception:
+            logger.exception('Error exporting trace %s', trace.name)
+
+    if trace.duration >= _slow_threshold:
+        logger.warning(
+            'Slow %s (%sms):\n%s',
+            trace.name,
+            _milliseconds(trace.duration),
+            '\n'.join(trace.format_tree()),
+        )
+
+def _milliseconds(seconds: float) -> float:
+    return round(seconds * 1000, 3)
@@ -1,6 +1,8 @@
+import asyncio
+
 from abc import ABCMeta, abstractmethod
 from itertools import zip_longest
-from typing import List, Mapping
+from typing import Awaitable, Iterable, List, Mapping
 
 def join_as_columns(values):
     columns = tuple(str(value).splitlines() for value in values)
@@ -11,6 +13,60 @@ def join_as_columns(values):
         for row in zip_longest(*columns, fillvalue='')
     )
 
+def paginate(lines: Iterable[str], limit: int, *, continuation: str = None) -> List[str]:
+    """Pack lines into as few pages as possible, each at most limit characters
+    long (including the newlines joining the lines).
+
+    Lines are never split unless a single line is too long for a page on its
+    own. If continuation is given, it is used as the first line of every page
+    after the first.
+    """
+    pages = []
+    page_lines = []
+    page_length = 0
+    page_has_content = False
+
+    def _finish_page():
+        nonlocal page_lines, page_length, page_has_content
+        pages.append('\n'.join(page_lines))
+        page_lines = []
+        page_length = 0
+        page_has_content = False
+        if continuation is not None:
+            page_lines.append(continuation)
+            page_length = len(continuation)
+
+    for line in lines:
+        while True:
+            separator = 1 if page_lines else 0
+            room = limit - page_length - separator
+
+            if len(line) <= room:
+                page_lines.append(line)
+                page_length += separator + len(line)
+                page_has_content = True
+                break
+
+            if page_has_content:
+                # Try again on a fresh page before resorting to splitting.
+                _finish_page()
+                continue
+
+            if room <= 0:
+                raise ValueError('Continuation line does not fit on a page')
+
+            # The line won't fit even on an empty page, so put as much of it as
+            # we can here and carry on with the rest on the next page.
+            page_lines.append(line[:room])
+            page_has_content = True
+            line = line[room:]
+            _finish_page()
+
+    if page_has_content:
+        pages.append('\n'.join(page_lines))
+
+    return pages
+
 def pluralize(n: int, singular: str, plural: str) -> str:
     """Choose between the singular and plural forms of a word depending on the
     given count.
@@ -20,6 +76,21 @@ def pluralize(n: int, singular: str, plural: str) -> str:
     else:
         return plural
 
+async def gather_limited(aws: Iterable[Awaitable], *, limit: int) -> List:
+    """Run awaitables concurrently, with at most limit running at once.
+
+    Like asyncio.gather with return_exceptions=True, the results are returned in
+    order, with any exception raised by an awaitable in place of its result. A
+    failure in one awaitable does not affect the others.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(_run(aw) for aw in aws), return_exceptions=True)
+
 
 class ValidationError(Exception):
     """Exception indicating that an object's state is invalid."""
@@ -0,0 +1,71 @@
+import asyncio
+
+from unittest import TestCase
+
+from discord_fate_bot.bot import AutoShardedDiscordFateBot, DiscordFateBot, create_bot, shard_groups
+from discord_fate_bot.config import Config
+from discord_fate_bot.storage.memory import MemorySceneStore
+
+class ShardingTests(TestCase):
+    """Tests for running the bot sharded"""
+
+    def _create_bot(self, shard_ids=None, **environ):
+        config = Config.from_environ({'DFB_BOT_TOKEN': 'test', **environ})
+        return create_bot(config, MemorySceneStore(), shard_ids)
+
+    def test_shard_groups(self):
+        """Test that shards are dealt out round-robin to processes"""
+        self.assertEqual(shard_groups(5, 2), [[0, 2, 4], [1, 3]])
+        self.assertEqual(shard_groups(2, 4), [[0], [1]])
+
+    def test_unsharded(self):
+        """Test that an unsharded bot is a plain bot"""
+        bot = self._create_bot()
+        self.assertIs(type(bot), DiscordFateBot)
+        self.assertIsNone(bot.shard_count)
+
+    def test_single_shard(self):
+        """Test that a single shard runs in a plain bot"""
+        bot = self._create_bot([2], DFB_SHARDING_COUNT='4')
+        self.assertIs(type(bot), DiscordFateBot)
+        self.assertEqual((bot.shard_id, bot.shard_count), (2, 4))
+
+    def test_several_shards(self):
+        """Test that several shards in one process need an auto-sharded bot"""
+        bot = self._create_bot([1, 3], DFB_SHARDING_COUNT='4')
+        self.assertIsInstance(bot, AutoShardedDiscordFateBot)
+        self.assertEqual((bot.shard_ids, bot.shard_count), ([1, 3], 4))
+
+
+class StartupTests(TestCase):
+    """Tests for starting the bot up"""
+
+    def test_run_overlaps_start_up_phases(self):
+        """Test that extensions load and the store opens while logging in"""
+        async def _test():
+            config = Config.from_environ({'DFB_BOT_TOKEN': 'test'})
+            bot = create_bot(config, MemorySceneStore())
+            cogs = []
+
+            async def _login(token):
+                await asyncio.sleep(0.05)
+
+            async def _connect():
+                cogs.extend(bot.cogs)
+                bot.dispatch('ready')
+                await asyncio.sleep(0)
+
+            bot.login = _login
+            bot.connect = _connect
+
+            with self.assertLogs('discord_fate_bot.startup'):
+                await bot.run()
+            return bot, cogs
+
+        bot, cogs = asyncio.run(_test())
+        phases = bot.startup.phases
+
+        self.assertIn('Scene Management', cogs)
+        self.assertLess(phases['load extensions'][0], phases['log in'][0] + phases['log in'][1])
+        self.assertLess(phases['open storage'][0], phases['log in'][0] + phases['log in'][1])
+        self.assertIsNotNone(phases['connect'][1])
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from discord_fate_bot.cache import LruCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class LruCacheTests(TestCase):
+    """Tests for cache.LruCache"""
+
+    def test_get_counts_hits_and_misses(self):
+        """Test that lookups are counted"""
+        cache = LruCache(2)
+        cache.put(1, 'one')
+        self.assertEqual(cache.get(1), 'one')
+        self.assertIsNone(cache.get(2))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        """Test that the least recently used entry is evicted when full"""
+        cache = LruCache(2)
+        cache.put(1, 'one')
+        cache.put(2, 'two')
+        cache.get(1)
+        cache.put(3, 'three')
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_expires_after_ttl(self):
+        """Test that entries older than the ttl are treated as missing"""
+        clock = FakeClock()
+        cache = LruCache(2, ttl=10, clock=clock)
+        cache.put(1, 'one')
+        clock.now = 10
+        self.assertIsNone(cache.get(1))
+        self.assertNotIn(1, cache)
+
+    def test_zero_size_disables(self):
+        """Test that a zero-size cache never stores anything"""
+        cache = LruCache(0)
+        cache.put(1, 'one')
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+from unittest import TestCase
+
+from discord_fate_bot.database import Document, SchemaVersionError, migration
+
+@dataclass
+class Widget(Document, version=3):
+    name: str
+    size: int = 0
+
+    @migration(from_version=1)
+    def _from_v1(data):
+        data['title'] = data.pop('label')
+        return data
+
+    @migration(from_version=2)
+    def _from_v2(data):
+        data['name'] = data.pop('title')
+        return data
+
+class DocumentMigrationTests(TestCase):
+    """Tests for database.Document migrations"""
+
+    def test_current_version_is_untouched(self):
+        """Test that a current document is read without migrating"""
+        self.assertFalse(Widget.needs_migration({'name': 'a', '_v': 3}))
+        self.assertEqual(Widget.from_dict({'name': 'a', '_v': 3}), Widget(name='a'))
+
+    def test_migrations_are_chained(self):
+        """Test that an old document is upgraded through every version"""
+        data = {'label': 'a', 'size': 2, '_v': 1}
+        self.assertTrue(Widget.needs_migration(data))
+        self.assertEqual(Widget.migrate_dict(data), {'name': 'a', 'size': 2, '_v': 3})
+        self.assertEqual(Widget.from_dict(data), Widget(name='a', size=2))
+
+    def test_missing_migration(self):
+        """Test that a version with no migration path is an error"""
+        with self.assertRaises(SchemaVersionError):
+            Widget.from_dict({'name': 'a'})
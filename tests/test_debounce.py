@@ -0,0 +1,42 @@
+import asyncio
+
+from unittest import TestCase
+
+from discord_fate_bot.debounce import Debouncer
+from discord_fate_bot.locks import LockRegistry
+
+class DebouncerTests(TestCase):
+    """Tests for debounce.Debouncer"""
+
+    def setUp(self):
+        self.flushed = []
+        self.locks = LockRegistry()
+
+    async def _record(self, target):
+        self.flushed.append(target)
+
+    def test_coalesces_marks_within_interval(self):
+        """Test that a burst of marks is flushed once with the latest target"""
+        async def _test():
+            debouncer = Debouncer(0.05, self._record, self.locks.lock)
+            debouncer.mark_dirty(1, 'first')
+            await asyncio.sleep(0.01)
+            for target in ('second', 'third', 'fourth'):
+                debouncer.mark_dirty(1, target)
+            await asyncio.sleep(0.1)
+
+        asyncio.run(_test())
+        self.assertEqual(self.flushed, ['first', 'fourth'])
+
+    def test_flush_all_runs_pending(self):
+        """Test that flush_all flushes every pending key immediately"""
+        async def _test():
+            debouncer = Debouncer(60, self._record, self.locks.lock)
+            debouncer.mark_dirty(1, 'one')
+            await asyncio.sleep(0)
+            debouncer.mark_dirty(1, 'one again')
+            debouncer.mark_dirty(2, 'two')
+            await debouncer.flush_all()
+
+        asyncio.run(_test())
+        self.assertEqual(sorted(self.flushed), ['one', 'one again', 'two'])
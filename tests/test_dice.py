@@ -1,6 +1,10 @@
-from unittest import TestCase
+from itertools import product
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
 
-from discord_fate_bot.dice import Value
+from discord_fate_bot.dice import (
+    FateDiePool, Outcome, Roll, RollContext, Value, numpy, outcome_for
+)
 
 class DiceValueTests(TestCase):
     """Tests for dice.Value"""
@@ -20,3 +24,106 @@ class DiceValueTests(TestCase):
         result = 3 + Value(4)
         self.assertEqual(result, Value(7))
 
+
+class OutcomeTests(TestCase):
+    """Tests for dice.outcome_for"""
+
+    def test_outcome_thresholds(self):
+        """Test the shifts needed for each outcome"""
+        self.assertEqual(outcome_for(-1), Outcome.FAIL)
+        self.assertEqual(outcome_for(0), Outcome.TIE)
+        self.assertEqual(outcome_for(2), Outcome.SUCCESS)
+        self.assertEqual(outcome_for(3), Outcome.SUCCESS_WITH_STYLE)
+
+class RollBatchTests(TestCase):
+    """Tests for DiePool.roll_many"""
+
+    context = RollContext(modifiers=(Value(2),), opposition=Value(1))
+
+    def assertBatchConsistent(self, batch):
+        results = batch.results()
+        outcomes = batch.outcomes()
+
+        for i in range(len(batch)):
+            roll = batch.roll(i)
+            self.assertEqual(roll.result(), Value(int(results[i])))
+            self.assertEqual(roll.outcome(), outcomes[i])
+
+        self.assertEqual(sum(batch.outcome_counts().values()), len(batch))
+
+    def test_pure_python_batch(self):
+        """Test that a pure-Python batch agrees with its Roll objects"""
+        batch = FateDiePool().roll_many(200, self.context, vectorized=False)
+        self.assertBatchConsistent(batch)
+
+    @skipUnless(numpy, 'NumPy is not installed')
+    def test_vectorized_batch(self):
+        """Test that a vectorized batch agrees with its Roll objects"""
+        batch = FateDiePool().roll_many(200, self.context, vectorized=True)
+        self.assertBatchConsistent(batch)
+
+class RollRenderingTests(TestCase):
+    """Tests for the renderings DiePool memoizes for its rolls"""
+
+    def test_memoized_rendering_matches_direct_roll(self):
+        """Test that a memoized roll renders the same as a roll built directly
+        from its faces
+        """
+        pool = FateDiePool()
+        context = RollContext(modifiers=(Value(2),), opposition=Value(1))
+
+        for face_indices in product(range(3), repeat=4):
+            for _ in range(2):
+                roll = pool.roll_for_indices(face_indices, context)
+                direct = Roll(roll.faces, context)
+                self.assertEqual(roll.dice_display(), direct.dice_display())
+                self.assertEqual(roll.explanation(), direct.explanation())
+                self.assertEqual(roll.total(), direct.total())
+
+    def test_same_faces_share_rendering(self):
+        """Test that rolls of the same faces reuse one rendering"""
+        pool = FateDiePool()
+        first = pool.roll_for_indices((0, 1, 2, 1), RollContext())
+        second = pool.roll_for_indices((0, 1, 2, 1), RollContext(modifiers=(Value(3),)))
+        other = pool.roll_for_indices((1, 1, 2, 0), RollContext())
+
+        self.assertIs(first.rendering, second.rendering)
+        self.assertIsNot(first.rendering, other.rendering)
+
+    def test_memo_is_bounded(self):
+        """Test that the memo stops growing at MAX_MEMOIZED_RENDERINGS"""
+        pool = FateDiePool()
+
+        with patch('discord_fate_bot.dice.MAX_MEMOIZED_RENDERINGS', 5):
+            rolls = [
+                pool.roll_for_indices(face_indices, RollContext())
+                for face_indices in product(range(3), repeat=4)
+            ]
+
+        self.assertEqual(len(pool._renderings), 5)
+        self.assertEqual(
+            [roll.dice_total() for roll in rolls],
+            [Value(sum(face_indices) - 4) for face_indices in product(range(3), repeat=4)],
+        )
+
+class DiceValueFormattingTests(TestCase):
+    """Tests for formatting and comparing dice.Value"""
+
+    def test_str_variants(self):
+        """Test the plus, no-plus and spaced forms"""
+        self.assertEqual(str(Value(2)), '+2')
+        self.assertEqual(str(Value(2).no_plus()), '2')
+        self.assertEqual(str(Value(-2).with_space()), '− 2')
+        self.assertEqual(str(Value(-2).no_plus()), '−2')
+
+    def test_variants_compare_equal(self):
+        """Test that formatting variants don't affect equality"""
+        self.assertEqual(Value(3).no_plus(), Value(3))
+        self.assertEqual(Value(3).with_space(), Value(3))
+
+    def test_compare_with_int(self):
+        """Test ordering against plain ints"""
+        self.assertFalse(Value(0) > 0)
+        self.assertTrue(Value(1) <= 1)
+        self.assertTrue(Value(-1) < 0)
+        self.assertTrue(Value(3) >= 3)
@@ -0,0 +1,216 @@
+import asyncio
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from discord.ext.commands import BadArgument
+
+from discord_fate_bot.bot import create_bot
+from discord_fate_bot.config import Config
+from discord_fate_bot.dice import FateDiePool, RollContext, Value
+from discord_fate_bot.extensions.rolling import MAX_VALUE, Modifier, Opposition
+from discord_fate_bot.history import RollHistoryWriter, RollRecord
+from discord_fate_bot.storage.memory import MemoryRollStore, MemorySceneStore
+
+class _SlowRollStore(MemoryRollStore):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.release = None
+
+    async def insert_rolls(self, documents):
+        self.batches.append(len(documents))
+        if self.release is not None:
+            await self.release.wait()
+        await super().insert_rolls(documents)
+
+class _BsonLimitedRollStore(_SlowRollStore):
+    """Fails whole batches holding integers MongoDB can't store, as its
+    driver does.
+    """
+
+    async def insert_rolls(self, documents):
+        for document in documents:
+            values = [document['total'], document['result'], *document['modifiers']]
+            if any(not -2 ** 63 <= value < 2 ** 63 for value in values):
+                raise OverflowError('MongoDB can only handle up to 8-byte ints')
+        await super().insert_rolls(documents)
+
+def _record(result):
+    return RollRecord(
+        channel_id=1, guild_id=None, player_id=1, rolled_at=0.0, faces=[0, 0, 0, 0],
+        modifiers=[], opposition=None, total=result, result=result, outcome=1,
+    )
+
+class RollRecordTests(TestCase):
+    """Tests for history.RollRecord"""
+
+    def test_for_roll(self):
+        """Test that a record captures the faces, context, and result of a roll"""
+        context = RollContext(modifiers=(Value(2), Value(-1)), opposition=Value(3))
+        roll = FateDiePool().roll_for_indices((2, 2, 1, 0), context)
+
+        record = RollRecord.for_roll(
+            roll, channel_id=1, guild_id=2, player_id=3, rolled_at=4.0
+        )
+
+        self.assertEqual(record.faces, [1, 1, 0, -1])
+        self.assertEqual(record.modifiers, [2, -1])
+        self.assertEqual((record.opposition, record.total, record.result), (3, 2, -1))
+        self.assertEqual(RollRecord.from_dict(record.to_dict()), record)
+
+class RollHistoryWriterTests(TestCase):
+    """Tests for history.RollHistoryWriter"""
+
+    def test_writes_full_batches_at_once(self):
+        """Test that rolls are written as soon as a batch fills up"""
+        async def _test():
+            store = _SlowRollStore()
+            writer = RollHistoryWriter(store, batch_size=3, flush_interval=60)
+            for result in range(4):
+                await writer.record(_record(result))
+                await asyncio.sleep(0.01)
+
+            batches = list(store.batches)
+            await writer.close()
+            return batches, store
+
+        batches, store = asyncio.run(_test())
+        self.assertEqual(batches, [3])
+        self.assertEqual(store.batches, [3, 1])
+        self.assertEqual([document['result'] for document in store.documents], list(range(4)))
+
+    def test_writes_partial_batches_after_interval(self):
+        """Test that a partial batch is written once the interval passes"""
+        async def _test():
+            store = _SlowRollStore()
+            writer = RollHistoryWriter(store, batch_size=100, flush_interval=0.01)
+            await writer.record(_record(0))
+            await asyncio.sleep(0.05)
+
+            batches = list(store.batches)
+            await writer.close()
+            return batches
+
+        self.assertEqual(asyncio.run(_test()), [1])
+
+    def test_backpressure(self):
+        """Test that recording waits once too many rolls are pending"""
+        async def _test():
+            store = _SlowRollStore()
+            store.release = asyncio.Event()
+            writer = RollHistoryWriter(store, batch_size=2, flush_interval=60, max_pending=4)
+
+            for result in range(4):
+                await writer.record(_record(result))
+
+            blocked = asyncio.ensure_future(writer.record(_record(4)))
+            await asyncio.sleep(0.01)
+            was_blocked = not blocked.done()
+
+            store.release.set()
+            await blocked
+            await writer.close()
+            return was_blocked, store
+
+        was_blocked, store = asyncio.run(_test())
+        self.assertTrue(was_blocked)
+        self.assertEqual(len(store.documents), 5)
+
+    def test_flush_updates_stats(self):
+        """Test that flushing writes the buffered rolls and their stats"""
+        async def _test():
+            store = _SlowRollStore()
+            writer = RollHistoryWriter(store, batch_size=100, flush_interval=60)
+            await writer.record(_record(1))
+            await writer.record(_record(-1))
+            await writer.flush()
+
+            stats = await store.find_stats('player', 1)
+            await writer.close()
+            return stats
+
+        stats = asyncio.run(_test())
+        self.assertEqual(stats['rolls'], 2)
+        self.assertEqual(stats['outcomes'], {'0': 1, '2': 1})
+
+    def test_extreme_modifiers_do_not_drop_batch(self):
+        """Test that an oversized modifier is rejected before it's rolled, and
+        that the largest allowed ones are written along with the rest of their
+        batch
+        """
+        async def _modifiers(*arguments):
+            modifiers = []
+            for argument in arguments:
+                try:
+                    modifiers.append(await Modifier().convert(None, argument))
+                except BadArgument:
+                    pass
+            return modifiers
+
+        async def _test():
+            store = _BsonLimitedRollStore()
+            writer = RollHistoryWriter(store, batch_size=100, flush_interval=60)
+
+            rolls = [
+                ['+2'],
+                ['+99999999999999999999'],
+                [f'+{MAX_VALUE - 1}'] * 8,
+                [f'-{MAX_VALUE - 1}'],
+            ]
+            for channel_id, arguments in enumerate(rolls):
+                context = RollContext(modifiers=tuple(await _modifiers(*arguments)))
+                roll = FateDiePool().roll(context)
+                await writer.record(RollRecord.for_roll(
+                    roll, channel_id=channel_id, guild_id=None, player_id=1, rolled_at=0.0
+                ))
+
+            await writer.close()
+            return store
+
+        store = asyncio.run(_test())
+        self.assertEqual(len(store.documents), 4)
+        self.assertEqual([len(document['modifiers']) for document in store.documents], [1, 0, 8, 1])
+
+        with self.assertRaises(BadArgument):
+            asyncio.run(Opposition().convert(None, str(-MAX_VALUE)))
+
+class RollingCogHistoryTests(TestCase):
+    """Tests for the roll history of extensions.rolling.RollingCog"""
+
+    def _unload(self):
+        async def _test():
+            config = Config.from_environ({'DFB_BOT_TOKEN': 'test'})
+            bot = create_bot(config, MemorySceneStore())
+            bot.load_extension('discord_fate_bot.extensions.rolling')
+
+            await bot.get_cog('Rolling').roll_history.record(_record(1))
+
+            bot.unload_extension('discord_fate_bot.extensions.rolling')
+            hooks_while_closing = len(bot.shutdown_hooks)
+            for hook in list(bot.shutdown_hooks):
+                await hook()
+            await asyncio.sleep(0)
+
+            return bot, hooks_while_closing, await bot.scene_store.roll_store().find_rolls(1)
+
+        return asyncio.run(_test())
+
+    def test_unload_writes_out_history(self):
+        """Test that unloading writes out the buffered rolls, and that shutdown
+        waits for it
+        """
+        bot, hooks_while_closing, rolls = self._unload()
+        self.assertEqual(hooks_while_closing, 1)
+        self.assertEqual(bot.shutdown_hooks, [])
+        self.assertEqual([roll['result'] for roll in rolls], [1])
+
+    def test_unload_logs_close_errors(self):
+        """Test that an error writing out the history on unload is logged"""
+        async def _close(writer):
+            raise RuntimeError('database is gone')
+
+        with patch.object(RollHistoryWriter, 'close', _close):
+            with self.assertLogs('discord_fate_bot.extensions.rolling', 'ERROR'):
+                bot, _, _ = self._unload()
+        self.assertEqual(bot.shutdown_hooks, [])
@@ -0,0 +1,40 @@
+import asyncio
+
+from unittest import TestCase
+
+from discord_fate_bot.locks import LockRegistry
+
+class LockRegistryTests(TestCase):
+    """Tests for locks.LockRegistry"""
+
+    def test_drops_idle_locks(self):
+        """Test that a lock is dropped once nobody holds or waits for it"""
+        registry = LockRegistry()
+
+        async def _test():
+            async with registry.lock(1):
+                self.assertEqual(len(registry), 1)
+
+        asyncio.run(_test())
+        self.assertEqual(len(registry), 0)
+
+    def test_serializes_and_records_contention(self):
+        """Test that waiters are serialized and their waits are recorded"""
+        registry = LockRegistry()
+        order = []
+
+        async def _hold(name):
+            async with registry.lock(1):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        async def _test():
+            await asyncio.gather(_hold('a'), _hold('b'))
+
+        asyncio.run(_test())
+        self.assertEqual(order, ['a', 'b'])
+        self.assertEqual(len(registry), 0)
+        self.assertEqual(registry.stats.acquisitions, 2)
+        self.assertEqual(registry.stats.contended, 1)
+        self.assertEqual(registry.key_stats.peek(1).contended, 1)
+        self.assertGreater(registry.stats.max_wait, 0)
@@ -0,0 +1,80 @@
+import asyncio
+
+from unittest import TestCase
+
+from discord_fate_bot.bot import create_bot
+from discord_fate_bot.config import Config
+from discord_fate_bot.metrics import MetricsRegistry
+from discord_fate_bot.storage.memory import MemorySceneStore
+
+class MetricsRegistryTests(TestCase):
+    """Tests for metrics.MetricsRegistry"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        """Test that counters render one sample per label combination"""
+        counter = self.registry.counter('errors_total', 'Errors', ['command'])
+        counter.inc(command='roll')
+        counter.inc(2, command='scene "new"')
+
+        self.assertEqual(counter.value(command='roll'), 1)
+        self.assertEqual(self.registry.render(), (
+            '# HELP errors_total Errors\n'
+            '# TYPE errors_total counter\n'
+            'errors_total{command="roll"} 1\n'
+            'errors_total{command="scene \\"new\\""} 2\n'
+        ))
+
+    def test_histogram(self):
+        """Test that histogram buckets are rendered cumulatively"""
+        histogram = self.registry.histogram('latency_seconds', 'Latency', buckets=[0.1, 1])
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(5)
+
+        self.assertEqual(histogram.count(), 3)
+        self.assertEqual(self.registry.render(), (
+            '# HELP latency_seconds Latency\n'
+            '# TYPE latency_seconds histogram\n'
+            'latency_seconds_bucket{le="0.1"} 2\n'
+            'latency_seconds_bucket{le="1"} 2\n'
+            'latency_seconds_bucket{le="+Inf"} 3\n'
+            'latency_seconds_sum 5.15\n'
+            'latency_seconds_count 3\n'
+        ))
+
+    def test_labels_are_checked(self):
+        """Test that recording with the wrong labels is an error"""
+        counter = self.registry.counter('errors_total', 'Errors', ['command'])
+        with self.assertRaises(ValueError):
+            counter.inc(error='KeyError')
+        with self.assertRaises(ValueError):
+            self.registry.counter('errors_total', 'Errors again')
+
+    def test_registering_again_returns_existing(self):
+        """Test that registering a metric twice gives back the same metric"""
+        counter = self.registry.counter('errors_total', 'Errors', ['command'])
+        self.assertIs(self.registry.counter('errors_total', 'Errors', ['command']), counter)
+
+class MetricsCogTests(TestCase):
+    """Tests for extensions.metrics.MetricsCog"""
+
+    def test_unload_keeps_other_hooks(self):
+        """Test that unloading only removes the cog's own invoke hooks"""
+        async def _other_hook(ctx):
+            pass
+
+        async def _test():
+            config = Config.from_environ({'DFB_BOT_TOKEN': 'test'})
+            bot = create_bot(config, MemorySceneStore())
+            bot.load_extension('discord_fate_bot.extensions.metrics')
+
+            bot.before_invoke(_other_hook)
+            bot.unload_extension('discord_fate_bot.extensions.metrics')
+            return bot
+
+        bot = asyncio.run(_test())
+        self.assertIs(bot._before_invoke, _other_hook)
+        self.assertIsNone(bot._after_invoke)
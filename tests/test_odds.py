@@ -0,0 +1,30 @@
+from fractions import Fraction
+from unittest import TestCase
+
+from discord_fate_bot.dice import FateDiePool, Outcome, Value
+from discord_fate_bot.odds import dice_total_distribution, outcome_probabilities
+
+class OddsTests(TestCase):
+    """Tests for odds"""
+
+    def test_fate_dice_distribution(self):
+        """Test the well-known 4dF distribution"""
+        distribution = dice_total_distribution(FateDiePool())
+        self.assertEqual(distribution.min_total, -4)
+        self.assertEqual(distribution.counts, (1, 4, 10, 16, 19, 16, 10, 4, 1))
+        self.assertEqual(distribution.probability(0), Fraction(19, 81))
+
+    def test_outcome_probabilities(self):
+        """Test the odds of +2 vs 3"""
+        probabilities = outcome_probabilities(FateDiePool(), Value(2), Value(3))
+        self.assertEqual(probabilities, {
+            Outcome.FAIL: Fraction(50, 81),
+            Outcome.TIE: Fraction(16, 81),
+            Outcome.SUCCESS: Fraction(14, 81),
+            Outcome.SUCCESS_WITH_STYLE: Fraction(1, 81),
+        })
+
+    def test_out_of_range(self):
+        """Test odds where the outcome is certain"""
+        probabilities = outcome_probabilities(FateDiePool(), Value(10), Value(0))
+        self.assertEqual(probabilities[Outcome.SUCCESS_WITH_STYLE], 1)
@@ -0,0 +1,73 @@
+import asyncio
+
+from unittest import TestCase
+
+from discord_fate_bot.outbound import OutboundQueue, Priority
+
+class OutboundQueueTests(TestCase):
+    """Tests for outbound.OutboundQueue"""
+
+    def setUp(self):
+        self.sent = []
+
+    def _action(self, name, result=None):
+        async def _run():
+            self.sent.append(name)
+            await asyncio.sleep(0.01)
+            return result
+        return _run
+
+    def test_most_urgent_first(self):
+        """Test that queued actions are sent in priority order"""
+        async def _test():
+            queue = OutboundQueue(channel_concurrency=1)
+            await asyncio.gather(
+                queue.submit(1, Priority.SCENE, self._action('edit 1')),
+                queue.submit(1, Priority.COSMETIC, self._action('reaction')),
+                queue.submit(1, Priority.SCENE, self._action('edit 2')),
+                queue.submit(1, Priority.RESPONSE, self._action('roll')),
+            )
+
+        asyncio.run(_test())
+        self.assertEqual(self.sent, ['edit 1', 'roll', 'edit 2', 'reaction'])
+
+    def test_responses_have_a_slot_of_their_own(self):
+        """Test that a response doesn't wait for background actions to finish"""
+        async def _test():
+            queue = OutboundQueue(channel_concurrency=2)
+            edits = asyncio.gather(*(
+                queue.submit(1, Priority.SCENE, self._action(f'edit {i}'))
+                for i in range(3)
+            ))
+            await asyncio.sleep(0)
+            await queue.submit(1, Priority.RESPONSE, self._action('roll'))
+            await edits
+
+        asyncio.run(_test())
+        self.assertEqual(self.sent, ['edit 0', 'roll', 'edit 1', 'edit 2'])
+
+    def test_superseded_actions_are_dropped(self):
+        """Test that only the latest queued action with a key is sent"""
+        async def _test():
+            queue = OutboundQueue(channel_concurrency=1)
+            return await asyncio.gather(
+                queue.submit(1, Priority.RESPONSE, self._action('roll')),
+                queue.submit(1, Priority.SCENE, self._action('edit 1', 1), key='edit'),
+                queue.submit(1, Priority.SCENE, self._action('edit 2', 2), key='edit'),
+            )
+
+        results = asyncio.run(_test())
+        self.assertEqual(self.sent, ['roll', 'edit 2'])
+        self.assertEqual(results, [None, 2, 2])
+
+    def test_deferred_actions_are_batched(self):
+        """Test that deferred actions are sent together, once per key"""
+        async def _test():
+            queue = OutboundQueue(batch_delay=60)
+            queue.defer(1, self._action('thumbs up'), key='message')
+            queue.defer(1, self._action('check mark'), key='message')
+            queue.defer(1, self._action('ok'))
+            await queue.drain()
+
+        asyncio.run(_test())
+        self.assertEqual(self.sent, ['check mark', 'ok'])
@@ -0,0 +1,89 @@
+from collections import Counter
+from unittest import TestCase, skipUnless
+
+from discord_fate_bot.config import Config
+from discord_fate_bot.dice import FateDiePool, RollContext
+from discord_fate_bot.rng import ChannelRngs, DiceRng, numpy
+
+class DiceRngTests(TestCase):
+    """Tests for rng.DiceRng"""
+
+    def test_seeded_rolls_are_reproducible(self):
+        """Test that pools with the same seed roll the same faces"""
+        first_pool = FateDiePool(rng=DiceRng.seeded(42))
+        second_pool = FateDiePool(rng=DiceRng.seeded(42))
+        self.assertEqual(
+            [first_pool.roll(RollContext()).faces for _ in range(10)],
+            [second_pool.roll(RollContext()).faces for _ in range(10)]
+        )
+
+        first, second = DiceRng.seeded(42), DiceRng.seeded(42)
+        self.assertEqual(first.indices(6, 500), second.indices(6, 500))
+
+    def test_faces_are_fair(self):
+        """Test that every face comes up about as often, even when the faces
+        don't divide a byte evenly
+        """
+        rng = DiceRng.seeded(1)
+        counts = Counter(rng.indices(3, 30_000))
+
+        self.assertEqual(set(counts), {0, 1, 2})
+        for count in counts.values():
+            self.assertAlmostEqual(count / 30_000, 1 / 3, delta=0.015)
+
+    def test_rejected_bytes_are_skipped(self):
+        """Test that bytes beyond the last whole set of faces are skipped"""
+        rng = DiceRng(lambda n: bytes([255, 254, 7] * n)[:n], buffer_size=3)
+        self.assertEqual(list(rng.indices(3, 2)), [254 % 3, 7 % 3])
+
+    @skipUnless(numpy, 'NumPy is not installed')
+    def test_index_array(self):
+        """Test that bulk rolls are in range and reproducible"""
+        indices = DiceRng.seeded(5).index_array(3, 10_000)
+        self.assertEqual(set(indices.tolist()), {0, 1, 2})
+        self.assertEqual(indices.tolist(), DiceRng.seeded(5).index_array(3, 10_000).tolist())
+
+    def test_many_faces(self):
+        """Test that dice with up to 256 faces roll every face"""
+        rng = DiceRng.seeded(9)
+        self.assertEqual(set(rng.indices(256, 20_000)), set(range(256)))
+
+        with self.assertRaises(ValueError):
+            rng.index(257)
+
+    @skipUnless(numpy, 'NumPy is not installed')
+    def test_many_faces_array(self):
+        """Test that bulk rolls of dice with up to 256 faces are in range"""
+        for rng in (DiceRng.seeded(9), DiceRng.from_numpy(numpy.random.default_rng(9))):
+            indices = rng.index_array(256, 20_000)
+            self.assertEqual(set(indices.tolist()), set(range(256)))
+
+class ChannelRngsTests(TestCase):
+    """Tests for rng.ChannelRngs"""
+
+    def test_seeded_channels_are_independent(self):
+        """Test that a seeded channel's rolls don't depend on other channels"""
+        alone = ChannelRngs(seed=3)
+        alone_indices = alone.for_channel(1).indices(3, 20)
+
+        interleaved = ChannelRngs(seed=3)
+        interleaved.for_channel(2).indices(3, 7)
+        self.assertEqual(interleaved.for_channel(1).indices(3, 20), alone_indices)
+
+    def test_secure_channels(self):
+        """Test that secure channels get the secure generator"""
+        rngs = ChannelRngs(seed=3, secure_channels={1})
+        self.assertIs(rngs.for_channel(1), rngs._secure)
+        self.assertIsNot(rngs.for_channel(2), rngs._secure)
+
+        with self.assertRaises(ValueError):
+            ChannelRngs(mode='secure', seed=3)
+
+    def test_from_config_skips_empty_channel_ids(self):
+        """Test that empty items in DFB_DICE_SECURE_CHANNELS are ignored"""
+        for secure_channels, expected in (('', set()), ('1,2,', {1, 2}), (' 3 , ,4', {3, 4})):
+            config = Config.from_environ({
+                'DFB_BOT_TOKEN': 'test',
+                'DFB_DICE_SECURE_CHANNELS': secure_channels,
+            })
+            self.assertEqual(ChannelRngs.from_config(config).secure_channels, expected)
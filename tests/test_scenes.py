@@ -0,0 +1,109 @@
+from unittest import TestCase
+
+from discord_fate_bot.scenes import Scene, SceneAspect
+
+class SceneChangesTests(TestCase):
+    """Tests for Scene.changes"""
+
+    def setUp(self):
+        self.scene = Scene(channel_id=1)
+        self.scene.add_aspect(SceneAspect(name='Darkness'))
+        self.scene.add_aspect(SceneAspect(name='Banana peel', boost=True, invokes=1))
+        self.scene.mark_saved()
+
+    def test_no_changes(self):
+        """Test that an untouched scene has no changes"""
+        self.assertFalse(self.scene.changes())
+
+class SceneStorageTests(TestCase):
+    """Tests for the stored form of scenes"""
+
+    def test_round_trip(self):
+        """Test that a scene survives being stored and loaded"""
+        scene = Scene(channel_id=1, message_ids={5}, description='Warehouse Five')
+        scene.add_aspect(SceneAspect(name='Darkness', invokes=2))
+        scene.add_aspect(SceneAspect(name='Banana peel', boost=True))
+        self.assertEqual(Scene.from_dict(scene.to_dict()), scene)
+
+    def test_empty_fields_are_omitted(self):
+        """Test that empty optional fields aren't stored"""
+        self.assertEqual(Scene(channel_id=1).to_dict(), {
+            'channel_id': 1,
+            'n': 1,
+            'a': [],
+            '_v': 2,
+        })
+
+    def test_version_1_is_migrated(self):
+        """Test that a version 1 document loads and upgrades"""
+        stored = {
+            '_id': 'abc',
+            '_v': 1,
+            'channel_id': 1,
+            'message_ids': [5],
+            'description': None,
+            'aspects': {'3': {'name': 'Darkness', 'boost': True, 'invokes': 1}},
+            'next_aspect_id': 4,
+        }
+
+        self.assertEqual(Scene.migrate_dict(stored), {
+            '_id': 'abc',
+            '_v': 2,
+            'channel_id': 1,
+            'm': [5],
+            'n': 4,
+            'a': [{'i': 3, 'n': 'Darkness', 'f': 3}],
+        })
+
+        scene = Scene.from_dict(stored)
+        self.assertEqual(scene.message_ids, {5})
+        self.assertEqual(scene.get_aspect(3), SceneAspect(name='Darkness', boost=True, invokes=1))
+
+    def test_version_1_compaction_step(self):
+        """Test that the version 1 migration step writes the version 2 form"""
+        stored = {
+            '_id': 'abc',
+            'channel_id': 1,
+            'message_ids': [],
+            'description': 'Warehouse Five',
+            'aspects': {
+                '1': {'name': 'Darkness', 'boost': False, 'invokes': 2},
+                '2': {'name': 'Banana peel', 'boost': True, 'invokes': 0},
+                '4': {'name': 'Crates'},
+            },
+            'next_aspect_id': 5,
+        }
+
+        self.assertEqual(Scene._compact(stored), {
+            '_id': 'abc',
+            'channel_id': 1,
+            'd': 'Warehouse Five',
+            'n': 5,
+            'a': [
+                {'i': 1, 'n': 'Darkness', 'f': 4},
+                {'i': 2, 'n': 'Banana peel', 'f': 1},
+                {'i': 4, 'n': 'Crates'},
+            ],
+        })
+        self.assertEqual(Scene._compact({'channel_id': 1}), {'channel_id': 1, 'n': 1, 'a': []})
+
+class ScenePagesTests(TestCase):
+    """Tests for Scene.pages"""
+
+    def test_small_scene_is_one_page(self):
+        """Test that a scene that fits in one message renders as one page"""
+        scene = Scene(channel_id=1, description='Warehouse Five')
+        scene.add_aspect(SceneAspect(name='Darkness'))
+        self.assertEqual(scene.pages(), [str(scene)])
+
+    def test_large_scene_is_split(self):
+        """Test that a long scene is split into pages within the limit"""
+        scene = Scene(channel_id=1)
+        for i in range(100):
+            scene.add_aspect(SceneAspect(name=f'Aspect number {i}', invokes=1))
+
+        pages = scene.pages(limit=500)
+        self.assertGreater(len(pages), 1)
+        self.assertTrue(all(len(page) <= 500 for page in pages))
+        self.assertTrue(all('[100]' not in page for page in pages[:-1]))
+        self.assertIn('[100]', pages[-1])
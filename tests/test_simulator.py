@@ -0,0 +1,49 @@
+from unittest import TestCase, skipUnless
+
+from discord_fate_bot.dice import FateDiePool, Outcome, Value, numpy
+from discord_fate_bot.odds import outcome_probabilities
+from discord_fate_bot.simulator import ContestScenario, RollScenario, Side, simulate
+
+@skipUnless(numpy, 'NumPy is not installed')
+class SimulatorTests(TestCase):
+    """Tests for simulator.simulate"""
+
+    def test_rolls_match_exact_odds(self):
+        """Test that simulated rolls come out close to the exact odds"""
+        trials = 200_000
+        histograms = simulate(RollScenario(Side(modifiers=(2,)), opposition=3), trials, seed=1)
+        probabilities = outcome_probabilities(FateDiePool(), Value(2), Value(3))
+
+        for outcome, probability in probabilities.items():
+            self.assertAlmostEqual(histograms['outcome'][outcome] / trials, float(probability), delta=0.005)
+        self.assertEqual(histograms['invokes spent'], {0: trials})
+
+    def test_invokes(self):
+        """Test that invokes are only spent on rolls short of the target"""
+        histograms = simulate(
+            RollScenario(Side(invokes=2), opposition=10, target=Outcome.TIE),
+            10_000, seed=1,
+        )
+        # Even +4 can't tie against 10, so every roll spends everything.
+        self.assertEqual(histograms['invokes spent'], {2: 10_000})
+        self.assertEqual(histograms['outcome'], {Outcome.FAIL: 10_000})
+
+        histograms = simulate(
+            RollScenario(Side(boosts=1, invoke_mode='reroll'), opposition=-10),
+            10_000, seed=1,
+        )
+        self.assertEqual(histograms['invokes spent'], {0: 10_000})
+
+    def test_seeded_results_are_reproducible(self):
+        """Test that a seed gives the same results however the work is split"""
+        scenario = ContestScenario(
+            Side(modifiers=(1,), invokes=1, invoke_mode='reroll'),
+            Side(modifiers=(2,), boosts=1),
+        )
+
+        in_process = simulate(scenario, 30_000, seed=7, chunk_size=10_000)
+        pooled = simulate(scenario, 30_000, seed=7, chunk_size=10_000, processes=2)
+
+        self.assertEqual(in_process, pooled)
+        self.assertEqual(sum(in_process['winner'].values()), 30_000)
+        self.assertEqual(sum(in_process['exchanges'].values()), 30_000)
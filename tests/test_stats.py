@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+from discord_fate_bot.dice import Outcome
+from discord_fate_bot.history import RollRecord
+from discord_fate_bot.stats import RollStats, _outcome_probabilities, stats_increments
+
+def _record(player_id, faces, result, guild_id=None):
+    return RollRecord(
+        channel_id=1, guild_id=guild_id, player_id=player_id, rolled_at=0.0, faces=faces,
+        modifiers=[], opposition=None, total=sum(faces), result=result, outcome=0,
+    )
+
+class RollStatsTests(TestCase):
+    """Tests for stats.RollStats"""
+
+    def test_add(self):
+        """Test that a roll counts its dice total, outcome, and expected outcomes"""
+        stats = RollStats()
+        # A dice total of +1 with a +2 modifier, vs an opposition of 5.
+        stats.add(4, 1, -2)
+
+        self.assertEqual(stats.rolls, 1)
+        self.assertEqual(stats.dice_totals, {1: 1})
+        self.assertEqual(stats.outcomes, {Outcome.FAIL: 1})
+        # Tying needed a dice total of +3: 4 of the 81 combinations, with 1 more
+        # (+4) succeeding.
+        self.assertAlmostEqual(stats.expected_outcomes[Outcome.FAIL], 76 / 81)
+        self.assertAlmostEqual(stats.expected_outcomes[Outcome.TIE], 4 / 81)
+        self.assertAlmostEqual(stats.expected_outcomes[Outcome.SUCCESS], 1 / 81)
+        self.assertAlmostEqual(stats.expected_outcomes[Outcome.SUCCESS_WITH_STYLE], 0)
+
+        self.assertEqual(RollStats.from_document(stats.to_document('player', 1)), stats)
+
+    def test_extreme_rolls(self):
+        """Test that huge modifiers and opposition are certain outcomes, and
+        don't grow the probability cache
+        """
+        stats = RollStats()
+        before = _outcome_probabilities.cache_info().currsize
+        for offset in range(10, 1000):
+            stats.add(4, 0, offset)
+            stats.add(4, 0, -offset)
+
+        self.assertLessEqual(_outcome_probabilities.cache_info().currsize - before, 2)
+        self.assertAlmostEqual(stats.expected_outcomes[Outcome.SUCCESS_WITH_STYLE], 990)
+        self.assertAlmostEqual(stats.expected_outcomes[Outcome.FAIL], 990)
+        self.assertAlmostEqual(stats.expected_outcomes.get(Outcome.TIE, 0), 0)
+
+    def test_stats_increments(self):
+        """Test that a batch of records comes to one increment per scope and key"""
+        increments = stats_increments([
+            _record(1, [1, 1, 0, 0], 2),
+            _record(1, [-1, 0, 0, 0], -1),
+            _record(2, [0, 0, 0, 0], 0, guild_id=3),
+        ])
+
+        self.assertEqual(
+            set(increments),
+            {('player', 1), ('player', 2), ('channel', 1), ('guild', 3)}
+        )
+        self.assertEqual(increments['channel', 1]['rolls'], 3)
+        self.assertEqual(increments['player', 1]['dice_totals.2'], 1)
+        self.assertEqual(increments['player', 1]['dice_totals.-1'], 1)
+        self.assertEqual(increments['guild', 3]['outcomes.1'], 1)
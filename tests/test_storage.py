@@ -0,0 +1,208 @@
+import asyncio
+
+from unittest import TestCase
+
+from benchmarks.bench_storage import STORES
+from discord_fate_bot.history import RollRecord
+from discord_fate_bot.scenes import Scene, SceneAspect
+from discord_fate_bot.stats import find_stats, rebuild_stats, stats_increments
+from discord_fate_bot.storage.mongo import _update_document
+
+class SceneStoreConformanceTests(TestCase):
+    """Tests that every storage backend behaves the same"""
+
+    def _for_each_store(self, test):
+        for name, make_store in STORES.items():
+            with self.subTest(store=name):
+                async def _test():
+                    store = await make_store()
+                    try:
+                        await test(store)
+                    finally:
+                        await store.close()
+
+                asyncio.run(_test())
+
+    def test_save_find_and_remove(self):
+        """Test that a saved scene can be found until it's removed"""
+        scene = Scene(channel_id=1, description='Warehouse Five')
+        scene.add_aspect(SceneAspect(name='Darkness', invokes=1))
+
+        async def _test(store):
+            self.assertIsNone(await store.find(1))
+
+            await store.save(scene.to_dict())
+            self.assertEqual(Scene.from_dict(await store.find(1)), scene)
+
+            await store.remove(1)
+            self.assertIsNone(await store.find(1))
+
+        self._for_each_store(_test)
+
+    def test_update(self):
+        """Test that each kind of change can be written as an update"""
+        edits = [
+            lambda scene: scene.add_aspect(SceneAspect(name='Fire')),
+            lambda scene: scene.remove_aspect(1),
+            lambda scene: setattr(scene.get_aspect(2), 'invokes', 0),
+            lambda scene: setattr(scene.get_aspect(3), 'name', 'Inferno'),
+            lambda scene: setattr(scene, 'description', 'Warehouse Five'),
+            lambda scene: scene.message_ids.add(5),
+        ]
+
+        async def _test(store):
+            scene = Scene(channel_id=1)
+            scene.add_aspect(SceneAspect(name='Darkness'))
+            scene.add_aspect(SceneAspect(name='Banana peel', boost=True, invokes=1))
+
+            await store.save(scene.to_dict())
+            scene.mark_saved()
+
+            for edit in edits:
+                edit(scene)
+                self.assertTrue(await store.update(scene, scene.changes()))
+                scene.mark_saved()
+                self.assertEqual(Scene.from_dict(await store.find(1)), scene)
+
+            self.assertFalse(await store.update(Scene(channel_id=2), scene.changes()))
+
+        self._for_each_store(_test)
+
+    def test_upgrade_and_migrate(self):
+        """Test that old documents are only upgraded from the version they're at"""
+        old_document = {
+            '_v': 1,
+            'channel_id': 1,
+            'message_ids': [],
+            'description': None,
+            'aspects': {'1': {'name': 'Darkness', 'boost': False, 'invokes': 0}},
+            'next_aspect_id': 2,
+        }
+
+        async def _test(store):
+            await store.save(old_document)
+            await store.save({**old_document, 'channel_id': 2})
+
+            upgraded = Scene.migrate_dict(old_document)
+            self.assertFalse(await store.upgrade(upgraded, 2))
+            self.assertTrue(await store.upgrade(upgraded, 1))
+            self.assertEqual((await store.find(1))['_v'], 2)
+
+            self.assertEqual(await store.migrate(Scene), 1)
+            self.assertEqual(await store.migrate(Scene), 0)
+            self.assertEqual(Scene.from_dict(await store.find(2)).get_aspect(1).name, 'Darkness')
+
+        self._for_each_store(_test)
+
+    def test_insert_and_find_rolls(self):
+        """Test that inserted rolls can be found by channel, in order"""
+        rolls = [
+            {'_v': 1, 'channel_id': channel_id, 'player_id': 1, 'result': result}
+            for channel_id, result in [(1, 0), (2, 1), (1, 2), (1, -3)]
+        ]
+
+        async def _test(store):
+            roll_store = store.roll_store()
+            self.assertEqual(await roll_store.find_rolls(1), [])
+
+            await roll_store.insert_rolls(rolls[:2])
+            await roll_store.insert_rolls(rolls[2:])
+
+            self.assertEqual(
+                [roll['result'] for roll in await roll_store.find_rolls(1)],
+                [0, 2, -3]
+            )
+
+        self._for_each_store(_test)
+
+    def test_increment_and_rebuild_stats(self):
+        """Test that incremented stats match those rebuilt from the history"""
+        rolls = [
+            RollRecord(
+                channel_id=channel_id, guild_id=guild_id, player_id=player_id, rolled_at=0.0,
+                faces=faces, modifiers=[], opposition=None, total=sum(faces),
+                result=sum(faces), outcome=0,
+            )
+            for channel_id, guild_id, player_id, faces in [
+                (1, None, 1, [1, 1, 0, -1]),
+                (1, None, 2, [0, 0, 0, 0]),
+                (2, 3, 1, [1, 1, 1, 0]),
+            ]
+        ]
+
+        async def _test(store):
+            roll_store = store.roll_store()
+            await roll_store.insert_rolls([roll.to_dict() for roll in rolls])
+            await roll_store.increment_stats(stats_increments(rolls[:2]))
+            await roll_store.increment_stats(stats_increments(rolls[2:]))
+
+            incremented = await find_stats(roll_store, 'player', 1)
+            self.assertEqual(incremented.rolls, 2)
+            self.assertEqual(incremented.dice_totals, {1: 1, 3: 1})
+            self.assertIsNone(await roll_store.find_stats('guild', 1))
+
+            # Throw the counts off, so the rebuild has something to fix.
+            await roll_store.increment_stats({('player', 1): {'rolls': 5}})
+            self.assertEqual(
+                await rebuild_stats(roll_store),
+                {'player': 2, 'channel': 2, 'guild': 1}
+            )
+
+            rebuilt = await find_stats(roll_store, 'player', 1)
+            self.assertEqual(rebuilt.rolls, 2)
+            self.assertEqual(rebuilt.dice_totals, incremented.dice_totals)
+            self.assertEqual(rebuilt.outcomes, incremented.outcomes)
+            for outcome, expected in incremented.expected_outcomes.items():
+                self.assertAlmostEqual(rebuilt.expected_outcomes[outcome], expected)
+            self.assertEqual((await find_stats(roll_store, 'guild', 3)).rolls, 1)
+
+        self._for_each_store(_test)
+
+class MongoUpdateDocumentTests(TestCase):
+    """Tests for the MongoDB updates built from scene changes"""
+
+    def setUp(self):
+        self.scene = Scene(channel_id=1)
+        self.scene.add_aspect(SceneAspect(name='Darkness'))
+        self.scene.add_aspect(SceneAspect(name='Banana peel', boost=True, invokes=1))
+        self.scene.mark_saved()
+
+    def test_invoke_is_incremented(self):
+        """Test that invoke changes become an $inc of the aspect's flags"""
+        self.scene.get_aspect(2).invokes -= 1
+        update, array_filters = _update_document(self.scene, self.scene.changes())
+        self.assertEqual(update, {'$inc': {'a.$[a2].f': -2}})
+        self.assertEqual(array_filters, [{'a2.i': 2}])
+
+    def test_boost_and_rename(self):
+        """Test that boost and name changes are applied to just that aspect"""
+        aspect = self.scene.get_aspect(1)
+        aspect.name = 'Pitch darkness'
+        aspect.boost = True
+        update, array_filters = _update_document(self.scene, self.scene.changes())
+        self.assertEqual(update, {
+            '$set': {'a.$[a1].n': 'Pitch darkness'},
+            '$inc': {'a.$[a1].f': 1},
+        })
+        self.assertEqual(array_filters, [{'a1.i': 1}])
+
+    def test_add_aspect(self):
+        """Test that added aspects are pushed"""
+        self.scene.add_aspect(SceneAspect(name='Fire'))
+        update, array_filters = _update_document(self.scene, self.scene.changes())
+        self.assertEqual(update, {
+            '$inc': {'n': 1},
+            '$push': {'a': {'$each': [{'i': 3, 'n': 'Fire'}]}},
+        })
+        self.assertEqual(array_filters, [])
+
+    def test_add_and_remove_aspects(self):
+        """Test that adding and removing aspects at once sets the whole array"""
+        self.scene.remove_aspect(1)
+        self.scene.add_aspect(SceneAspect(name='Fire'))
+        update, array_filters = _update_document(self.scene, self.scene.changes())
+        self.assertEqual(update, {
+            '$set': {'a': [{'i': 2, 'n': 'Banana peel', 'f': 3}, {'i': 3, 'n': 'Fire'}]},
+            '$inc': {'n': 1},
+        })
+        self.assertEqual(array_filters, [])
@@ -0,0 +1,125 @@
+import asyncio
+
+from collections import Counter
+from types import SimpleNamespace
+from unittest import TestCase
+
+from discord.ext.commands import CommandNotFound
+
+from discord_fate_bot.config import Config
+from discord_fate_bot.extensions.error_handling import ErrorHandlingCog, boilerplate
+from discord_fate_bot.throttle import ErrorThrottle, ThrottleDecision
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class ErrorThrottleTests(TestCase):
+    """Tests for throttle.ErrorThrottle"""
+
+    def test_suppresses_repeats_within_window(self):
+        """Test that a repeated error is suppressed, reacted to once, and
+        counted in the next message sent for it
+        """
+        clock = FakeClock()
+        throttle = ErrorThrottle(window=10, clock=clock)
+        error = CommandNotFound('Command "r" is not found')
+
+        self.assertEqual(throttle.check(1, 2, error), ThrottleDecision(send=True))
+        self.assertEqual(throttle.check(1, 2, error), ThrottleDecision(send=False, react=True))
+        self.assertEqual(
+            throttle.check(1, 2, CommandNotFound('Command "r" is not found')),
+            ThrottleDecision(send=False),
+        )
+
+        clock.now = 10
+        self.assertEqual(throttle.check(1, 2, error), ThrottleDecision(send=True, suppressed=2))
+        self.assertEqual(throttle.check(1, 2, error), ThrottleDecision(send=False, react=True))
+
+    def test_keys_by_channel_user_and_error(self):
+        """Test that different errors, users, and channels aren't held back by
+        each other
+        """
+        throttle = ErrorThrottle(window=10, clock=FakeClock())
+
+        self.assertTrue(throttle.check(1, 2, CommandNotFound('a')).send)
+        self.assertTrue(throttle.check(1, 2, CommandNotFound('b')).send)
+        self.assertTrue(throttle.check(1, 3, CommandNotFound('a')).send)
+        self.assertTrue(throttle.check(4, 2, CommandNotFound('a')).send)
+
+    def test_limits_messages_per_channel(self):
+        """Test that a channel gets at most channel_limit messages per window,
+        and no reactions beyond that
+        """
+        clock = FakeClock()
+        throttle = ErrorThrottle(window=10, channel_limit=2, clock=clock)
+
+        self.assertTrue(throttle.check(1, 1, CommandNotFound('a')).send)
+        self.assertTrue(throttle.check(1, 2, CommandNotFound('a')).send)
+        self.assertEqual(throttle.check(1, 3, CommandNotFound('a')), ThrottleDecision(send=False))
+        self.assertTrue(throttle.check(2, 3, CommandNotFound('a')).send)
+
+        clock.now = 10
+        self.assertEqual(
+            throttle.check(1, 3, CommandNotFound('a')),
+            ThrottleDecision(send=True, suppressed=1),
+        )
+
+class _RecordingOutbound:
+    def __init__(self):
+        self.actions = []
+
+    async def submit(self, channel_id, priority, run, *, key=None):
+        self.actions.append(('submit', channel_id))
+
+    def defer(self, channel_id, run, *, key=None):
+        self.actions.append(('defer', channel_id))
+
+class ErrorHandlingCogTests(TestCase):
+    """Tests for error_handling.ErrorHandlingCog"""
+
+    def test_burst_sends_bounded_actions(self):
+        """Test that a burst of errors costs a bounded number of outbound
+        actions, however long it is
+        """
+        config = Config.from_environ({'DFB_BOT_TOKEN': 'test', 'DFB_ERRORS_CHANNEL_LIMIT': '3'})
+        bot = SimpleNamespace(config=config, outbound=_RecordingOutbound())
+        cog = ErrorHandlingCog(bot)
+
+        def _context(user_id, message_id):
+            return SimpleNamespace(
+                bot=bot,
+                channel=SimpleNamespace(id=1),
+                author=SimpleNamespace(id=user_id, mention=f'<@{user_id}>'),
+                guild=None,
+                command=None,
+                message=SimpleNamespace(id=message_id, content='!r'),
+            )
+
+        async def _test():
+            for message_id in range(200):
+                # Two users repeating another bot's command, and a third
+                # trying a new one each time.
+                for user_id, command in ((1, 'r'), (2, 'r'), (3, f'x{message_id}')):
+                    error = CommandNotFound(f'Command "{command}" is not found')
+                    await cog.on_command_error(_context(user_id, message_id), error)
+
+        asyncio.run(_test())
+        self.assertEqual(
+            Counter(kind for kind, _ in bot.outbound.actions),
+            {'submit': 3, 'defer': 2},
+        )
+
+class BoilerplateTests(TestCase):
+    """Tests for error_handling.boilerplate"""
+
+    def test_boilerplate(self):
+        """Test the help suggestion with and without a command and DM offer"""
+        self.assertEqual(boilerplate(None, None), 'Try **!help** for more information. ')
+        self.assertEqual(
+            boilerplate('scene new', '<@1>'),
+            'Try **!help scene new** for more information. (Feel free to DM that to <@1>.)',
+        )
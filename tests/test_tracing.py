@@ -0,0 +1,51 @@
+import asyncio
+
+from unittest import TestCase
+
+from discord_fate_bot.tracing import annotate, span, trace
+
+class TracingTests(TestCase):
+    """Tests for tracing spans"""
+
+    def test_spans_nest_within_a_trace(self):
+        """Test that spans are collected into a tree across awaits and tasks"""
+        async def _child(name):
+            with span(name):
+                await asyncio.sleep(0)
+
+        async def _test():
+            with trace('aspect', channel=1) as root:
+                with span('scene_dao.find'):
+                    annotate(cached=True)
+                await asyncio.gather(_child('discord'), _child('discord'))
+            return root
+
+        root = asyncio.run(_test())
+        tree = root.to_dict()
+
+        self.assertEqual(tree['name'], 'aspect')
+        self.assertEqual(tree['attributes'], {'channel': 1})
+        self.assertEqual(
+            [(child['name'], child['attributes']) for child in tree['children']],
+            [('scene_dao.find', {'cached': True}), ('discord', {}), ('discord', {})]
+        )
+        self.assertEqual(len(root.format_tree()), 4)
+
+    def test_spans_outside_a_trace_are_ignored(self):
+        """Test that spans do nothing outside a trace or after it ends"""
+        async def _late():
+            await asyncio.sleep(0.01)
+            with span('late'):
+                pass
+
+        async def _test():
+            with span('orphan'):
+                annotate(ignored=True)
+
+            with trace('aspect') as root:
+                task = asyncio.ensure_future(_late())
+            await task
+            return root
+
+        root = asyncio.run(_test())
+        self.assertEqual(root.children, [])
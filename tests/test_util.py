@@ -0,0 +1,53 @@
+import asyncio
+
+from unittest import TestCase
+
+from discord_fate_bot.util import gather_limited, paginate
+
+class GatherLimitedTests(TestCase):
+    """Tests for util.gather_limited"""
+
+    def test_limits_concurrency(self):
+        """Test that no more than limit awaitables run at once"""
+        running = 0
+        max_running = 0
+
+        async def _work(i):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return i
+
+        results = asyncio.run(gather_limited((_work(i) for i in range(10)), limit=3))
+        self.assertEqual(results, list(range(10)))
+        self.assertEqual(max_running, 3)
+
+    def test_collects_failures(self):
+        """Test that one failure doesn't stop the rest of the batch"""
+        async def _work(i):
+            if i == 1:
+                raise ValueError(i)
+            return i
+
+        results = asyncio.run(gather_limited((_work(i) for i in range(3)), limit=2))
+        self.assertEqual(results[0], 0)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], 2)
+
+class PaginateTests(TestCase):
+    """Tests for util.paginate"""
+
+    def test_packs_lines(self):
+        """Test that lines are packed onto as few pages as possible"""
+        self.assertEqual(paginate(['aaa', 'bb', 'c'], 6), ['aaa\nbb', 'c'])
+
+    def test_splits_long_lines(self):
+        """Test that a line longer than a page is split"""
+        self.assertEqual(paginate(['aaaaaaa', 'b'], 5), ['aaaaa', 'aa\nb'])
+
+    def test_continuation(self):
+        """Test that pages after the first start with the continuation line"""
+        pages = paginate(['head', 'aaaa', 'bbbb'], 10, continuation='..')
+        self.assertEqual(pages, ['head\naaaa', '..\nbbbb'])